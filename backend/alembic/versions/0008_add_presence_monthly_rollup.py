@@ -0,0 +1,54 @@
+"""add presence monthly rollup
+
+Revision ID: 0008_add_presence_rollup
+Revises: 0007_add_presence_pin
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0008_add_presence_rollup"
+down_revision = "0007_add_presence_pin"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "presence_monthly_rollup",
+        sa.Column("month", sa.Date(), primary_key=True),
+        sa.Column("group_number", sa.Integer(), primary_key=True),
+        sa.Column("ebi_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("presence_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("checked_out_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("total_stay_seconds", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+    )
+
+    # Backfill from existing sessions (same result as `python -m app.rollup`)
+    op.execute(
+        """
+        INSERT INTO presence_monthly_rollup (
+            month, group_number, ebi_count, presence_count, checked_out_count,
+            total_stay_seconds, created_at, updated_at
+        )
+        SELECT date_trunc('month', e.ebi_date)::date, e.group_number, count(*),
+               coalesce(sum(p.presences), 0), coalesce(sum(p.checked_out), 0),
+               coalesce(sum(p.stay_seconds), 0), now(), now()
+        FROM ebi e
+        LEFT JOIN (
+            SELECT ebi_id, count(*) AS presences, count(exit_at) AS checked_out,
+                   sum(greatest(floor(extract(epoch FROM exit_at - entry_at)), 0))::bigint AS stay_seconds
+            FROM ebi_presence
+            GROUP BY ebi_id
+        ) p ON p.ebi_id = e.id
+        GROUP BY 1, 2
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("presence_monthly_rollup")
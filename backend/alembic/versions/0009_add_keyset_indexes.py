@@ -0,0 +1,27 @@
+"""add keyset pagination indexes
+
+Revision ID: 0009_add_keyset_indexes
+Revises: 0008_add_presence_rollup
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0009_add_keyset_indexes"
+down_revision = "0008_add_presence_rollup"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_ebi_date_id", "ebi", ["ebi_date", "id"], unique=False)
+    op.create_index("ix_children_name_id", "children", ["name", "id"], unique=False)
+    op.create_index("ix_users_full_name_id", "users", ["full_name", "id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_users_full_name_id", table_name="users")
+    op.drop_index("ix_children_name_id", table_name="children")
+    op.drop_index("ix_ebi_date_id", table_name="ebi")
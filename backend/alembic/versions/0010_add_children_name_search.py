@@ -0,0 +1,41 @@
+"""add accent-insensitive trigram search on children
+
+Revision ID: 0010_add_children_name_search
+Revises: 0009_add_keyset_indexes
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0010_add_children_name_search"
+down_revision = "0009_add_keyset_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+
+    op.add_column("children", sa.Column("name_normalized", sa.String(length=200), nullable=True))
+    # Mirrors app.core.search.normalize_name, which maintains the column from now on
+    op.execute(
+        "UPDATE children SET name_normalized = "
+        "regexp_replace(lower(unaccent(trim(name))), '\\s+', ' ', 'g')"
+    )
+    op.alter_column("children", "name_normalized", nullable=False)
+    op.create_index(
+        "ix_children_name_trgm",
+        "children",
+        ["name_normalized"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"name_normalized": "gin_trgm_ops"},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_children_name_trgm", table_name="children")
+    op.drop_column("children", "name_normalized")
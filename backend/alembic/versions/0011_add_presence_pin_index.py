@@ -0,0 +1,25 @@
+"""add presence (ebi_id, pin_code) index
+
+Revision ID: 0011_add_presence_pin_index
+Revises: 0010_add_children_name_search
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0011_add_presence_pin_index"
+down_revision = "0010_add_children_name_search"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Not unique: rows backfilled by 0007 share '0000', and PINs only need to be
+    # unique among open presences, which add_presence enforces under the EBI row lock.
+    op.create_index("ix_presence_ebi_pin", "ebi_presence", ["ebi_id", "pin_code"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_presence_ebi_pin", table_name="ebi_presence")
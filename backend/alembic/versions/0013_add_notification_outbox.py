@@ -0,0 +1,47 @@
+"""add notification outbox
+
+Revision ID: 0013_add_notification_outbox
+Revises: 0012_add_sync_operations
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0013_add_notification_outbox"
+down_revision = "0012_add_sync_operations"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "notification_outbox",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("presence_id", sa.Integer(), nullable=True),
+        sa.Column("to_phone", sa.String(length=40), nullable=False),
+        sa.Column("child_name", sa.String(length=200), nullable=False),
+        sa.Column("pin_code", sa.String(length=4), nullable=False),
+        sa.Column("status", sa.Enum("PENDING", "SENT", "FAILED", name="outbox_status"), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("next_attempt_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("sent_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("last_error", sa.String(length=500), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.ForeignKeyConstraint(["presence_id"], ["ebi_presence.id"], ondelete="SET NULL"),
+    )
+    op.create_index(
+        "ix_outbox_pending",
+        "notification_outbox",
+        ["next_attempt_at"],
+        unique=False,
+        postgresql_where=sa.text("status = 'PENDING'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_outbox_pending", table_name="notification_outbox")
+    op.drop_table("notification_outbox")
+    op.execute("DROP TYPE outbox_status")
@@ -0,0 +1,34 @@
+"""add indexes on foreign keys and user filters
+
+Revision ID: 0014_add_missing_fk_indexes
+Revises: 0013_add_notification_outbox
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0014_add_missing_fk_indexes"
+down_revision = "0013_add_notification_outbox"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Also serves the coordinator filter of the EBI list in newest-first order
+    op.create_index("ix_ebi_coordinator", "ebi", ["coordinator_id", "ebi_date", "id"], unique=False)
+    # The primary key (ebi_id, user_id) does not serve lookups by collaborator
+    op.create_index("ix_ebi_colaboradoras_user", "ebi_colaboradoras", ["user_id"], unique=False)
+    op.create_index(
+        "ix_user_documents_user_type", "user_documents", ["user_id", "document_type"], unique=False
+    )
+    # Covers the general report's role/group totals (index-only scan)
+    op.create_index("ix_users_role_group", "users", ["role", "group_number"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_users_role_group", table_name="users")
+    op.drop_index("ix_user_documents_user_type", table_name="user_documents")
+    op.drop_index("ix_ebi_colaboradoras_user", table_name="ebi_colaboradoras")
+    op.drop_index("ix_ebi_coordinator", table_name="ebi")
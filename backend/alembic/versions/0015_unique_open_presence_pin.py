@@ -0,0 +1,55 @@
+"""make PINs unique among open presences
+
+Revision ID: 0015_unique_open_presence_pin
+Revises: 0014_add_missing_fk_indexes
+Create Date: 2026-10-18
+
+"""
+from collections import defaultdict
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0015_unique_open_presence_pin"
+down_revision = "0014_add_missing_fk_indexes"
+branch_labels = None
+depends_on = None
+
+PIN_SPACE = 10_000
+
+
+def upgrade() -> None:
+    # Rows backfilled by 0007 share '0000': give every duplicate open PIN a
+    # free one, keeping the oldest presence's PIN as is
+    bind = op.get_bind()
+    rows = bind.execute(
+        sa.text("SELECT id, ebi_id, pin_code FROM ebi_presence WHERE exit_at IS NULL ORDER BY ebi_id, id")
+    ).all()
+    used = defaultdict(set)
+    for _, ebi_id, pin_code in rows:
+        used[ebi_id].add(pin_code)
+    seen = defaultdict(set)
+    free = {}
+    for presence_id, ebi_id, pin_code in rows:
+        if pin_code not in seen[ebi_id]:
+            seen[ebi_id].add(pin_code)
+            continue
+        if ebi_id not in free:
+            free[ebi_id] = (f"{pin:04d}" for pin in range(PIN_SPACE) if f"{pin:04d}" not in used[ebi_id])
+        new_pin = next(free[ebi_id])
+        bind.execute(sa.text("UPDATE ebi_presence SET pin_code = :pin WHERE id = :id"), {"pin": new_pin, "id": presence_id})
+
+    # A kiosk PIN must match at most one open presence of the EBI
+    op.create_index(
+        "ux_presence_open_pin",
+        "ebi_presence",
+        ["ebi_id", "pin_code"],
+        unique=True,
+        postgresql_where=sa.text("exit_at IS NULL"),
+        sqlite_where=sa.text("exit_at IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ux_presence_open_pin", table_name="ebi_presence")
@@ -0,0 +1,28 @@
+"""add list_versions counters for list ETags
+
+Revision ID: 0016_add_list_versions
+Revises: 0015_unique_open_presence_pin
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0016_add_list_versions"
+down_revision = "0015_unique_open_presence_pin"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    list_versions = op.create_table(
+        "list_versions",
+        sa.Column("name", sa.String(length=32), primary_key=True),
+        sa.Column("version", sa.BigInteger(), nullable=False, server_default="0"),
+    )
+    op.bulk_insert(list_versions, [{"name": name, "version": 0} for name in ("ebi", "children", "users")])
+
+
+def downgrade() -> None:
+    op.drop_table("list_versions")
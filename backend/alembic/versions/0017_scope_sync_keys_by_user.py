@@ -0,0 +1,26 @@
+"""scope sync idempotency keys by user
+
+Revision ID: 0017_scope_sync_keys_by_user
+Revises: 0016_add_list_versions
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0017_scope_sync_keys_by_user"
+down_revision = "0016_add_list_versions"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Existing keys were globally unique, so they stay unique per user
+    op.drop_constraint("sync_operations_pkey", "sync_operations", type_="primary")
+    op.create_primary_key("sync_operations_pkey", "sync_operations", ["user_id", "idempotency_key"])
+
+
+def downgrade() -> None:
+    # Fails if two users reused a key; those rows have to be removed first
+    op.drop_constraint("sync_operations_pkey", "sync_operations", type_="primary")
+    op.create_primary_key("sync_operations_pkey", "sync_operations", ["idempotency_key"])
@@ -0,0 +1,23 @@
+"""add users group_number index
+
+Revision ID: 0018_add_users_group_index
+Revises: 0017_scope_sync_keys_by_user
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0018_add_users_group_index"
+down_revision = "0017_scope_sync_keys_by_user"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Lookups by group alone; ix_users_role_group leads with role and cannot serve them
+    op.create_index("ix_users_group_number", "users", ["group_number"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_users_group_number", table_name="users")
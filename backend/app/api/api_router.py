@@ -1,12 +1,14 @@
 from fastapi import APIRouter
 
-from app.api.routes import auth, children, ebi, health, profile, reports, users
+from app.api.routes import auth, children, ebi, health, metrics, profile, reports, sync, users
 
 api_router = APIRouter()
 api_router.include_router(health.router, tags=["health"])
+api_router.include_router(metrics.router, tags=["metrics"])
 api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
 api_router.include_router(profile.router, prefix="/profile", tags=["profile"])
 api_router.include_router(users.router, prefix="/users", tags=["users"])
 api_router.include_router(children.router, prefix="/children", tags=["children"])
 api_router.include_router(ebi.router, prefix="/ebi", tags=["ebi"])
 api_router.include_router(reports.router, prefix="/reports", tags=["reports"])
+api_router.include_router(sync.router, prefix="/sync", tags=["sync"])
@@ -1,6 +1,7 @@
 import traceback
 
 from fastapi import FastAPI, Request
+from fastapi.encoders import jsonable_encoder
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from starlette import status
@@ -16,7 +17,7 @@ def add_error_handlers(app: FastAPI) -> None:
                 "title": "Validation error",
                 "status": status.HTTP_422_UNPROCESSABLE_ENTITY,
                 "detail": "Invalid request payload",
-                "errors": exc.errors(),
+                "errors": jsonable_encoder(exc.errors()),
                 "instance": str(request.url),
             },
         )
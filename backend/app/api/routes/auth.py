@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
-from app.core.db import get_db
+from app.core.db import get_db_async, get_db
 from app.repositories.user_repo import list_users
 from app.schemas.auth import BootstrapRequest, TokenResponse
 from app.services.auth_service import bootstrap_coordinator, login
@@ -12,8 +13,8 @@ router = APIRouter()
 
 
 @router.post("/login", response_model=TokenResponse)
-def login_user(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    token, user = login(db, form_data.username, form_data.password)
+async def login_user(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db_async)):
+    token, user = await login(db, form_data.username, form_data.password)
     return TokenResponse(access_token=token, role=user.role.value, user_id=user.id)
 
 
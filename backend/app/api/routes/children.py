@@ -1,54 +1,104 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Request, Response
 from fastapi import HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.db import get_db
-from app.core.deps import get_current_user
-from app.repositories.child_repo import get_child_by_id, list_children
-from app.schemas.child import ChildCreate, ChildList, ChildOut, ChildUpdate
+from app.core.db import get_db_async, get_db_read_async
+from app.core.deps import get_current_user_async
+from app.core.etag import etag_matches, make_etag, not_modified, query_key, set_etag
+from app.core.pagination import decode_cursor, encode_cursor
+from app.repositories.child_repo import (
+    CHILD_CURSOR_TYPES,
+    child_cursor_key,
+    child_list_version,
+    child_version,
+    get_child_by_id,
+    list_children,
+)
+from app.schemas.child import ChildCreate, ChildList, ChildOut, ChildSuggestion, ChildUpdate
 from app.services.child_service import create_new_child, update_existing_child
+from app.services.suggest_service import ensure_child_suggest_index, suggest_children
 
 router = APIRouter()
 
 
+def _child_out(child) -> ChildOut:
+    # Built inside run_sync: guardians may still need a lazy load
+    return ChildOut.model_validate(child)
+
+
 @router.get("", response_model=ChildList)
-def list_children_api(
+async def list_children_api(
+    request: Request,
+    response: Response,
     search: str | None = None,
     page: int = Query(1, ge=1),
     page_size: int = Query(10, ge=1, le=100),
-    db: Session = Depends(get_db),
-    _=Depends(get_current_user),
+    cursor: str | None = None,
+    limit: int | None = Query(None, ge=1, le=100),
+    include_total: bool = False,
+    db: AsyncSession = Depends(get_db_read_async),
+    _=Depends(get_current_user_async),
 ):
-    items, total = list_children(db, search, page, page_size)
-    return ChildList(items=items, total=total, page=page, page_size=page_size)
+    etag = make_etag("child-list", await db.run_sync(child_list_version), query_key(request))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+
+    page_size = limit or page_size
+    after = decode_cursor(cursor, CHILD_CURSOR_TYPES) if cursor else None
+    items, total = await db.run_sync(list_children, search, page, page_size, after, include_total)
+    # Ranked search results are not in keyset order, so they only page with `page`
+    next_cursor = (
+        encode_cursor(child_cursor_key(items[-1])) if len(items) == page_size and not search else None
+    )
+    return ChildList(items=items, total=total, page=page, page_size=page_size, next_cursor=next_cursor)
 
 
 @router.post("", response_model=ChildOut)
-def create_child_api(
+async def create_child_api(
     payload: ChildCreate,
-    db: Session = Depends(get_db),
-    _=Depends(get_current_user),
+    db: AsyncSession = Depends(get_db_async),
+    _=Depends(get_current_user_async),
 ):
-    return create_new_child(db, payload)
+    return await db.run_sync(lambda session: _child_out(create_new_child(session, payload)))
+
+
+@router.get("/suggest", response_model=list[ChildSuggestion])
+async def suggest_children_api(
+    q: str = Query(min_length=1, max_length=200),
+    limit: int = Query(10, ge=1, le=20),
+    db: AsyncSession = Depends(get_db_async),
+    _=Depends(get_current_user_async),
+):
+    """Autocomplete by name or guardian phone prefix, served from memory."""
+    await ensure_child_suggest_index(db)
+    return [ChildSuggestion(id=child_id, name=name) for child_id, name in await db.run_sync(suggest_children, q, limit)]
 
 
 @router.get("/{child_id}", response_model=ChildOut)
-def get_child_api(
+async def get_child_api(
     child_id: int,
-    db: Session = Depends(get_db),
-    _=Depends(get_current_user),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db_async),
+    _=Depends(get_current_user_async),
 ):
-    child = get_child_by_id(db, child_id)
-    if not child:
+    version = await db.run_sync(child_version, child_id)
+    if version is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Child not found")
-    return child
+    etag = make_etag("child", child_id, *version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    set_etag(response, etag)
+    return await db.run_sync(lambda session: _child_out(get_child_by_id(session, child_id)))
 
 
 @router.put("/{child_id}", response_model=ChildOut)
-def update_child_api(
+async def update_child_api(
     child_id: int,
     payload: ChildUpdate,
-    db: Session = Depends(get_db),
-    _=Depends(get_current_user),
+    db: AsyncSession = Depends(get_db_async),
+    _=Depends(get_current_user_async),
 ):
-    return update_existing_child(db, child_id, payload)
+    return await db.run_sync(lambda session: _child_out(update_existing_child(session, child_id, payload)))
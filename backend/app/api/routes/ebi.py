@@ -1,14 +1,32 @@
-from fastapi import APIRouter, Depends, Query
+from datetime import date
+
+from fastapi import APIRouter, Depends, Query, Request, Response
 from fastapi import HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.db import get_db
-from app.core.deps import get_current_user, require_role
+from app.core.config import settings
+from app.core.db import get_db_async, get_db_read_async
+from app.core.etag import etag_matches, make_etag, not_modified, query_key, set_etag
+from app.core.events import ebi_events, stream_events
+from app.core.pagination import decode_cursor, encode_cursor
+from app.core.security import create_stream_token
+from app.core.deps import get_current_user_async, get_stream_user, require_role_async
+from app.models.ebi import EbiStatus
 from app.models.user import UserRole
-from app.repositories.ebi_repo import get_ebi_by_id, list_ebis
+from app.repositories.ebi_repo import (
+    EBI_CURSOR_TYPES,
+    ebi_cursor_key,
+    ebi_detail_version,
+    ebi_list_version,
+    get_ebi_by_id,
+    get_ebi_detail,
+    list_ebis,
+)
+from app.schemas.auth import StreamTokenResponse
 from app.schemas.ebi import EbiCreate, EbiDetail, EbiList, EbiOut, EbiUpdate
-from app.schemas.presence import PresenceCheckout, PresenceCreate, PresenceOut
-from app.services.ebi_service import add_presence, checkout_presence, close_ebi, create_new_ebi, reopen_ebi, update_existing_ebi
+from app.schemas.presence import PresenceBulkCheckout, PresenceBulkCheckoutOut, PresenceBulkCreate, PresenceBulkOut, PresenceCheckout, PresenceCreate, PresenceOut, PresencePinCheckout
+from app.services.ebi_service import add_presence, add_presences_bulk, build_ebi_filter, checkout_by_pin, checkout_presence, checkout_presences_bulk, close_ebi, create_new_ebi, reopen_ebi, update_existing_ebi
 
 router = APIRouter()
 
@@ -39,94 +57,215 @@ def _presence_to_out(presence, include_pin: bool = False) -> PresenceOut:
     )
 
 
+def _ebi_detail(db, ebi_id: int) -> EbiDetail:
+    ebi = get_ebi_detail(db, ebi_id)
+    return EbiDetail(
+        **_ebi_to_out(ebi).model_dump(),
+        presences=[_presence_to_out(p) for p in ebi.presences],
+    )
+
+
+# Routes run the sync repositories and services on the async session with
+# `db.run_sync`; responses that touch relationships are built inside it.
+
+
 @router.get("", response_model=EbiList)
-def list_ebi_api(
+async def list_ebi_api(
+    request: Request,
+    response: Response,
     search: str | None = None,
+    date_from: date | None = Query(None, alias="from"),
+    date_to: date | None = Query(None, alias="to"),
+    month: str | None = Query(None, pattern=r"^\d{4}-(0[1-9]|1[0-2])$"),
+    year: int | None = Query(None, ge=2000, le=2100),
+    group: int | None = Query(None, ge=1, le=4),
+    ebi_status: EbiStatus | None = Query(None, alias="status"),
+    coordinator_id: int | None = None,
     page: int = Query(1, ge=1),
     page_size: int = Query(10, ge=1, le=100),
-    db: Session = Depends(get_db),
-    _=Depends(get_current_user),
+    cursor: str | None = None,
+    limit: int | None = Query(None, ge=1, le=100),
+    include_total: bool = False,
+    db: AsyncSession = Depends(get_db_read_async),
+    _=Depends(get_current_user_async),
 ):
-    items, total = list_ebis(db, search, page, page_size)
+    etag = make_etag("ebi-list", await db.run_sync(ebi_list_version), query_key(request))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+
+    page_size = limit or page_size
+    filters = build_ebi_filter(search, date_from, date_to, month, year, group, ebi_status, coordinator_id)
+    if filters is None:
+        # Unrecognized search text or an empty date range
+        return EbiList(items=[], total=0 if include_total else None, page=page, page_size=page_size)
+
+    after = decode_cursor(cursor, EBI_CURSOR_TYPES) if cursor else None
+    items, total = await db.run_sync(list_ebis, filters, page, page_size, after, include_total)
+    next_cursor = encode_cursor(ebi_cursor_key(items[-1])) if len(items) == page_size else None
     return EbiList(
-        items=[_ebi_to_out(item) for item in items], total=total, page=page, page_size=page_size
+        items=[_ebi_to_out(item) for item in items],
+        total=total,
+        page=page,
+        page_size=page_size,
+        next_cursor=next_cursor,
     )
 
 
 @router.post("", response_model=EbiOut)
-def create_ebi_api(
+async def create_ebi_api(
     payload: EbiCreate,
-    db: Session = Depends(get_db),
-    _=Depends(require_role(UserRole.COORDENADORA, UserRole.ADMINISTRADOR)),
+    db: AsyncSession = Depends(get_db_async),
+    _=Depends(require_role_async(UserRole.COORDENADORA, UserRole.ADMINISTRADOR)),
 ):
-    ebi = create_new_ebi(db, payload)
-    return _ebi_to_out(ebi)
+    return await db.run_sync(lambda session: _ebi_to_out(create_new_ebi(session, payload)))
 
 
 @router.get("/{ebi_id}", response_model=EbiDetail)
-def get_ebi_api(
+async def get_ebi_api(
     ebi_id: int,
-    db: Session = Depends(get_db),
-    _=Depends(get_current_user),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db_read_async),
+    _=Depends(get_current_user_async),
 ):
-    ebi = get_ebi_by_id(db, ebi_id)
-    if not ebi:
+    version = await db.run_sync(ebi_detail_version, ebi_id)
+    if version is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="EBI not found")
-    return EbiDetail(
-        **_ebi_to_out(ebi).model_dump(),
-        presences=[_presence_to_out(p) for p in ebi.presences],
-    )
+    etag = make_etag("ebi", ebi_id, *version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    detail = await db.run_sync(_ebi_detail, ebi_id)
+    set_etag(response, etag)
+    return detail
 
 
 @router.put("/{ebi_id}", response_model=EbiOut)
-def update_ebi_api(
+async def update_ebi_api(
     ebi_id: int,
     payload: EbiUpdate,
-    db: Session = Depends(get_db),
-    _=Depends(require_role(UserRole.COORDENADORA, UserRole.ADMINISTRADOR)),
+    db: AsyncSession = Depends(get_db_async),
+    _=Depends(require_role_async(UserRole.COORDENADORA, UserRole.ADMINISTRADOR)),
 ):
-    ebi = update_existing_ebi(db, ebi_id, payload)
-    return _ebi_to_out(ebi)
+    return await db.run_sync(lambda session: _ebi_to_out(update_existing_ebi(session, ebi_id, payload)))
+
+
+@router.post("/{ebi_id}/events/token", response_model=StreamTokenResponse)
+async def ebi_events_token_api(
+    ebi_id: int,
+    db: AsyncSession = Depends(get_db_async),
+    current_user=Depends(get_current_user_async),
+):
+    """Short-lived `?stream_token=` for the events stream, so the access token stays out of URLs."""
+    if not await db.run_sync(get_ebi_by_id, ebi_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="EBI not found")
+    return StreamTokenResponse(
+        stream_token=create_stream_token(str(current_user.id), ebi_id),
+        expires_in=settings.ebi_events_token_expire_seconds,
+    )
+
+
+@router.get("/{ebi_id}/events")
+async def ebi_events_api(
+    ebi_id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_db_async),
+    _=Depends(get_stream_user),
+):
+    """Server-Sent Events naming what changed (presence_added, checked_out, closed, reopened, resync).
+
+    Events carry ids only; clients refetch `GET /ebi/{id}` (ETag-cached) when one arrives.
+    """
+    if not await db.run_sync(get_ebi_by_id, ebi_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="EBI not found")
+
+    # Subscribe before responding so nothing committed meanwhile is missed
+    subscription = ebi_events.subscribe(ebi_id)
+    return StreamingResponse(
+        stream_events(subscription, request.is_disconnected, settings.ebi_events_keepalive_seconds),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.post("/{ebi_id}/presence", response_model=PresenceOut)
-def add_presence_api(
+async def add_presence_api(
     ebi_id: int,
     payload: PresenceCreate,
-    db: Session = Depends(get_db),
-    _=Depends(get_current_user),
+    db: AsyncSession = Depends(get_db_async),
+    _=Depends(get_current_user_async),
+):
+    # The inserted row already carries child_name and pin_code
+    presence = await db.run_sync(add_presence, ebi_id, payload)
+    return PresenceOut(**presence._mapping)
+
+
+@router.post("/{ebi_id}/presence/bulk", response_model=PresenceBulkOut)
+async def add_presences_bulk_api(
+    ebi_id: int,
+    payload: PresenceBulkCreate,
+    db: AsyncSession = Depends(get_db_async),
+    _=Depends(get_current_user_async),
 ):
-    presence = add_presence(db, ebi_id, payload)
-    return _presence_to_out(presence, include_pin=True)
+    return PresenceBulkOut(items=await db.run_sync(add_presences_bulk, ebi_id, payload.items))
 
 
 @router.post("/presence/{presence_id}/checkout", response_model=PresenceOut)
-def checkout_presence_api(
+async def checkout_presence_api(
     presence_id: int,
     payload: PresenceCheckout,
-    db: Session = Depends(get_db),
-    _=Depends(get_current_user),
+    db: AsyncSession = Depends(get_db_async),
+    _=Depends(get_current_user_async),
 ):
-    presence = checkout_presence(db, presence_id, payload.pin_code, payload.checkout_justification)
-    return _presence_to_out(presence)
+    return await db.run_sync(
+        lambda session: _presence_to_out(
+            checkout_presence(session, presence_id, payload.pin_code, payload.checkout_justification)
+        )
+    )
+
+
+@router.post("/{ebi_id}/checkout-by-pin", response_model=PresenceOut)
+async def checkout_by_pin_api(
+    ebi_id: int,
+    payload: PresencePinCheckout,
+    db: AsyncSession = Depends(get_db_async),
+    _=Depends(get_current_user_async),
+):
+    presence = await db.run_sync(checkout_by_pin, ebi_id, payload.pin_code)
+    return PresenceOut(**{**presence._mapping, "pin_code": None})
+
+
+@router.post("/{ebi_id}/checkout/bulk", response_model=PresenceBulkCheckoutOut)
+async def checkout_presences_bulk_api(
+    ebi_id: int,
+    payload: PresenceBulkCheckout,
+    db: AsyncSession = Depends(get_db_async),
+    _=Depends(get_current_user_async),
+):
+    result = await db.run_sync(
+        checkout_presences_bulk, ebi_id, payload.pin_codes, payload.presence_ids, payload.checkout_justification
+    )
+    return PresenceBulkCheckoutOut(**result)
 
 
 @router.post("/{ebi_id}/close", response_model=EbiOut)
-def close_ebi_api(
+async def close_ebi_api(
     ebi_id: int,
-    db: Session = Depends(get_db),
-    _=Depends(require_role(UserRole.COORDENADORA, UserRole.ADMINISTRADOR)),
+    checkout_remaining: bool = False,
+    db: AsyncSession = Depends(get_db_async),
+    _=Depends(require_role_async(UserRole.COORDENADORA, UserRole.ADMINISTRADOR)),
 ):
-    ebi = close_ebi(db, ebi_id)
-    return _ebi_to_out(ebi)
+    return await db.run_sync(
+        lambda session: _ebi_to_out(close_ebi(session, ebi_id, checkout_remaining=checkout_remaining))
+    )
 
 
 @router.post("/{ebi_id}/reopen", response_model=EbiOut)
-def reopen_ebi_api(
+async def reopen_ebi_api(
     ebi_id: int,
-    db: Session = Depends(get_db),
-    current_user=Depends(get_current_user),
-    _=Depends(require_role(UserRole.COORDENADORA, UserRole.ADMINISTRADOR)),
+    db: AsyncSession = Depends(get_db_async),
+    current_user=Depends(get_current_user_async),
+    _=Depends(require_role_async(UserRole.COORDENADORA, UserRole.ADMINISTRADOR)),
 ):
-    ebi = reopen_ebi(db, ebi_id, current_user.id)
-    return _ebi_to_out(ebi)
+    return await db.run_sync(lambda session: _ebi_to_out(reopen_ebi(session, ebi_id, current_user.id)))
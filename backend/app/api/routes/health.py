@@ -1,8 +1,10 @@
 from fastapi import APIRouter
 
+from app.core.db import pool_statuses
+
 router = APIRouter()
 
 
 @router.get("/health")
 def health_check():
-    return {"status": "ok"}
+    return {"status": "ok", "db_pools": pool_statuses()}
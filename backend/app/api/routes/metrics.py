@@ -0,0 +1,18 @@
+from fastapi import APIRouter, HTTPException, status
+from fastapi.responses import PlainTextResponse
+
+from app.core.config import settings
+from app.core.db import pool_statuses
+from app.core.metrics import render_metrics
+from app.services.report_service import report_cache
+
+router = APIRouter()
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus scrape target: per-route traffic and latency, threadpool, DB pools and caches (this worker only)."""
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    caches = {"report": report_cache.stats()}
+    return PlainTextResponse(render_metrics(pool_statuses(), caches), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends, File, Form, HTTPException, Response, UploadFile, status
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Request, Response, UploadFile, status
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session, selectinload
 
+from app.core.cache import mark_data_changed
 from app.core.db import get_db
 from app.core.deps import get_current_user
+from app.core.etag import etag_matches, make_etag, not_modified, set_etag
 from app.core.security import get_password_hash
 from app.models.user import User
 from app.models.user_document import DocumentType, UserDocument
@@ -56,12 +58,28 @@ def _user_to_profile_out(user: User) -> ProfileOut:
     )
 
 
+def _profile_etag(db: Session, user: User) -> str:
+    """O usuário já foi carregado na autenticação; só os documentos exigem uma consulta."""
+    documents = db.execute(
+        select(func.count(UserDocument.id), func.max(UserDocument.id), func.max(UserDocument.updated_at))
+        .where(UserDocument.user_id == user.id)
+    ).one()
+    fields = [getattr(user, field) for field in ProfileOut.model_fields if field != "documents"]
+    return make_etag("profile", user.updated_at, *fields, *documents)
+
+
 @router.get("/me", response_model=ProfileOut)
 def get_my_profile(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     """Retorna perfil do usuário autenticado com documentos."""
+    etag = _profile_etag(db, current_user)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
     try:
         stmt = select(User).where(User.id == current_user.id).options(
             selectinload(User.documents)
@@ -113,7 +131,8 @@ def update_my_profile(
     if payload.emergency_contact_phone:
         current_user.emergency_contact_phone = payload.emergency_contact_phone
 
-    db.commit()
+    db.flush()
+    mark_data_changed(db)
 
     stmt = select(User).where(User.id == current_user.id).options(
         selectinload(User.documents)
@@ -173,8 +192,7 @@ def upload_document(
         file_size=file_size,
     )
     db.add(document)
-    db.commit()
-    db.refresh(document)
+    db.flush()
 
     return {"id": document.id, "message": "Documento enviado com sucesso."}
 
@@ -233,4 +251,3 @@ def delete_document(
         )
 
     db.delete(document)
-    db.commit()
@@ -1,27 +1,59 @@
-from fastapi import APIRouter, Depends
+from datetime import date
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.core.db import get_db
-from app.core.deps import require_role
+from app.core.db import get_db_read, get_db_read_async
+from app.core.deps import require_role, require_role_async
 from app.models.user import UserRole
 from app.schemas.report import EbiReport, ReportGeneral
-from app.services.report_service import get_ebi_report, get_general_report
+from app.services.report_service import get_ebi_report_cached, get_general_report_cached, iter_presences_csv
 
 router = APIRouter()
 
 
 @router.get("/general", response_model=ReportGeneral)
-def general_report_api(
-    db: Session = Depends(get_db),
-    _=Depends(require_role(UserRole.ADMINISTRADOR, UserRole.COORDENADORA)),
+async def general_report_api(
+    db: AsyncSession = Depends(get_db_read_async),
+    _=Depends(require_role_async(UserRole.ADMINISTRADOR, UserRole.COORDENADORA)),
 ):
-    return get_general_report(db)
+    return await db.run_sync(get_general_report_cached)
 
 
 @router.get("/ebi/{ebi_id}", response_model=EbiReport)
-def ebi_report_api(
+async def ebi_report_api(
     ebi_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db_read_async),
+    _=Depends(require_role_async(UserRole.ADMINISTRADOR, UserRole.COORDENADORA)),
+):
+    return await db.run_sync(get_ebi_report_cached, ebi_id)
+
+
+# Sync on purpose: the export streams a server-side cursor row by row
+@router.get("/presences.csv")
+def presences_csv_api(
+    date_from: date | None = Query(None, alias="from"),
+    date_to: date | None = Query(None, alias="to"),
+    group: int | None = Query(None, ge=1, le=4),
+    db: Session = Depends(get_db_read),
     _=Depends(require_role(UserRole.ADMINISTRADOR, UserRole.COORDENADORA)),
 ):
-    return get_ebi_report(db, ebi_id)
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid date range")
+
+    def stream():
+        # get_db_read has already run its cleanup by the time the body is sent, so
+        # the generator owns the session from here on.
+        try:
+            yield from iter_presences_csv(db, date_from, date_to, group)
+        finally:
+            db.close()
+
+    filename = f"presencas_{date_from or 'inicio'}_{date_to or 'hoje'}.csv"
+    return StreamingResponse(
+        stream(),
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.db import get_db_async
+from app.core.deps import get_current_user_async
+from app.schemas.sync import SyncRequest, SyncResponse
+from app.services.sync_service import apply_sync_batch
+
+router = APIRouter()
+
+
+@router.post("", response_model=SyncResponse)
+async def sync_api(
+    payload: SyncRequest,
+    db: AsyncSession = Depends(get_db_async),
+    current_user=Depends(get_current_user_async),
+):
+    """Apply operations queued while a tablet was offline (create_child, check_in, checkout)."""
+    return SyncResponse(results=await db.run_sync(apply_sync_batch, current_user.id, payload.operations))
@@ -1,11 +1,13 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Request, Response
 from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
 
-from app.core.db import get_db
+from app.core.db import get_db, get_db_read
 from app.core.deps import require_role
+from app.core.etag import etag_matches, make_etag, not_modified, query_key, set_etag
+from app.core.pagination import decode_cursor, encode_cursor
 from app.models.user import UserRole
-from app.repositories.user_repo import get_user_by_id, list_users
+from app.repositories.user_repo import USER_CURSOR_TYPES, get_user_by_id, list_users, user_cursor_key, user_list_version
 from app.schemas.user import UserCreate, UserList, UserOut, UserUpdate
 from app.services.user_service import create_new_user, update_existing_user
 
@@ -14,14 +16,27 @@ router = APIRouter()
 
 @router.get("", response_model=UserList)
 def list_users_api(
+    request: Request,
+    response: Response,
     search: str | None = None,
     page: int = Query(1, ge=1),
     page_size: int = Query(10, ge=1, le=100),
-    db: Session = Depends(get_db),
+    cursor: str | None = None,
+    limit: int | None = Query(None, ge=1, le=100),
+    include_total: bool = False,
+    db: Session = Depends(get_db_read),
     _=Depends(require_role(UserRole.ADMINISTRADOR, UserRole.COORDENADORA)),
 ):
-    items, total = list_users(db, search, page, page_size)
-    return UserList(items=items, total=total, page=page, page_size=page_size)
+    etag = make_etag("user-list", user_list_version(db), query_key(request))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+
+    page_size = limit or page_size
+    after = decode_cursor(cursor, USER_CURSOR_TYPES) if cursor else None
+    items, total = list_users(db, search, page, page_size, after, include_total)
+    next_cursor = encode_cursor(user_cursor_key(items[-1])) if len(items) == page_size else None
+    return UserList(items=items, total=total, page=page, page_size=page_size, next_cursor=next_cursor)
 
 
 @router.post("", response_model=UserOut)
@@ -1,15 +1,154 @@
+from fastapi import Request
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.sql.dml import UpdateBase
 
 from app.core.config import settings
+from app.core.pool import MeteredAsyncQueuePool, MeteredQueuePool, PoolValidator, pool_status
+from app.core.query_stats import track_queries
+from app.core.replica import client_key, recent_writers
 
-engine = create_engine(settings.database_url, pool_pre_ping=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# No pool_pre_ping: idle connections are validated in the background instead
+# (PoolValidator, started in the app lifespan).
+pool_options = dict(
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout_seconds,
+    pool_recycle=settings.db_pool_recycle_seconds,
+)
+
+
+def _create_engine(url: str):
+    return create_engine(
+        url,
+        poolclass=MeteredQueuePool,
+        connect_args={
+            "application_name": settings.db_application_name,
+            "options": f"-c statement_timeout={settings.db_statement_timeout_ms}",
+        },
+        **pool_options,
+    )
+
+
+def _create_async_engine(url: str):
+    return create_async_engine(
+        url,
+        poolclass=MeteredAsyncQueuePool,
+        connect_args={
+            "server_settings": {
+                "application_name": settings.db_application_name,
+                "statement_timeout": str(settings.db_statement_timeout_ms),
+            }
+        },
+        **pool_options,
+    )
+
+
+class RoutingSession(Session):
+    """Reads go to `info["replica"]` when a read-only dependency set it.
+
+    Flushes and INSERT/UPDATE/DELETE statements always use the primary bind.
+    """
+
+    def get_bind(self, mapper=None, *, clause=None, **kw):
+        replica = self.info.get("replica")
+        if replica is not None and not self._flushing and not isinstance(clause, UpdateBase):
+            return replica
+        return super().get_bind(mapper, clause=clause, **kw)
+
+
+def reads_from_replica(db: Session) -> bool:
+    return db.info.get("replica") is not None
+
+
+def dialect_insert(db: Session):
+    """`insert` with ON CONFLICT support for the session's dialect (Postgres, or SQLite in tests)."""
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql.insert
+    return sqlite.insert
+
+
+# Sync engine: Alembic, seed.py, background threads and the remaining sync routes
+engine = _create_engine(settings.database_url)
+SessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False, bind=engine)
+
+# Async engine for the hot routes: a request waiting on Postgres holds a pool
+# connection, not one of the threadpool's workers.
+async_engine = _create_async_engine(settings.async_database_url)
+# Objects stay loaded after commit; lazy loads outside run_sync would fail
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, sync_session_class=RoutingSession, autoflush=False, expire_on_commit=False
+)
+
+# Optional read replica for reports, listings and exports
+replica_engine = _create_engine(settings.replica_database_url) if settings.db_replica_dsn else None
+async_replica_engine = (
+    _create_async_engine(settings.async_replica_database_url) if settings.db_replica_dsn else None
+)
+
+all_engines = [e for e in (engine, async_engine, replica_engine, async_replica_engine) if e is not None]
+
+# Per-request query count, DB time and repeated statements (QueryStatsMiddleware)
+for _engine in all_engines:
+    track_queries(getattr(_engine, "sync_engine", _engine))
+
+pool_validator = PoolValidator(all_engines, settings.db_pool_validate_seconds)
+
+
+def pool_statuses() -> dict[str, dict]:
+    """pool_status() of every configured engine, for /health and /metrics."""
+    pools = {"sync": engine, "async": async_engine, "replica": replica_engine, "replica_async": async_replica_engine}
+    return {name: pool_status(pool) for name, pool in pools.items() if pool is not None}
 
 
 def get_db():
+    """Request-scoped unit of work.
+
+    Repositories and services only flush; the request commits once after the
+    route returns (before the response is sent) and rolls back if it raises.
+    """
+    db = SessionLocal()
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+async def get_db_async():
+    """Async unit of work, like get_db; repositories run on it through `await db.run_sync(fn, ...)`."""
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+
+
+def _read_on_replica(request: Request) -> bool:
+    return not recent_writers.wrote_recently(client_key(request))
+
+
+def get_db_read(request: Request):
+    """Like get_db, but reads go to the replica unless this client wrote recently."""
     db = SessionLocal()
+    if replica_engine is not None and _read_on_replica(request):
+        db.info["replica"] = replica_engine
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_db_read_async(request: Request):
+    """Like get_db_async, but reads go to the replica unless this client wrote recently."""
+    async with AsyncSessionLocal() as db:
+        if async_replica_engine is not None and _read_on_replica(request):
+            db.info["replica"] = async_replica_engine.sync_engine
+        yield db
@@ -1,24 +1,74 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
-from app.core.db import get_db
+from app.core.db import get_db, get_db_async
+from app.core.security import STREAM_TOKEN_SCOPE
 from app.models.user import UserRole
 from app.repositories.user_repo import get_user_by_id
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login", auto_error=False)
 
 
 def get_current_user(
     db: Session = Depends(get_db),
     token: str = Depends(oauth2_scheme),
 ):
+    return _user_from_token(db, token)
+
+
+async def get_current_user_async(
+    db: AsyncSession = Depends(get_db_async),
+    token: str = Depends(oauth2_scheme),
+):
+    """For async routes: the user is loaded on (and shares) the route's async session."""
+    return await db.run_sync(_user_from_token, token)
+
+
+async def get_stream_user(
+    ebi_id: int,
+    db: AsyncSession = Depends(get_db_async),
+    token: str | None = Depends(optional_oauth2_scheme),
+    stream_token: str | None = Query(None),
+):
+    """EventSource cannot send headers, so streams also accept ?stream_token=.
+
+    That token comes from `POST /ebi/{id}/events/token`: short-lived and valid
+    only for this EBI's stream, since URLs end up in proxy and access logs.
+    """
+    if token:
+        return await db.run_sync(_user_from_token, token)
+    if not stream_token:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+    payload = _decode_token(stream_token, scope=STREAM_TOKEN_SCOPE)
+    if payload.get("ebi_id") != ebi_id:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    return await db.run_sync(_user_from_payload, payload)
+
+
+def _decode_token(token: str, scope: str | None = None) -> dict:
+    """Access tokens carry no scope; a scoped token is only accepted where that scope is expected."""
     try:
         payload = jwt.decode(token, settings.app_secret_key, algorithms=["HS256"])
+    except JWTError:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    if payload.get("scope") != scope:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    return payload
+
+
+def _user_from_token(db: Session, token: str):
+    return _user_from_payload(db, _decode_token(token))
+
+
+def _user_from_payload(db: Session, payload: dict):
+    try:
         user_id = int(payload.get("sub"))
-    except (JWTError, TypeError, ValueError):
+    except (TypeError, ValueError):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
 
     user = get_user_by_id(db, user_id)
@@ -36,3 +86,12 @@ def require_role(*roles: UserRole):
 
     return checker
 
+
+def require_role_async(*roles: UserRole):
+    """`require_role` for async routes."""
+    async def checker(user=Depends(get_current_user_async)):
+        if user.role not in roles:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
+        return user
+
+    return checker
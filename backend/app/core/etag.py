@@ -0,0 +1,34 @@
+import hashlib
+
+from fastapi import Request, Response
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag from the values that determine a representation (a version tuple)."""
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def query_key(request: Request) -> tuple:
+    """Query parameters in a canonical order: one list ETag per filter, page and cursor."""
+    return tuple(sorted(request.query_params.multi_items()))
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = {candidate.strip() for candidate in header.split(",")}
+    return etag in candidates or "*" in candidates
+
+
+def set_etag(response: Response, etag: str) -> None:
+    # no-cache: clients keep the body but revalidate every time, getting a 304 when unchanged
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
+
+
+def not_modified(etag: str) -> Response:
+    response = Response(status_code=304)
+    set_etag(response, etag)
+    return response
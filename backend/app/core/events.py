@@ -0,0 +1,182 @@
+import asyncio
+import json
+import logging
+import select
+import threading
+from typing import AsyncIterator, Awaitable, Callable
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import event, func
+from sqlalchemy import select as sql_select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+EBI_EVENTS_CHANNEL = "ebi_events"
+# Postgres rejects NOTIFY payloads of 8000 bytes or more, failing the whole transaction
+MAX_NOTIFY_BYTES = 7900
+
+
+class Subscription:
+    """One stream client: a bounded queue owned by the event loop that serves it."""
+
+    def __init__(self, ebi_id: int, loop: asyncio.AbstractEventLoop, max_queue: int):
+        self.ebi_id = ebi_id
+        self.queue: asyncio.Queue[dict] = asyncio.Queue(maxsize=max_queue)
+        self._loop = loop
+
+    def _put(self, event: dict) -> None:
+        if self.queue.full():
+            # Slow consumer: drop its backlog and tell it to refetch the EBI
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            event = {"type": "resync", "ebi_id": self.ebi_id, "data": None}
+        self.queue.put_nowait(event)
+
+    def push(self, event: dict) -> None:
+        """Thread-safe; publishers run in the threadpool, not on the loop."""
+        try:
+            self._loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # Loop already closed; the stream's finally block unsubscribes it
+            pass
+
+
+class EventBroker:
+    """In-process pub/sub of EBI events, keyed by EBI id."""
+
+    def __init__(self, max_queue: int):
+        self.max_queue = max_queue
+        self._lock = threading.Lock()
+        self._subscribers: dict[int, set[Subscription]] = {}
+
+    def subscribe(self, ebi_id: int) -> Subscription:
+        """Call from the event loop that will consume the subscription."""
+        subscription = Subscription(ebi_id, asyncio.get_running_loop(), self.max_queue)
+        with self._lock:
+            self._subscribers.setdefault(ebi_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.ebi_id)
+            if subscribers is None:
+                return
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.ebi_id]
+
+    def publish_local(self, ebi_id: int, event: dict) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.get(ebi_id, ()))
+        for subscription in subscribers:
+            subscription.push(event)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+
+ebi_events = EventBroker(settings.ebi_events_queue_size)
+_PENDING_EVENTS_KEY = "pending_ebi_events"
+
+
+def publish_ebi_event(db: Session, ebi_id: int, event_type: str, data: dict | None = None) -> None:
+    """Queue an event in the caller's transaction; it is delivered only if that commits.
+
+    Events carry ids only; clients refetch what they show. On Postgres this
+    is a NOTIFY, which every worker (this one included) receives through its
+    listener thread. Elsewhere (tests, single process) the event is handed to
+    the local broker after commit. A payload too large for NOTIFY (e.g.
+    closing an EBI with hundreds of open presences) goes out as `resync`.
+    """
+    event = jsonable_encoder({"type": event_type, "ebi_id": ebi_id, "data": data})
+    payload = json.dumps(event)
+    if len(payload.encode()) > MAX_NOTIFY_BYTES:
+        event = {"type": "resync", "ebi_id": ebi_id, "data": None}
+        payload = json.dumps(event)
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(sql_select(func.pg_notify(EBI_EVENTS_CHANNEL, payload)))
+    else:
+        db.info.setdefault(_PENDING_EVENTS_KEY, []).append(event)
+
+
+@event.listens_for(Session, "after_commit")
+def _deliver_pending_events(session: Session) -> None:
+    for pending in session.info.pop(_PENDING_EVENTS_KEY, []):
+        ebi_events.publish_local(pending["ebi_id"], pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending_events(session: Session) -> None:
+    session.info.pop(_PENDING_EVENTS_KEY, None)
+
+
+def format_sse(event: dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+async def stream_events(
+    subscription: Subscription,
+    is_disconnected: Callable[[], Awaitable[bool]],
+    keepalive_seconds: float,
+) -> AsyncIterator[str]:
+    """SSE body for one subscription; comments keep proxies from closing idle streams."""
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), keepalive_seconds)
+            except asyncio.TimeoutError:
+                if await is_disconnected():
+                    break
+                yield ": keepalive\n\n"
+                continue
+            yield format_sse(event)
+    finally:
+        ebi_events.unsubscribe(subscription)
+
+
+class PgEventListener(threading.Thread):
+    """LISTENs on the events channel and hands notifications to the local broker."""
+
+    def __init__(self, engine: Engine, broker: EventBroker, poll_seconds: float = 5.0):
+        super().__init__(name="ebi-events-listener", daemon=True)
+        self.engine = engine
+        self.broker = broker
+        self.poll_seconds = poll_seconds
+        self._stopped = threading.Event()
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def run(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                self._listen()
+            except Exception:
+                logger.warning("Event listener disconnected; retrying", exc_info=True)
+                self._stopped.wait(self.poll_seconds)
+
+    def _listen(self) -> None:
+        # A dedicated connection: LISTEN state must not leak back into the pool
+        connection = self.engine.raw_connection()
+        connection.detach()
+        driver_connection = connection.driver_connection
+        try:
+            driver_connection.autocommit = True
+            with driver_connection.cursor() as cursor:
+                cursor.execute(f"LISTEN {EBI_EVENTS_CHANNEL}")
+            while not self._stopped.is_set():
+                if select.select([driver_connection], [], [], self.poll_seconds) == ([], [], []):
+                    continue
+                driver_connection.poll()
+                while driver_connection.notifies:
+                    notification = driver_connection.notifies.pop(0)
+                    event = json.loads(notification.payload)
+                    self.broker.publish_local(event["ebi_id"], event)
+        finally:
+            connection.close()
@@ -0,0 +1,206 @@
+import threading
+import time
+from collections import defaultdict
+
+from anyio import to_thread
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Seconds; from a cached listing up to a slow report or bcrypt login under load
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class HttpMetrics:
+    """Request counters, latency histograms and in-flight gauges per route template (per process)."""
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._requests: dict[tuple[str, str, int], int] = defaultdict(int)
+        self._in_flight: dict[tuple[str, str], int] = defaultdict(int)
+        # (method, route) -> [count per bucket..., count, sum]
+        self._latency: dict[tuple[str, str], list[float]] = {}
+
+    def started(self, method: str, route: str) -> None:
+        with self._lock:
+            self._in_flight[(method, route)] += 1
+
+    def finished(self, method: str, route: str) -> None:
+        with self._lock:
+            self._in_flight[(method, route)] -= 1
+
+    def observe(self, method: str, route: str, status: int, seconds: float) -> None:
+        with self._lock:
+            self._requests[(method, route, status)] += 1
+            series = self._latency.setdefault((method, route), [0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series[i] += 1
+            series[-2] += 1
+            series[-1] += seconds
+
+    def clear(self) -> None:
+        with self._lock:
+            self._requests.clear()
+            self._in_flight.clear()
+            self._latency.clear()
+
+    def render(self) -> list[str]:
+        with self._lock:
+            requests = sorted(self._requests.items())
+            in_flight = sorted(self._in_flight.items())
+            latency = sorted((key, list(series)) for key, series in self._latency.items())
+
+        lines = [
+            "# HELP ebi_http_requests_total Requests by route template and status code.",
+            "# TYPE ebi_http_requests_total counter",
+        ]
+        for (method, route, status), count in requests:
+            lines.append(f"ebi_http_requests_total{_labels(method=method, route=route, status=status)} {count}")
+
+        lines += [
+            "# HELP ebi_http_request_duration_seconds Time until the response starts, by route template.",
+            "# TYPE ebi_http_request_duration_seconds histogram",
+        ]
+        for (method, route), series in latency:
+            for bound, count in zip(self.buckets, series):
+                labels = _labels(method=method, route=route, le=_number(bound))
+                lines.append(f"ebi_http_request_duration_seconds_bucket{labels} {count}")
+            labels = _labels(method=method, route=route, le="+Inf")
+            lines.append(f"ebi_http_request_duration_seconds_bucket{labels} {series[-2]}")
+            labels = _labels(method=method, route=route)
+            lines.append(f"ebi_http_request_duration_seconds_sum{labels} {_number(series[-1])}")
+            lines.append(f"ebi_http_request_duration_seconds_count{labels} {series[-2]}")
+
+        lines += [
+            "# HELP ebi_http_requests_in_flight Requests being served, by route template.",
+            "# TYPE ebi_http_requests_in_flight gauge",
+        ]
+        for (method, route), count in in_flight:
+            lines.append(f"ebi_http_requests_in_flight{_labels(method=method, route=route)} {count}")
+        return lines
+
+
+http_metrics = HttpMetrics()
+
+
+def route_template(scope: Scope) -> str:
+    # Label by template ("/api/v1/ebi/{ebi_id}"), never by raw path: ids would explode the series
+    app = scope.get("app")
+    for route in getattr(app, "routes", ()):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", UNMATCHED_ROUTE)
+    return UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """Feeds `http_metrics`; latency stops at the response start, so event streams count like any other request."""
+
+    def __init__(self, app: ASGIApp, metrics: HttpMetrics = http_metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = route_template(scope)
+        started = time.perf_counter()
+        responded = False
+
+        async def send_and_observe(message: Message) -> None:
+            nonlocal responded
+            if message["type"] == "http.response.start":
+                responded = True
+                self.metrics.observe(method, route, message["status"], time.perf_counter() - started)
+            await send(message)
+
+        self.metrics.started(method, route)
+        try:
+            await self.app(scope, receive, send_and_observe)
+        except Exception:
+            if not responded:
+                self.metrics.observe(method, route, 500, time.perf_counter() - started)
+            raise
+        finally:
+            self.metrics.finished(method, route)
+
+
+# pool_status() key -> (metric, type, help, scale)
+POOL_METRICS = {
+    "size": ("ebi_db_pool_size", "gauge", "Configured pool size.", 1),
+    "in_use": ("ebi_db_pool_in_use", "gauge", "Connections checked out.", 1),
+    "idle": ("ebi_db_pool_idle", "gauge", "Idle pooled connections.", 1),
+    "overflow": ("ebi_db_pool_overflow", "gauge", "Connections opened beyond the pool size.", 1),
+    "checkouts": ("ebi_db_pool_checkouts_total", "counter", "Successful checkouts.", 1),
+    "timeouts": ("ebi_db_pool_checkout_timeouts_total", "counter", "Checkouts that hit the pool timeout.", 1),
+    "wait_avg_ms": ("ebi_db_pool_wait_seconds_avg", "gauge", "Average checkout wait.", 0.001),
+    "wait_max_ms": ("ebi_db_pool_wait_seconds_max", "gauge", "Longest checkout wait.", 0.001),
+}
+
+
+def render_pool_metrics(pools: dict[str, dict]) -> list[str]:
+    lines = []
+    for key, (metric, kind, help_text, scale) in POOL_METRICS.items():
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}"]
+        for name, status in pools.items():
+            if key in status:
+                lines.append(f"{metric}{_labels(pool=name)} {_number(round(status[key] * scale, 6))}")
+    return lines
+
+
+# TTLCache.stats() key -> (metric, type, help)
+CACHE_METRICS = {
+    "entries": ("ebi_cache_entries", "gauge", "Entries held."),
+    "hits": ("ebi_cache_hits_total", "counter", "Lookups answered from the cache."),
+    "misses": ("ebi_cache_misses_total", "counter", "Lookups that missed or found an expired entry."),
+    "evictions": ("ebi_cache_evictions_total", "counter", "Entries dropped to stay under the size limit."),
+}
+
+
+def render_cache_metrics(caches: dict[str, dict]) -> list[str]:
+    lines = []
+    for key, (metric, kind, help_text) in CACHE_METRICS.items():
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}"]
+        for name, stats in caches.items():
+            lines.append(f"{metric}{_labels(cache=name)} {stats[key]}")
+    return lines
+
+
+def render_threadpool_metrics() -> list[str]:
+    # Sync routes and run_in_threadpool share anyio's default limiter; must run on the event loop
+    stats = to_thread.current_default_thread_limiter().statistics()
+    return [
+        "# HELP ebi_threadpool_capacity Worker threads available to sync routes.",
+        "# TYPE ebi_threadpool_capacity gauge",
+        f"ebi_threadpool_capacity {_number(stats.total_tokens)}",
+        "# HELP ebi_threadpool_busy Worker threads in use.",
+        "# TYPE ebi_threadpool_busy gauge",
+        f"ebi_threadpool_busy {stats.borrowed_tokens}",
+        "# HELP ebi_threadpool_queued Calls waiting for a free worker thread.",
+        "# TYPE ebi_threadpool_queued gauge",
+        f"ebi_threadpool_queued {stats.tasks_waiting}",
+    ]
+
+
+def render_metrics(pools: dict[str, dict], caches: dict[str, dict]) -> str:
+    """Prometheus text exposition format (0.0.4)."""
+    lines = http_metrics.render() + render_threadpool_metrics() + render_pool_metrics(pools) + render_cache_metrics(caches)
+    return "\n".join(lines) + "\n"
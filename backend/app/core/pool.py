@@ -0,0 +1,155 @@
+import asyncio
+import logging
+import threading
+import time
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+logger = logging.getLogger(__name__)
+
+
+class PoolStats:
+    """Checkout counters for one pool; updated from any thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record(self, waited: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_avg_ms": round(1000 * self.wait_total / attempts, 2) if attempts else 0.0,
+                "wait_max_ms": round(1000 * self.wait_max, 2),
+            }
+
+
+class _MeteredPool:
+    """Times every checkout: waiting for a free slot plus opening a new connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.stats.record(time.perf_counter() - started, timed_out=True)
+            raise
+        self.stats.record(time.perf_counter() - started)
+        return connection
+
+    def recreate(self):
+        # engine.dispose() swaps the pool; the counters carry over
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+
+class MeteredQueuePool(_MeteredPool, QueuePool):
+    pass
+
+
+class MeteredAsyncQueuePool(_MeteredPool, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_status(engine: Engine | AsyncEngine) -> dict:
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return {"pool": type(pool).__name__}
+    status = {
+        "size": pool.size(),
+        "in_use": pool.checkedout(),
+        "idle": pool.checkedin(),
+        # Negative while the pool itself is not yet full
+        "overflow": max(pool.overflow(), 0),
+    }
+    stats = getattr(pool, "stats", None)
+    if stats is not None:
+        status.update(stats.snapshot())
+    return status
+
+
+def _ping_idle(engine: Engine) -> int:
+    # QueuePool hands out the oldest idle connection first (FIFO) and a ping
+    # returns it to the back, so `idle` checkouts visit each one once.
+    idle = engine.pool.checkedin()
+    for _ in range(idle):
+        with engine.connect() as connection:
+            connection.exec_driver_sql("SELECT 1")
+    return idle
+
+
+async def _ping_idle_async(engine: AsyncEngine) -> int:
+    idle = engine.pool.checkedin()
+    for _ in range(idle):
+        async with engine.connect() as connection:
+            await connection.exec_driver_sql("SELECT 1")
+    return idle
+
+
+class PoolValidator:
+    """Pings idle pooled connections in the background, instead of `pool_pre_ping`.
+
+    Pre-ping costs a round trip on every checkout. Here a dead connection
+    fails the ping as a disconnect, SQLAlchemy invalidates the whole pool,
+    and the next checkout opens a fresh connection instead of failing a
+    request.
+    """
+
+    def __init__(self, engines: list[Engine | AsyncEngine], interval: float):
+        self._engines = engines
+        self._interval = interval
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="pool-validator")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._interval)
+            await self.validate_once()
+
+    async def validate_once(self) -> int:
+        pinged = 0
+        for engine in self._engines:
+            try:
+                if isinstance(engine, AsyncEngine):
+                    pinged += await _ping_idle_async(engine)
+                else:
+                    pinged += await run_in_threadpool(_ping_idle, engine)
+            except Exception:
+                logger.warning("Pool validation failed for %s", engine.url.render_as_string(), exc_info=True)
+        return pinged
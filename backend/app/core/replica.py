@@ -0,0 +1,72 @@
+import threading
+import time
+from typing import Callable
+
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+def client_key(request: Request) -> str:
+    # The bearer token identifies one logged-in client; the frontend sends no cookies
+    return request.headers.get("authorization") or (request.client.host if request.client else "")
+
+
+class RecentWriters:
+    """Clients that wrote within the last `window_seconds` (per process).
+
+    Their reads stay on the primary until the replica has had time to catch up.
+    """
+
+    def __init__(self, window_seconds: float, clock: Callable[[], float] = time.monotonic):
+        self.window_seconds = window_seconds
+        self._clock = clock
+        self._until: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def mark(self, key: str) -> None:
+        now = self._clock()
+        with self._lock:
+            self._until[key] = now + self.window_seconds
+            if len(self._until) > 1024:
+                self._until = {k: until for k, until in self._until.items() if until > now}
+
+    def wrote_recently(self, key: str) -> bool:
+        with self._lock:
+            until = self._until.get(key)
+        return until is not None and until > self._clock()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._until.clear()
+
+
+recent_writers = RecentWriters(settings.db_replica_sticky_seconds)
+
+
+class ReadYourWritesMiddleware:
+    """Marks the client as a recent writer when a write request starts its response.
+
+    The route has committed by then, and the mark lands before the client can
+    send its next request.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        key = client_key(Request(scope))
+
+        async def send_and_mark(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                recent_writers.mark(key)
+            await send(message)
+
+        await self.app(scope, receive, send_and_mark)
@@ -0,0 +1,37 @@
+import re
+import unicodedata
+
+# Same default as pg_trgm.similarity_threshold, used by the `%` operator
+SIMILARITY_THRESHOLD = 0.3
+
+_WORD_RE = re.compile(r"[^\W_]+")
+
+
+def normalize_name(value: str) -> str:
+    """Lowercase, strip accents and collapse whitespace ("  João  " -> "joao")."""
+    decomposed = unicodedata.normalize("NFKD", value)
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return " ".join(stripped.lower().split())
+
+
+def trigrams(value: str) -> set[str]:
+    """Trigram set as pg_trgm builds it: per word, padded with two leading and one trailing space."""
+    result = set()
+    for word in _WORD_RE.findall(value.lower()):
+        padded = f"  {word} "
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return result
+
+
+def similarity(left: str | None, right: str | None) -> float:
+    """Pure-Python `similarity()` from pg_trgm, for engines without the extension."""
+    left_trigrams = trigrams(left or "")
+    right_trigrams = trigrams(right or "")
+    if not left_trigrams or not right_trigrams:
+        return 0.0
+    return len(left_trigrams & right_trigrams) / len(left_trigrams | right_trigrams)
+
+
+def register_sqlite_functions(dbapi_connection, connection_record=None) -> None:
+    """`connect` event hook that gives SQLite the SQL functions used by search queries."""
+    dbapi_connection.create_function("similarity", 2, similarity, deterministic=True)
@@ -8,6 +8,7 @@ from app.core.config import settings
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 ALGORITHM = "HS256"
+STREAM_TOKEN_SCOPE = "ebi-events"
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -25,3 +26,10 @@ def create_access_token(subject: str, role: str, expires_minutes: int | None = N
     expire = datetime.now(timezone.utc) + timedelta(minutes=expires_minutes)
     payload: dict[str, Any] = {"sub": subject, "role": role, "exp": expire}
     return jwt.encode(payload, settings.app_secret_key, algorithm=ALGORITHM)
+
+
+def create_stream_token(subject: str, ebi_id: int) -> str:
+    """Token for one EBI's event stream; it travels in the URL, so it opens nothing else."""
+    expire = datetime.now(timezone.utc) + timedelta(seconds=settings.ebi_events_token_expire_seconds)
+    payload: dict[str, Any] = {"sub": subject, "scope": STREAM_TOKEN_SCOPE, "ebi_id": ebi_id, "exp": expire}
+    return jwt.encode(payload, settings.app_secret_key, algorithm=ALGORITHM)
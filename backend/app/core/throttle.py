@@ -0,0 +1,47 @@
+import threading
+import time
+from collections import deque
+from typing import Callable, Hashable
+
+from app.core.config import settings
+
+
+class AttemptLimiter:
+    """Failed attempts per key within a sliding window (per process).
+
+    A key with `max_failures` failures in the last `window_seconds` stays
+    blocked until the oldest of them leaves the window.
+    """
+
+    def __init__(self, max_failures: int, window_seconds: float, clock: Callable[[], float] = time.monotonic):
+        self.max_failures = max_failures
+        self.window_seconds = window_seconds
+        self._clock = clock
+        self._failures: dict[Hashable, deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def retry_after(self, key: Hashable) -> float:
+        """Seconds until `key` may try again; 0 when it is not blocked."""
+        with self._lock:
+            failures = self._failures.get(key)
+            if failures is None or len(failures) < self.max_failures:
+                return 0.0
+            return max(failures[0] + self.window_seconds - self._clock(), 0.0)
+
+    def fail(self, key: Hashable, count: int = 1) -> None:
+        now = self._clock()
+        with self._lock:
+            failures = self._failures.get(key)
+            if failures is None:
+                failures = self._failures[key] = deque(maxlen=self.max_failures)
+            failures.extend([now] * min(count, self.max_failures))
+            if len(self._failures) > 1024:
+                cutoff = now - self.window_seconds
+                self._failures = {k: f for k, f in self._failures.items() if f[-1] > cutoff}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._failures.clear()
+
+
+pin_attempts = AttemptLimiter(settings.pin_max_failed_attempts, settings.pin_attempt_window_seconds)
@@ -1,13 +1,43 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.api_router import api_router
 from app.api.error_handlers import add_error_handlers
 from app.core.config import settings
+from app.core.db import async_engine, engine, pool_validator
+from app.core.events import PgEventListener, ebi_events
+from app.core.metrics import MetricsMiddleware
+from app.core.query_stats import QueryStatsMiddleware
+from app.core.replica import ReadYourWritesMiddleware
+from app.services.suggest_service import warm_up_child_suggest_index
+from app.services.whatsapp_service import whatsapp_configured, whatsapp_dispatcher
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.child_suggest_warmup:
+        await run_in_threadpool(warm_up_child_suggest_index)
+    listener = None
+    if settings.ebi_events_listen and engine.dialect.name == "postgresql":
+        listener = PgEventListener(engine, ebi_events)
+        listener.start()
+    if settings.whatsapp_enabled and settings.whatsapp_dispatcher_enabled and whatsapp_configured():
+        await whatsapp_dispatcher.start()
+    if settings.db_pool_validate_seconds > 0:
+        await pool_validator.start()
+    yield
+    await pool_validator.stop()
+    await whatsapp_dispatcher.stop()
+    if listener is not None:
+        listener.stop()
+    await async_engine.dispose()
 
 
 def create_app() -> FastAPI:
-    app = FastAPI(title="EBI Vila Paula API", version="1.0.0")
+    app = FastAPI(title="EBI Vila Paula API", version="1.0.0", lifespan=lifespan)
 
     app.add_middleware(
         CORSMiddleware,
@@ -16,6 +46,10 @@ def create_app() -> FastAPI:
         allow_methods=["*"] ,
         allow_headers=["*"],
     )
+    app.add_middleware(ReadYourWritesMiddleware)
+    app.add_middleware(QueryStatsMiddleware)
+    # Outermost: its latency includes every other middleware
+    app.add_middleware(MetricsMiddleware)
 
     app.include_router(api_router, prefix="/api/v1")
     add_error_handlers(app)
@@ -1,10 +1,14 @@
 from app.models.association import ebi_colaboradoras
 from app.models.child import Child
 from app.models.guardian import ChildGuardian
+from app.models.notification_outbox import NotificationOutbox
 from app.models.ebi import Ebi
 from app.models.ebi_audit import EbiAudit
+from app.models.list_version import ListVersion
 from app.models.presence import EbiPresence
+from app.models.presence_rollup import PresenceMonthlyRollup
+from app.models.sync_operation import SyncOperation
 from app.models.user import User
 from app.models.user_document import UserDocument
 
-__all__ = ["ebi_colaboradoras", "Child", "ChildGuardian", "Ebi", "EbiAudit", "EbiPresence", "User", "UserDocument"]
+__all__ = ["ebi_colaboradoras", "Child", "ChildGuardian", "Ebi", "EbiAudit", "EbiPresence", "ListVersion", "NotificationOutbox", "PresenceMonthlyRollup", "SyncOperation", "User", "UserDocument"]
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, ForeignKey, Integer, Table
+from sqlalchemy import Column, ForeignKey, Index, Integer, Table
 
 from app.models.base import Base
 
@@ -9,3 +9,5 @@ ebi_colaboradoras = Table(
     Column("ebi_id", ForeignKey("ebi.id", ondelete="CASCADE"), primary_key=True),
     Column("user_id", ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
 )
+# The primary key leads with ebi_id; lookups by collaborator need their own
+Index("ix_ebi_colaboradoras_user", ebi_colaboradoras.c.user_id)
@@ -5,7 +5,9 @@ from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
 
 class Base(DeclarativeBase):
-    pass
+    # Server-generated columns (timestamps) come back in the INSERT/UPDATE
+    # RETURNING clause instead of a refresh or lazy load after the flush.
+    __mapper_args__ = {"eager_defaults": True}
 
 
 class TimestampMixin:
@@ -1,6 +1,7 @@
-from sqlalchemy import Integer, String
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import Index, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column, relationship, validates
 
+from app.core.search import normalize_name
 from app.models.base import Base, TimestampMixin
 
 
@@ -9,6 +10,8 @@ class Child(Base, TimestampMixin):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     name: Mapped[str] = mapped_column(String(200), nullable=False, index=True)
+    # Lowercase, accent-free copy of `name` for trigram search (ix_children_name_trgm)
+    name_normalized: Mapped[str] = mapped_column(String(200), nullable=False)
     guardian_name: Mapped[str] = mapped_column(String(200), nullable=False)
     guardian_phone: Mapped[str] = mapped_column(String(40), nullable=False)
 
@@ -17,3 +20,17 @@ class Child(Base, TimestampMixin):
         back_populates="child",
         cascade="all, delete-orphan",
     )
+
+    @validates("name")
+    def _sync_name_normalized(self, key, value):
+        self.name_normalized = normalize_name(value) if value else value
+        return value
+
+
+Index("ix_children_name_id", Child.name, Child.id)
+Index(
+    "ix_children_name_trgm",
+    Child.name_normalized,
+    postgresql_using="gin",
+    postgresql_ops={"name_normalized": "gin_trgm_ops"},
+)
@@ -29,3 +29,6 @@ class Ebi(Base, TimestampMixin):
 
 
 Index("ix_ebi_date_group", Ebi.ebi_date, Ebi.group_number)
+Index("ix_ebi_date_id", Ebi.ebi_date, Ebi.id)
+# Also serves the coordinator filter in newest-first order
+Index("ix_ebi_coordinator", Ebi.coordinator_id, Ebi.ebi_date, Ebi.id)
@@ -1,4 +1,4 @@
-from sqlalchemy import ForeignKey, Integer, String
+from sqlalchemy import ForeignKey, Index, Integer, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.models.base import Base, TimestampMixin
@@ -13,3 +13,7 @@ class ChildGuardian(Base, TimestampMixin):
     phone: Mapped[str] = mapped_column(String(40), nullable=False)
 
     child = relationship("Child", back_populates="guardians")
+
+
+# Created by 0003_add_child_guardians
+Index("ix_child_guardians_child_id", ChildGuardian.child_id)
@@ -0,0 +1,24 @@
+from sqlalchemy import BigInteger, String, event
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+LIST_NAMES = ("ebi", "children", "users")
+
+
+class ListVersion(Base):
+    """Change counter per list, bumped in the writing transaction (see list_version_repo).
+
+    The row lock orders the bumps like the commits, so a list ETag built from
+    a committed counter never misses a write, unlike count + max(updated_at).
+    """
+
+    __tablename__ = "list_versions"
+
+    name: Mapped[str] = mapped_column(String(32), primary_key=True)
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+
+
+@event.listens_for(ListVersion.__table__, "after_create")
+def _insert_list_rows(target, connection, **kw):
+    connection.execute(target.insert(), [{"name": name, "version": 0} for name in LIST_NAMES])
@@ -0,0 +1,38 @@
+import enum
+from datetime import datetime
+
+from sqlalchemy import DateTime, Enum, ForeignKey, Index, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base, TimestampMixin
+
+
+class OutboxStatus(str, enum.Enum):
+    PENDING = "PENDING"
+    SENT = "SENT"
+    FAILED = "FAILED"
+
+
+class NotificationOutbox(Base, TimestampMixin):
+    """WhatsApp PIN message written with its presence and delivered by the dispatcher."""
+
+    __tablename__ = "notification_outbox"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    presence_id: Mapped[int | None] = mapped_column(ForeignKey("ebi_presence.id", ondelete="SET NULL"), nullable=True)
+    to_phone: Mapped[str] = mapped_column(String(40), nullable=False)
+    child_name: Mapped[str] = mapped_column(String(200), nullable=False)
+    pin_code: Mapped[str] = mapped_column(String(4), nullable=False)
+    status: Mapped[OutboxStatus] = mapped_column(Enum(OutboxStatus, name="outbox_status"), nullable=False)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    next_attempt_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    sent_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    last_error: Mapped[str | None] = mapped_column(String(500), nullable=True)
+
+
+# Partial on Postgres: the dispatcher only ever scans pending messages
+Index(
+    "ix_outbox_pending",
+    NotificationOutbox.next_attempt_at,
+    postgresql_where=NotificationOutbox.status == OutboxStatus.PENDING,
+)
@@ -8,6 +8,7 @@ from app.models.base import Base, TimestampMixin
 
 class EbiPresence(Base, TimestampMixin):
     __tablename__ = "ebi_presence"
+    __table_args__ = (UniqueConstraint("ebi_id", "child_id", name="uq_presence_ebi_child"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     ebi_id: Mapped[int] = mapped_column(ForeignKey("ebi.id", ondelete="CASCADE"), nullable=False)
@@ -25,5 +26,14 @@ class EbiPresence(Base, TimestampMixin):
 
 Index("ix_presence_ebi", EbiPresence.ebi_id)
 Index("ix_presence_child", EbiPresence.child_id)
-UniqueConstraint("ebi_id", "child_id", name="uq_presence_ebi_child")
+Index("ix_presence_ebi_pin", EbiPresence.ebi_id, EbiPresence.pin_code)
+# A kiosk PIN identifies at most one open presence of the EBI
+Index(
+    "ux_presence_open_pin",
+    EbiPresence.ebi_id,
+    EbiPresence.pin_code,
+    unique=True,
+    postgresql_where=EbiPresence.exit_at.is_(None),
+    sqlite_where=EbiPresence.exit_at.is_(None),
+)
 
@@ -0,0 +1,19 @@
+from datetime import date
+
+from sqlalchemy import BigInteger, Date, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base, TimestampMixin
+
+
+class PresenceMonthlyRollup(Base, TimestampMixin):
+    """Attendance totals per (month, group), kept up to date by ebi_service."""
+
+    __tablename__ = "presence_monthly_rollup"
+
+    month: Mapped[date] = mapped_column(Date, primary_key=True)
+    group_number: Mapped[int] = mapped_column(Integer, primary_key=True)
+    ebi_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    presence_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    checked_out_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    total_stay_seconds: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
@@ -0,0 +1,19 @@
+from sqlalchemy import JSON, ForeignKey, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base, TimestampMixin
+
+
+class SyncOperation(Base, TimestampMixin):
+    """Outcome of one offline operation, keyed by the user and its client-generated idempotency key."""
+
+    __tablename__ = "sync_operations"
+
+    # Keys are only unique per client: another user's key never replays or blocks this one
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), primary_key=True)
+    idempotency_key: Mapped[str] = mapped_column(String(100), primary_key=True)
+    op: Mapped[str] = mapped_column(String(30), nullable=False)
+    request_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    status_code: Mapped[int] = mapped_column(Integer, nullable=False)
+    result: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    detail: Mapped[str | None] = mapped_column(String(500), nullable=True)
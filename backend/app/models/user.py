@@ -2,7 +2,7 @@ import enum
 
 from datetime import date
 
-from sqlalchemy import Date, Enum, Integer, String
+from sqlalchemy import Date, Enum, Index, Integer, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.models.base import Base, TimestampMixin
@@ -39,3 +39,10 @@ class User(Base, TimestampMixin):
     coordinated_ebis = relationship("Ebi", back_populates="coordinator")
     presences = relationship("Ebi", secondary="ebi_colaboradoras", viewonly=True)
     documents = relationship("UserDocument", back_populates="user", cascade="all, delete-orphan")
+
+
+Index("ix_users_full_name_id", User.full_name, User.id)
+# Covers the general report's role/group totals (index-only scan)
+Index("ix_users_role_group", User.role, User.group_number)
+# Lookups by group alone; ix_users_role_group leads with role and cannot serve them
+Index("ix_users_group_number", User.group_number)
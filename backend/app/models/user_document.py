@@ -1,6 +1,6 @@
 import enum
 
-from sqlalchemy import Enum, ForeignKey, Integer, LargeBinary, String
+from sqlalchemy import Enum, ForeignKey, Index, Integer, LargeBinary, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.models.base import Base, TimestampMixin
@@ -31,3 +31,6 @@ class UserDocument(Base, TimestampMixin):
     file_size: Mapped[int] = mapped_column(Integer, nullable=False)
 
     user = relationship("User", back_populates="documents")
+
+
+Index("ix_user_documents_user_type", UserDocument.user_id, UserDocument.document_type)
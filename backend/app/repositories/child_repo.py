@@ -1,38 +1,109 @@
-from sqlalchemy import func, select
+from sqlalchemy import func, select, tuple_
 from sqlalchemy.orm import selectinload
 from sqlalchemy.orm import Session
 
+from app.core.search import SIMILARITY_THRESHOLD, normalize_name
 from app.models.child import Child
+from app.models.guardian import ChildGuardian
+from app.repositories.list_version_repo import get_list_version
 
 
 def get_child_by_id(db: Session, child_id: int) -> Child | None:
     return db.get(Child, child_id)
 
 
-def list_children(db: Session, search: str | None, page: int, page_size: int) -> tuple[list[Child], int]:
+def get_child_names(db: Session, child_ids: list[int]) -> dict[int, str]:
+    rows = db.execute(select(Child.id, Child.name).where(Child.id.in_(child_ids)))
+    return {child_id: name for child_id, name in rows}
+
+
+def child_version(db: Session, child_id: int) -> tuple | None:
+    """Version of a child and its guardians, in one aggregate query (None if missing).
+
+    Guardians are replaced on update, so new ids show up in max(id).
+    """
+    stmt = (
+        select(
+            Child.name,
+            Child.updated_at,
+            func.count(ChildGuardian.id),
+            func.max(ChildGuardian.id),
+            func.max(ChildGuardian.updated_at),
+        )
+        .outerjoin(ChildGuardian, ChildGuardian.child_id == Child.id)
+        .where(Child.id == child_id)
+        .group_by(Child.id)
+    )
+    row = db.execute(stmt).first()
+    return tuple(row) if row else None
+
+
+def child_list_version(db: Session) -> int:
+    return get_list_version(db, "children")
+
+
+# Keyset sort key (alphabetical), backed by ix_children_name_id
+CHILD_CURSOR_TYPES = (str, int)
+
+
+def child_cursor_key(child: Child) -> tuple:
+    return child.name, child.id
+
+
+def _name_search(db: Session, search: str):
+    """Accent-insensitive substring-or-trigram match and its similarity rank.
+
+    On Postgres both predicates are served by the GIN trigram index; other
+    engines need `similarity()` registered (see `register_sqlite_functions`).
+    """
+    term = normalize_name(search)
+    rank = func.similarity(Child.name_normalized, term)
+    if db.get_bind().dialect.name == "postgresql":
+        fuzzy = Child.name_normalized.op("%")(term)
+    else:
+        fuzzy = rank >= SIMILARITY_THRESHOLD
+    return Child.name_normalized.contains(term, autoescape=True) | fuzzy, rank
+
+
+def list_children(
+    db: Session,
+    search: str | None,
+    page: int,
+    page_size: int,
+    after: tuple | None = None,
+    include_total: bool = True,
+) -> tuple[list[Child], int | None]:
+    """Page with OFFSET, or seek past `after` (a `child_cursor_key`) when given.
+
+    Search results are ranked by similarity and always page with OFFSET.
+    """
     stmt = select(Child).options(selectinload(Child.guardians))
     count_stmt = select(func.count()).select_from(Child)
 
     if search:
-        like = f"%{search.lower()}%"
-        stmt = stmt.where(func.lower(Child.name).like(like))
-        count_stmt = count_stmt.where(func.lower(Child.name).like(like))
+        condition, rank = _name_search(db, search)
+        stmt = stmt.where(condition).order_by(rank.desc(), Child.name, Child.id)
+        count_stmt = count_stmt.where(condition)
+        after = None
+    else:
+        stmt = stmt.order_by(Child.name, Child.id)
 
-    stmt = stmt.offset((page - 1) * page_size).limit(page_size)
-    items = db.execute(stmt).scalars().all()
-    total = db.execute(count_stmt).scalar_one()
+    if after is not None:
+        stmt = stmt.where(tuple_(Child.name, Child.id) > tuple_(*after))
+    else:
+        stmt = stmt.offset((page - 1) * page_size)
+    items = db.execute(stmt.limit(page_size)).scalars().all()
+    total = db.execute(count_stmt).scalar_one() if include_total else None
     return items, total
 
 
 def create_child(db: Session, child: Child) -> Child:
     db.add(child)
-    db.commit()
-    db.refresh(child)
+    db.flush()
     return child
 
 
 def update_child(db: Session, child: Child) -> Child:
     db.add(child)
-    db.commit()
-    db.refresh(child)
+    db.flush()
     return child
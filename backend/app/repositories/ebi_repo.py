@@ -1,41 +1,137 @@
-from sqlalchemy import String, func, select
-from sqlalchemy.orm import Session
+from datetime import date
 
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.orm import Session, joinedload, selectinload
+
+from app.models.child import Child
 from app.models.ebi import Ebi
+from app.models.presence import EbiPresence
+from app.models.user import User
+from app.repositories.list_version_repo import get_list_version
+from app.schemas.ebi import EbiFilter
 
 
 def get_ebi_by_id(db: Session, ebi_id: int) -> Ebi | None:
     return db.get(Ebi, ebi_id)
 
 
+def get_ebi_for_update(db: Session, ebi_id: int) -> Ebi | None:
+    """Row-lock the EBI so it cannot be closed while presences are written."""
+    stmt = select(Ebi).where(Ebi.id == ebi_id).with_for_update()
+    return db.execute(stmt).scalar_one_or_none()
+
+
+def get_presence_ebi_for_update(db: Session, presence_id: int) -> Ebi | None:
+    """Row-lock the EBI a presence belongs to (None if the presence does not exist)."""
+    stmt = (
+        select(Ebi)
+        .join(EbiPresence, EbiPresence.ebi_id == Ebi.id)
+        .where(EbiPresence.id == presence_id)
+        .with_for_update(of=Ebi)
+    )
+    return db.execute(stmt).scalar_one_or_none()
+
+
+def get_ebi_detail(db: Session, ebi_id: int) -> Ebi | None:
+    """Load an EBI with coordinator, collaborators and presences (with children) in three queries."""
+    stmt = (
+        select(Ebi)
+        .where(Ebi.id == ebi_id)
+        .options(
+            joinedload(Ebi.coordinator),
+            selectinload(Ebi.collaborators),
+            selectinload(Ebi.presences).joinedload(EbiPresence.child),
+        )
+    )
+    return db.execute(stmt).scalar_one_or_none()
+
+
+def ebi_detail_version(db: Session, ebi_id: int) -> tuple | None:
+    """Everything `GET /ebi/{id}` depends on, in one aggregate query (None if missing).
+
+    Collaborator changes touch `ebi.updated_at` (the association has no timestamps).
+    """
+    stmt = (
+        select(
+            Ebi.ebi_date,
+            Ebi.group_number,
+            Ebi.coordinator_id,
+            Ebi.status,
+            Ebi.finished_at,
+            Ebi.updated_at,
+            func.count(EbiPresence.id),
+            func.count(EbiPresence.exit_at),
+            func.max(EbiPresence.updated_at),
+            func.max(Child.updated_at),
+        )
+        .outerjoin(EbiPresence, EbiPresence.ebi_id == Ebi.id)
+        .outerjoin(Child, Child.id == EbiPresence.child_id)
+        .where(Ebi.id == ebi_id)
+        .group_by(Ebi.id)
+    )
+    row = db.execute(stmt).first()
+    return tuple(row) if row else None
+
+
+def ebi_list_version(db: Session) -> int:
+    return get_list_version(db, "ebi")
+
+
+# Keyset sort key (newest first), backed by ix_ebi_date_id
+EBI_CURSOR_TYPES = (date.fromisoformat, int)
+
+
+def ebi_cursor_key(ebi: Ebi) -> tuple:
+    return ebi.ebi_date, ebi.id
+
+
 def list_ebis(
-    db: Session, search: str | None, page: int, page_size: int
-) -> tuple[list[Ebi], int]:
-    stmt = select(Ebi).order_by(Ebi.ebi_date.desc())
-    count_stmt = select(func.count()).select_from(Ebi)
-
-    if search:
-        like = f"%{search.lower()}%"
-        stmt = stmt.where(func.lower(func.cast(Ebi.ebi_date, String)).like(like))
-        count_stmt = count_stmt.where(func.lower(func.cast(Ebi.ebi_date, String)).like(like))
-        if search.isdigit():
-            stmt = stmt.where(Ebi.group_number == int(search))
-            count_stmt = count_stmt.where(Ebi.group_number == int(search))
-    stmt = stmt.offset((page - 1) * page_size).limit(page_size)
-    items = db.execute(stmt).scalars().all()
-    total = db.execute(count_stmt).scalar_one()
+    db: Session,
+    filters: EbiFilter | None,
+    page: int,
+    page_size: int,
+    after: tuple | None = None,
+    include_total: bool = True,
+) -> tuple[list[Ebi], int | None]:
+    """Page with OFFSET, or seek past `after` (an `ebi_cursor_key`) when given."""
+    conditions = []
+    if filters:
+        if filters.date_from:
+            conditions.append(Ebi.ebi_date >= filters.date_from)
+        if filters.date_to:
+            conditions.append(Ebi.ebi_date <= filters.date_to)
+        if filters.group_number:
+            conditions.append(Ebi.group_number == filters.group_number)
+        if filters.status:
+            conditions.append(Ebi.status == filters.status)
+        if filters.coordinator_id:
+            conditions.append(Ebi.coordinator_id == filters.coordinator_id)
+
+    # Collaborator ids for the whole page in one extra query (EbiOut.collaborator_ids)
+    stmt = (
+        select(Ebi)
+        .where(*conditions)
+        .options(selectinload(Ebi.collaborators).load_only(User.id))
+        .order_by(Ebi.ebi_date.desc(), Ebi.id.desc())
+    )
+    count_stmt = select(func.count()).select_from(Ebi).where(*conditions)
+
+    if after is not None:
+        stmt = stmt.where(tuple_(Ebi.ebi_date, Ebi.id) < tuple_(*after))
+    else:
+        stmt = stmt.offset((page - 1) * page_size)
+    items = db.execute(stmt.limit(page_size)).scalars().all()
+    total = db.execute(count_stmt).scalar_one() if include_total else None
     return items, total
 
 
 def create_ebi(db: Session, ebi: Ebi) -> Ebi:
     db.add(ebi)
-    db.commit()
-    db.refresh(ebi)
+    db.flush()
     return ebi
 
 
 def update_ebi(db: Session, ebi: Ebi) -> Ebi:
     db.add(ebi)
-    db.commit()
-    db.refresh(ebi)
+    db.flush()
     return ebi
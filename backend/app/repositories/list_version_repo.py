@@ -0,0 +1,34 @@
+from itertools import chain
+
+from sqlalchemy import event, select, update
+from sqlalchemy.orm import Session
+
+from app.models.child import Child
+from app.models.ebi import Ebi
+from app.models.guardian import ChildGuardian
+from app.models.list_version import ListVersion
+from app.models.user import User
+
+# Which list a written row belongs to; collaborator changes mark the Ebi dirty
+_LIST_OF_MODEL = {Ebi: "ebi", Child: "children", ChildGuardian: "children", User: "users"}
+
+
+def get_list_version(db: Session, name: str) -> int:
+    return db.execute(select(ListVersion.version).where(ListVersion.name == name)).scalar_one()
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_changed_lists(session: Session, flush_context) -> None:
+    # new/dirty/deleted still hold the flushed objects here
+    names = {_LIST_OF_MODEL.get(type(obj)) for obj in chain(session.new, session.deleted)}
+    names.update(
+        _LIST_OF_MODEL.get(type(obj)) for obj in session.dirty if session.is_modified(obj, include_collections=True)
+    )
+    names.discard(None)
+    if names:
+        session.execute(
+            update(ListVersion)
+            .where(ListVersion.name.in_(sorted(names)))
+            .values(version=ListVersion.version + 1)
+            .execution_options(synchronize_session=False)
+        )
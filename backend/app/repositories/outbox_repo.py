@@ -0,0 +1,51 @@
+from datetime import datetime
+
+from sqlalchemy import Row, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.models.notification_outbox import NotificationOutbox, OutboxStatus
+
+
+def enqueue_messages(db: Session, rows: list[dict]) -> None:
+    """Multi-row insert of pending messages. Does not commit."""
+    if rows:
+        db.execute(insert(NotificationOutbox), rows)
+
+
+def claim_due_messages(db: Session, now: datetime, lease_until: datetime, limit: int) -> list[Row]:
+    """Take up to `limit` due messages in one UPDATE ... RETURNING. Does not commit.
+
+    Claimed messages are pushed to `lease_until`, so other dispatchers skip
+    them, and come back on their own if this one dies before recording the
+    outcome. SKIP LOCKED keeps concurrent claims from blocking each other.
+    """
+    due = (
+        select(NotificationOutbox.id)
+        .where(NotificationOutbox.status == OutboxStatus.PENDING, NotificationOutbox.next_attempt_at <= now)
+        .order_by(NotificationOutbox.next_attempt_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    stmt = (
+        update(NotificationOutbox)
+        .where(NotificationOutbox.id.in_(due.scalar_subquery()))
+        .values(attempts=NotificationOutbox.attempts + 1, next_attempt_at=lease_until)
+        .returning(
+            NotificationOutbox.id,
+            NotificationOutbox.to_phone,
+            NotificationOutbox.child_name,
+            NotificationOutbox.pin_code,
+            NotificationOutbox.attempts,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return db.execute(stmt).all()
+
+
+def record_delivery(db: Session, message_id: int, values: dict) -> None:
+    db.execute(
+        update(NotificationOutbox)
+        .where(NotificationOutbox.id == message_id)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
@@ -1,13 +1,38 @@
-from sqlalchemy import select
+from datetime import datetime
+
+from sqlalchemy import DateTime, Row, String, and_, exists, literal, literal_column, select, update
 from sqlalchemy.orm import Session
 
+from app.core.db import dialect_insert
+from app.models.child import Child
+from app.models.ebi import Ebi, EbiStatus
 from app.models.presence import EbiPresence
 
+PRESENCE_INSERT_COLUMNS = [
+    "ebi_id",
+    "child_id",
+    "guardian_name_day",
+    "guardian_phone_day",
+    "entry_at",
+    "pin_code",
+]
+
 
 def get_presence_by_id(db: Session, presence_id: int) -> EbiPresence | None:
     return db.get(EbiPresence, presence_id)
 
 
+def get_presence_for_update(db: Session, presence_id: int) -> EbiPresence | None:
+    """Lock and re-read the presence; a copy already in the session is overwritten."""
+    stmt = (
+        select(EbiPresence)
+        .where(EbiPresence.id == presence_id)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+    return db.execute(stmt).scalar_one_or_none()
+
+
 def get_presence_by_ebi_child(db: Session, ebi_id: int, child_id: int) -> EbiPresence | None:
     stmt = select(EbiPresence).where(
         EbiPresence.ebi_id == ebi_id, EbiPresence.child_id == child_id
@@ -15,15 +40,136 @@ def get_presence_by_ebi_child(db: Session, ebi_id: int, child_id: int) -> EbiPre
     return db.execute(stmt).scalar_one_or_none()
 
 
+def _returned_child_name():
+    # RETURNING cannot be correlated by the compiler, so the written row is
+    # referenced by table name inside the lookup
+    child_id = literal_column(f"{EbiPresence.__tablename__}.child_id")
+    return select(Child.name).where(Child.id == child_id).scalar_subquery().label("child_name")
+
+
+def insert_presence_if_absent(
+    db: Session,
+    ebi_id: int,
+    child_id: int,
+    guardian_name_day: str,
+    guardian_phone_day: str,
+    entry_at: datetime,
+    pin_code: str,
+) -> Row | None:
+    """Insert the presence in one statement, or return None when nothing was inserted.
+
+    The row is only produced when the EBI is open and the child exists, and
+    `uq_presence_ebi_child` turns a duplicate check-in into a no-op, so there is
+    no read-then-write window. The returned row carries the child's name and
+    the EBI's date/group so callers need no follow-up queries. Does not commit.
+    """
+    table = EbiPresence.__table__
+    source = (
+        select(
+            Ebi.id,
+            Child.id,
+            literal(guardian_name_day, String),
+            literal(guardian_phone_day, String),
+            literal(entry_at, DateTime(timezone=True)),
+            literal(pin_code, String),
+        )
+        .select_from(Ebi)
+        .join(Child, Child.id == child_id)
+        .where(Ebi.id == ebi_id, Ebi.status == EbiStatus.ABERTO)
+    )
+    inserted_ebi_id = literal_column(f"{table.name}.ebi_id")
+    stmt = (
+        dialect_insert(db)(table)
+        .from_select(PRESENCE_INSERT_COLUMNS, source)
+        .on_conflict_do_nothing(index_elements=["ebi_id", "child_id"])
+        .returning(
+            *table.c,
+            _returned_child_name(),
+            select(Ebi.ebi_date).where(Ebi.id == inserted_ebi_id).scalar_subquery().label("ebi_date"),
+            select(Ebi.group_number).where(Ebi.id == inserted_ebi_id).scalar_subquery().label("group_number"),
+        )
+    )
+    return db.execute(stmt).one_or_none()
+
+
+def insert_presences_if_absent(db: Session, rows: list[dict]) -> list[Row]:
+    """Multi-row insert skipping children already checked in; returns the inserted rows. Does not commit."""
+    if not rows:
+        return []
+    table = EbiPresence.__table__
+    stmt = (
+        dialect_insert(db)(table)
+        .values(rows)
+        .on_conflict_do_nothing(index_elements=["ebi_id", "child_id"])
+        .returning(*table.c)
+    )
+    return db.execute(stmt).all()
+
+
+def lock_open_pins(db: Session, ebi_id: int) -> set[str] | None:
+    """Row-lock the EBI and return the PINs of its open presences in one query.
+
+    Returns None when the EBI does not exist. The lock serialises PIN
+    allocation per EBI until the caller commits.
+    """
+    stmt = (
+        select(Ebi.id, EbiPresence.pin_code)
+        .outerjoin(EbiPresence, and_(EbiPresence.ebi_id == Ebi.id, EbiPresence.exit_at.is_(None)))
+        .where(Ebi.id == ebi_id)
+        .with_for_update(of=Ebi)
+    )
+    rows = db.execute(stmt).all()
+    if not rows:
+        return None
+    return {pin_code for _, pin_code in rows if pin_code is not None}
+
+
+def get_open_pins(db: Session, ebi_id: int) -> set[str]:
+    """PINs of the EBI's open presences, for callers that already hold the EBI lock."""
+    stmt = select(EbiPresence.pin_code).where(EbiPresence.ebi_id == ebi_id, EbiPresence.exit_at.is_(None))
+    return set(db.execute(stmt).scalars())
+
+
+def has_open_presences(db: Session, ebi_id: int) -> bool:
+    stmt = select(
+        exists().where(EbiPresence.ebi_id == ebi_id, EbiPresence.exit_at.is_(None))
+    )
+    return db.execute(stmt).scalar()
+
+
+def checkout_open_presences(
+    db: Session,
+    ebi_id: int,
+    exit_at: datetime,
+    checkout_justification: str | None = None,
+    presence_ids: list[int] | None = None,
+    pin_codes: list[str] | None = None,
+) -> list[Row]:
+    """Check out the EBI's open presences with one UPDATE ... RETURNING.
+
+    Without `presence_ids`/`pin_codes` every open presence is checked out.
+    Returns the updated rows with `child_name`. Does not commit.
+    """
+    table = EbiPresence.__table__
+    stmt = update(table).where(table.c.ebi_id == ebi_id, table.c.exit_at.is_(None))
+    if presence_ids is not None:
+        stmt = stmt.where(table.c.id.in_(presence_ids))
+    if pin_codes is not None:
+        stmt = stmt.where(table.c.pin_code.in_(pin_codes))
+    values = {"exit_at": exit_at}
+    if checkout_justification:
+        values["checkout_justification"] = checkout_justification
+    stmt = stmt.values(values).returning(*table.c, _returned_child_name())
+    return db.execute(stmt).all()
+
+
 def create_presence(db: Session, presence: EbiPresence) -> EbiPresence:
     db.add(presence)
-    db.commit()
-    db.refresh(presence)
+    db.flush()
     return presence
 
 
 def update_presence(db: Session, presence: EbiPresence) -> EbiPresence:
     db.add(presence)
-    db.commit()
-    db.refresh(presence)
+    db.flush()
     return presence
@@ -0,0 +1,11 @@
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.sync_operation import SyncOperation
+
+
+def get_sync_operations(db: Session, user_id: int, keys: set[str]) -> dict[str, SyncOperation]:
+    rows = db.execute(
+        select(SyncOperation).where(SyncOperation.user_id == user_id, SyncOperation.idempotency_key.in_(keys))
+    ).scalars()
+    return {record.idempotency_key: record for record in rows}
@@ -1,7 +1,8 @@
-from sqlalchemy import func, select
+from sqlalchemy import func, select, tuple_
 from sqlalchemy.orm import Session
 
 from app.models.user import User
+from app.repositories.list_version_repo import get_list_version
 
 
 def get_user_by_id(db: Session, user_id: int) -> User | None:
@@ -13,8 +14,24 @@ def get_user_by_email(db: Session, email: str) -> User | None:
     return db.execute(stmt).scalar_one_or_none()
 
 
-def list_users(db: Session, search: str | None, page: int, page_size: int) -> tuple[list[User], int]:
-    stmt = select(User)
+# Keyset sort key (alphabetical), backed by ix_users_full_name_id
+USER_CURSOR_TYPES = (str, int)
+
+
+def user_cursor_key(user: User) -> tuple:
+    return user.full_name, user.id
+
+
+def list_users(
+    db: Session,
+    search: str | None,
+    page: int,
+    page_size: int,
+    after: tuple | None = None,
+    include_total: bool = True,
+) -> tuple[list[User], int | None]:
+    """Page with OFFSET, or seek past `after` (a `user_cursor_key`) when given."""
+    stmt = select(User).order_by(User.full_name, User.id)
     count_stmt = select(func.count()).select_from(User)
 
     if search:
@@ -24,21 +41,26 @@ def list_users(db: Session, search: str | None, page: int, page_size: int) -> tu
             func.lower(User.full_name).like(like) | func.lower(User.email).like(like)
         )
 
-    stmt = stmt.offset((page - 1) * page_size).limit(page_size)
-    items = db.execute(stmt).scalars().all()
-    total = db.execute(count_stmt).scalar_one()
+    if after is not None:
+        stmt = stmt.where(tuple_(User.full_name, User.id) > tuple_(*after))
+    else:
+        stmt = stmt.offset((page - 1) * page_size)
+    items = db.execute(stmt.limit(page_size)).scalars().all()
+    total = db.execute(count_stmt).scalar_one() if include_total else None
     return items, total
 
 
+def user_list_version(db: Session) -> int:
+    return get_list_version(db, "users")
+
+
 def create_user(db: Session, user: User) -> User:
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    db.flush()
     return user
 
 
 def update_user(db: Session, user: User) -> User:
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    db.flush()
     return user
@@ -0,0 +1,18 @@
+from app.core.db import SessionLocal
+from app.services.rollup_service import rebuild_rollup
+
+
+def run_rebuild() -> None:
+    """Recalcula `presence_monthly_rollup` a partir de `ebi` e `ebi_presence`."""
+    db = SessionLocal()
+    try:
+        print("==> Recalculando consolidado mensal de presenças...")
+        rows = rebuild_rollup(db)
+        db.commit()
+        print(f"  [+] {rows} linhas (mês, grupo) gravadas.")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    run_rebuild()
@@ -13,6 +13,11 @@ class TokenResponse(BaseModel):
     user_id: int
 
 
+class StreamTokenResponse(BaseModel):
+    stream_token: str
+    expires_in: int
+
+
 class BootstrapRequest(BaseModel):
     full_name: str = Field(min_length=2, max_length=200)
     email: EmailStr
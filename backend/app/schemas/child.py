@@ -38,8 +38,14 @@ class ChildOut(ChildBase):
         from_attributes = True
 
 
+class ChildSuggestion(BaseModel):
+    id: int
+    name: str
+
+
 class ChildList(BaseModel):
     items: list[ChildOut]
-    total: int
+    total: int | None = None
     page: int
     page_size: int
+    next_cursor: str | None = None
@@ -24,6 +24,16 @@ class EbiUpdate(BaseModel):
     collaborator_ids: list[int] | None = None
 
 
+class EbiFilter(BaseModel):
+    """Structured EBI list filters; every field compiles to a sargable predicate."""
+
+    date_from: date | None = None
+    date_to: date | None = None
+    group_number: int | None = None
+    status: EbiStatus | None = None
+    coordinator_id: int | None = None
+
+
 class EbiOut(BaseModel):
     id: int
     ebi_date: date
@@ -43,6 +53,7 @@ class EbiDetail(EbiOut):
 
 class EbiList(BaseModel):
     items: list[EbiOut]
-    total: int
+    total: int | None = None
     page: int
     page_size: int
+    next_cursor: str | None = None
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional
+from typing import Annotated, Literal, Optional
 
 from pydantic import BaseModel, Field, model_validator
 
@@ -37,3 +37,40 @@ class PresenceOut(BaseModel):
     class Config:
         from_attributes = True
 
+
+
+class PresenceBulkCreate(BaseModel):
+    items: list[PresenceCreate] = Field(min_length=1, max_length=20)
+
+
+class PresenceBulkResult(BaseModel):
+    child_id: int
+    status: Literal["created", "duplicate", "not_found"]
+    presence: PresenceOut | None = None
+
+
+class PresenceBulkOut(BaseModel):
+    items: list[PresenceBulkResult]
+
+
+class PresencePinCheckout(BaseModel):
+    pin_code: str = Field(pattern=r"^\d{4}$")
+
+
+class PresenceBulkCheckout(BaseModel):
+    pin_codes: Optional[list[Annotated[str, Field(min_length=4, max_length=4)]]] = Field(default=None, min_length=1, max_length=100)
+    presence_ids: Optional[list[int]] = Field(default=None, min_length=1, max_length=100)
+    checkout_justification: Optional[str] = Field(default=None, min_length=10, max_length=500)
+
+    @model_validator(mode="after")
+    def validate_pins_or_ids(self):
+        if (self.pin_codes is None) == (self.presence_ids is None):
+            raise ValueError("Informe a lista de PINs ou a lista de presenças.")
+        if self.presence_ids is not None and (not self.checkout_justification or len(self.checkout_justification.strip()) < 10):
+            raise ValueError("A justificativa deve ter pelo menos 10 caracteres.")
+        return self
+
+
+class PresenceBulkCheckoutOut(BaseModel):
+    checked_out: list[PresenceOut]
+    not_matched: list[str | int]
@@ -0,0 +1,72 @@
+from datetime import datetime
+from typing import Annotated, Literal, Optional, Union
+
+from pydantic import BaseModel, Field, model_validator
+
+from app.schemas.child import ChildCreate
+
+
+class SyncOperationBase(BaseModel):
+    # Gerada no tablet; reenvios com a mesma chave não são reaplicados
+    idempotency_key: str = Field(min_length=8, max_length=100)
+
+
+class SyncCreateChild(SyncOperationBase):
+    op: Literal["create_child"]
+    child: ChildCreate
+
+
+class SyncCheckIn(SyncOperationBase):
+    op: Literal["check_in"]
+    ebi_id: int
+    child_id: Optional[int] = None
+    # Chave de um create_child anterior (no mesmo lote ou em lote já sincronizado)
+    child_ref: Optional[str] = Field(default=None, min_length=8, max_length=100)
+    guardian_name_day: str = Field(min_length=2, max_length=200)
+    guardian_phone_day: str = Field(min_length=8, max_length=40)
+    occurred_at: Optional[datetime] = None
+
+    @model_validator(mode="after")
+    def validate_child(self):
+        if (self.child_id is None) == (self.child_ref is None):
+            raise ValueError("Informe child_id ou child_ref.")
+        return self
+
+
+class SyncCheckout(SyncOperationBase):
+    op: Literal["checkout"]
+    presence_id: Optional[int] = None
+    # Chave de um check_in anterior
+    presence_ref: Optional[str] = Field(default=None, min_length=8, max_length=100)
+    pin_code: Optional[str] = Field(default=None, min_length=4, max_length=4)
+    checkout_justification: Optional[str] = Field(default=None, min_length=10, max_length=500)
+    occurred_at: Optional[datetime] = None
+
+    @model_validator(mode="after")
+    def validate_presence_and_pin(self):
+        if (self.presence_id is None) == (self.presence_ref is None):
+            raise ValueError("Informe presence_id ou presence_ref.")
+        if not self.pin_code and not self.checkout_justification:
+            raise ValueError("Informe o PIN ou uma justificativa para saída sem PIN.")
+        if not self.pin_code and len(self.checkout_justification.strip()) < 10:
+            raise ValueError("A justificativa deve ter pelo menos 10 caracteres.")
+        return self
+
+
+SyncOperationIn = Annotated[Union[SyncCreateChild, SyncCheckIn, SyncCheckout], Field(discriminator="op")]
+
+
+class SyncRequest(BaseModel):
+    operations: list[SyncOperationIn] = Field(min_length=1, max_length=200)
+
+
+class SyncResult(BaseModel):
+    idempotency_key: str
+    status: Literal["applied", "replayed", "failed"]
+    status_code: int
+    result: dict | None = None
+    detail: str | None = None
+
+
+class SyncResponse(BaseModel):
+    results: list[SyncResult]
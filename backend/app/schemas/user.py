@@ -33,6 +33,7 @@ class UserOut(UserBase):
 
 class UserList(BaseModel):
     items: list[UserOut]
-    total: int
+    total: int | None = None
     page: int
     page_size: int
+    next_cursor: str | None = None
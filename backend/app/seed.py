@@ -8,6 +8,7 @@ from app.models.ebi import Ebi, EbiStatus
 from app.models.presence import EbiPresence
 from app.models.user import User, UserRole
 from app.repositories.user_repo import get_user_by_email
+from app.services.rollup_service import rebuild_rollup
 
 
 # ---------------------------------------------------------------------------
@@ -373,6 +374,9 @@ def run_seed() -> None:
             db.commit()
             print("  [+] Presença adicionada.")
 
+        rebuild_rollup(db)
+        db.commit()
+
         print("\nSeed concluido com sucesso!")
         print(f"  Administradores : {len(ADMINISTRATORS)}")
         print(f"  Coordenadoras   : {len(COORDINATORS)}")
@@ -1,14 +1,18 @@
 from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from app.core.cache import mark_data_changed
 from app.core.security import create_access_token, get_password_hash, verify_password
 from app.models.user import User, UserRole
 from app.repositories.user_repo import create_user, get_user_by_email
 
 
-def login(db: Session, email: str, password: str) -> tuple[str, User]:
-    user = get_user_by_email(db, email)
-    if not user or not verify_password(password, user.password_hash):
+async def login(db: AsyncSession, email: str, password: str) -> tuple[str, User]:
+    user = await db.run_sync(get_user_by_email, email)
+    # bcrypt is deliberately slow; keep it off the event loop
+    if not user or not await run_in_threadpool(verify_password, password, user.password_hash):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
     token = create_access_token(str(user.id), user.role.value)
     return token, user
@@ -34,4 +38,6 @@ def bootstrap_coordinator(
         group_number=group_number,
         password_hash=get_password_hash(password),
     )
-    return create_user(db, user)
+    user = create_user(db, user)
+    mark_data_changed(db)
+    return user
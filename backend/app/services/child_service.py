@@ -1,12 +1,22 @@
 from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
 
+from app.core.cache import mark_data_changed
 from app.models.child import Child
 from app.models.guardian import ChildGuardian
 from app.repositories.child_repo import create_child, get_child_by_id, update_child
+from app.services.suggest_service import index_child
 
 
 def create_new_child(db: Session, child_in) -> Child:
+    child = create_child(db, build_child(child_in))
+    mark_data_changed(db)
+    index_child(db, child)
+    return child
+
+
+def build_child(child_in) -> Child:
+    """Validate the payload and build the (unsaved) child with its guardians."""
     if not child_in.guardians:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Guardians required")
 
@@ -17,7 +27,7 @@ def create_new_child(db: Session, child_in) -> Child:
         guardian_phone=primary.phone,
     )
     child.guardians = [ChildGuardian(name=item.name, phone=item.phone) for item in child_in.guardians]
-    return create_child(db, child)
+    return child
 
 
 def update_existing_child(db: Session, child_id: int, child_in) -> Child:
@@ -38,4 +48,7 @@ def update_existing_child(db: Session, child_id: int, child_in) -> Child:
         child.guardian_name = primary.name
         child.guardian_phone = primary.phone
 
-    return update_child(db, child)
+    child = update_child(db, child)
+    mark_data_changed(db)
+    index_child(db, child)
+    return child
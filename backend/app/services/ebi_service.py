@@ -1,18 +1,156 @@
-from datetime import datetime, timezone
+import calendar
+from datetime import date, datetime, timezone
+import math
+import re
 import secrets
 
 from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
 
+from app.core.cache import mark_data_changed
+from app.core.events import publish_ebi_event
+from app.core.search import normalize_name
+from app.core.throttle import pin_attempts
+from app.models.base import utc_now
 from app.models.ebi import Ebi, EbiStatus
 from app.models.ebi_audit import EbiAudit
 from app.models.presence import EbiPresence
 from app.models.user import UserRole
-from app.repositories.child_repo import get_child_by_id
-from app.repositories.ebi_repo import create_ebi, get_ebi_by_id, update_ebi
-from app.repositories.presence_repo import create_presence, get_presence_by_ebi_child, get_presence_by_id, update_presence
+from app.repositories.child_repo import get_child_by_id, get_child_names
+from app.repositories.ebi_repo import (
+    create_ebi,
+    get_ebi_by_id,
+    get_ebi_for_update,
+    get_presence_ebi_for_update,
+    update_ebi,
+)
+from app.repositories.presence_repo import (
+    checkout_open_presences,
+    get_open_pins,
+    get_presence_for_update,
+    has_open_presences,
+    insert_presence_if_absent,
+    insert_presences_if_absent,
+    lock_open_pins,
+    update_presence,
+)
 from app.repositories.user_repo import get_user_by_id
-from app.services.whatsapp_service import send_pin_whatsapp
+from app.schemas.ebi import EbiFilter
+from app.services.report_service import invalidate_ebi_report
+from app.services.rollup_service import record_checkout, record_checkouts, record_ebi_created, record_ebi_moved, record_presence_added
+from app.services.whatsapp_service import enqueue_pin_whatsapp
+
+
+MONTH_NAMES = [
+    "janeiro", "fevereiro", "marco", "abril", "maio", "junho",
+    "julho", "agosto", "setembro", "outubro", "novembro", "dezembro",
+]
+STATUS_WORDS = {
+    "aberto": EbiStatus.ABERTO,
+    "abertos": EbiStatus.ABERTO,
+    "encerrado": EbiStatus.ENCERRADO,
+    "encerrados": EbiStatus.ENCERRADO,
+}
+_ISO_DATE_RE = re.compile(r"^(\d{4})-(\d{1,2})-(\d{1,2})$")
+_BR_DATE_RE = re.compile(r"^(\d{1,2})/(\d{1,2})(?:/(\d{4}))?$")
+_ISO_MONTH_RE = re.compile(r"^(\d{4})-(\d{1,2})$")
+_BR_MONTH_RE = re.compile(r"^(\d{1,2})/(\d{4})$")
+_GROUP_RE = re.compile(r"^g?([1-4])$")
+CLOSE_CHECKOUT_JUSTIFICATION = "Saída registrada no encerramento do EBI"
+PIN_SPACE = 10_000
+
+
+def _month_range(year: int, month: int) -> tuple[date, date]:
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+
+def _month_from_name(token: str) -> int | None:
+    if len(token) < 3:
+        return None
+    for number, name in enumerate(MONTH_NAMES, start=1):
+        if name.startswith(token):
+            return number
+    return None
+
+
+def parse_ebi_search(search: str, today: date | None = None) -> EbiFilter | None:
+    """Turn free text ("08/03/2026", "março 2026", "grupo 2", "encerrado") into filters.
+
+    Returns None when some token is not understood, which lists nothing.
+    """
+    today = today or date.today()
+    filters = EbiFilter()
+    month_number = year = None
+
+    try:
+        for token in normalize_name(search).replace(",", " ").split():
+            if token == "grupo":
+                continue
+            if match := _ISO_DATE_RE.match(token):
+                day = date(int(match[1]), int(match[2]), int(match[3]))
+                filters.date_from = filters.date_to = day
+            elif match := _BR_DATE_RE.match(token):
+                day = date(int(match[3] or today.year), int(match[2]), int(match[1]))
+                filters.date_from = filters.date_to = day
+            elif match := _ISO_MONTH_RE.match(token):
+                filters.date_from, filters.date_to = _month_range(int(match[1]), int(match[2]))
+            elif match := _BR_MONTH_RE.match(token):
+                filters.date_from, filters.date_to = _month_range(int(match[2]), int(match[1]))
+            elif match := _GROUP_RE.match(token):
+                filters.group_number = int(match[1])
+            elif token.isdigit() and len(token) == 4:
+                year = int(token)
+            elif token in STATUS_WORDS:
+                filters.status = STATUS_WORDS[token]
+            elif (number := _month_from_name(token)) is not None:
+                month_number = number
+            else:
+                return None
+
+        if month_number is not None:
+            filters.date_from, filters.date_to = _month_range(year or today.year, month_number)
+        elif year is not None:
+            filters.date_from, filters.date_to = date(year, 1, 1), date(year, 12, 31)
+    except ValueError:
+        # e.g. 31/02/2026
+        return None
+    return filters
+
+
+def build_ebi_filter(
+    search: str | None,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    month: str | None = None,
+    year: int | None = None,
+    group_number: int | None = None,
+    status: EbiStatus | None = None,
+    coordinator_id: int | None = None,
+) -> EbiFilter | None:
+    """Combine parsed free text with explicit filters; date bounds are intersected."""
+    filters = parse_ebi_search(search) if search and search.strip() else EbiFilter()
+    if filters is None:
+        return None
+
+    lower_bounds = [filters.date_from, date_from]
+    upper_bounds = [filters.date_to, date_to]
+    if month:
+        month_year, month_number = (int(part) for part in month.split("-"))
+        month_start, month_end = _month_range(month_year, month_number)
+        lower_bounds.append(month_start)
+        upper_bounds.append(month_end)
+    if year:
+        lower_bounds.append(date(year, 1, 1))
+        upper_bounds.append(date(year, 12, 31))
+    filters.date_from = max((bound for bound in lower_bounds if bound), default=None)
+    filters.date_to = min((bound for bound in upper_bounds if bound), default=None)
+    if filters.date_from and filters.date_to and filters.date_from > filters.date_to:
+        return None
+
+    filters.group_number = group_number or filters.group_number
+    filters.status = status or filters.status
+    filters.coordinator_id = coordinator_id or filters.coordinator_id
+    return filters
 
 
 def _validate_coordinator(db: Session, coordinator_id: int) -> None:
@@ -46,16 +184,21 @@ def create_new_ebi(db: Session, ebi_in) -> Ebi:
         collaborators = _validate_collaborators(db, ebi_in.collaborator_ids)
         ebi.collaborators = collaborators
 
-    return create_ebi(db, ebi)
+    record_ebi_created(db, ebi)
+    ebi = create_ebi(db, ebi)
+    mark_data_changed(db)
+    return ebi
 
 
 def update_existing_ebi(db: Session, ebi_id: int, ebi_in) -> Ebi:
-    ebi = get_ebi_by_id(db, ebi_id)
+    # Locked: a concurrent check-in waits and is counted in the new month/group
+    ebi = get_ebi_for_update(db, ebi_id)
     if not ebi:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="EBI not found")
     if ebi.status == EbiStatus.ENCERRADO:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="EBI closed")
 
+    old_date, old_group_number = ebi.ebi_date, ebi.group_number
     for field in ["ebi_date", "group_number", "coordinator_id"]:
         value = getattr(ebi_in, field, None)
         if value is not None:
@@ -66,49 +209,189 @@ def update_existing_ebi(db: Session, ebi_id: int, ebi_in) -> Ebi:
     if ebi_in.collaborator_ids is not None:
         collaborators = _validate_collaborators(db, ebi_in.collaborator_ids)
         ebi.collaborators = collaborators
+        # The association has no timestamps; touch the EBI so its ETag changes
+        ebi.updated_at = utc_now()
+
+    record_ebi_moved(db, ebi, old_date, old_group_number)
+    ebi = update_ebi(db, ebi)
+    mark_data_changed(db)
+    return ebi
+
+
+def add_presence(db: Session, ebi_id: int, presence_in):
+    """Check a child in with a single INSERT ... ON CONFLICT DO NOTHING.
+
+    Returns the inserted row (presence columns plus `child_name`). When no row
+    comes back the reason is looked up only to pick the error response.
+    """
+    presence = check_in(
+        db, ebi_id, presence_in.child_id, presence_in.guardian_name_day, presence_in.guardian_phone_day
+    )
+    enqueue_pin_whatsapp(db, [(presence, presence.child_name)])
+    mark_data_changed(db)
+    return presence
+
+
+def check_in(
+    db: Session,
+    ebi_id: int,
+    child_id: int,
+    guardian_name_day: str,
+    guardian_phone_day: str,
+    entry_at: datetime | None = None,
+):
+    """Write one presence, its rollup delta and event in the caller's transaction. Does not commit."""
+    used_pins = lock_open_pins(db, ebi_id)
+    if used_pins is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="EBI not found")
+    presence = insert_presence_if_absent(
+        db,
+        ebi_id,
+        child_id,
+        guardian_name_day,
+        guardian_phone_day,
+        entry_at or datetime.now(timezone.utc),
+        _allocate_pins(used_pins, 1)[0],
+    )
+    if presence is None:
+        _raise_presence_rejected(db, ebi_id, child_id)
 
-    return update_ebi(db, ebi)
+    record_presence_added(db, presence.ebi_date, presence.group_number)
+    publish_ebi_event(db, ebi_id, "presence_added", {"presence_ids": [presence.id]})
+    return presence
 
 
-def add_presence(db: Session, ebi_id: int, presence_in) -> EbiPresence:
+def _raise_presence_rejected(db: Session, ebi_id: int, child_id: int) -> None:
     ebi = get_ebi_by_id(db, ebi_id)
     if not ebi:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="EBI not found")
     if ebi.status == EbiStatus.ENCERRADO:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="EBI closed")
-
-    child = get_child_by_id(db, presence_in.child_id)
-    if not child:
+    if not get_child_by_id(db, child_id):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Child not found")
+    raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Presence already exists")
+
+
+def _publish_checked_out(db: Session, ebi_id: int, rows) -> None:
+    publish_ebi_event(db, ebi_id, "checked_out", {"presence_ids": [row.id for row in rows]})
+
+
+def _check_pin_attempts(ebi_id: int) -> None:
+    # Four digits are quickly enumerated; wrong PINs are counted per EBI
+    retry_after = pin_attempts.retry_after(ebi_id)
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many invalid pins",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+
+
+def _allocate_pins(used_pins: set[str], count: int) -> list[str]:
+    """Draw `count` random PINs not used by any open presence of the EBI.
+
+    Callers hold the EBI row lock (lock_open_pins or get_ebi_for_update), so concurrent check-ins
+    cannot draw the same PIN.
+    """
+    if len(used_pins) + count > PIN_SPACE:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="No PIN available")
+    taken = set(used_pins)
+    pins = []
+    while len(pins) < count:
+        pin = f"{secrets.randbelow(PIN_SPACE):04d}"
+        if pin not in taken:
+            taken.add(pin)
+            pins.append(pin)
+    return pins
+
+
+def add_presences_bulk(db: Session, ebi_id: int, items) -> list[dict]:
+    """Check in several children (e.g. siblings) in one transaction.
+
+    One query validates the EBI, one resolves every child, one reads the PINs
+    in use and one multi-row INSERT ... ON CONFLICT DO NOTHING writes the
+    presences. Returns one result per item, in request order, with status
+    created/duplicate/not_found.
+    """
+    ebi = get_ebi_for_update(db, ebi_id)
+    if not ebi:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="EBI not found")
+    if ebi.status == EbiStatus.ENCERRADO:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="EBI closed")
 
-    existing = get_presence_by_ebi_child(db, ebi_id, presence_in.child_id)
-    if existing:
-        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Presence already exists")
-
-    pin_code = "".join(secrets.choice("0123456789") for _ in range(4))
-    presence = EbiPresence(
-        ebi_id=ebi_id,
-        child_id=presence_in.child_id,
-        guardian_name_day=presence_in.guardian_name_day,
-        guardian_phone_day=presence_in.guardian_phone_day,
-        entry_at=datetime.now(timezone.utc),
-        pin_code=pin_code,
-    )
-    presence = create_presence(db, presence)
+    child_names = get_child_names(db, list({item.child_id for item in items}))
+    new_items = {}
+    for item in items:
+        if item.child_id in child_names:
+            new_items.setdefault(item.child_id, item)
+    # The EBI is already locked above; reading the PINs needs no second lock
+    pins = _allocate_pins(get_open_pins(db, ebi_id), len(new_items))
+    entry_at = datetime.now(timezone.utc)
+    rows = [
+        {
+            "ebi_id": ebi_id,
+            "child_id": item.child_id,
+            "guardian_name_day": item.guardian_name_day,
+            "guardian_phone_day": item.guardian_phone_day,
+            "entry_at": entry_at,
+            "pin_code": pin_code,
+        }
+        for item, pin_code in zip(new_items.values(), pins)
+    ]
+
+    inserted = {row.child_id: row for row in insert_presences_if_absent(db, rows)}
+    if inserted:
+        record_presence_added(db, ebi.ebi_date, ebi.group_number, count=len(inserted))
+        publish_ebi_event(db, ebi_id, "presence_added", {"presence_ids": [row.id for row in inserted.values()]})
+        enqueue_pin_whatsapp(db, [(row, child_names[row.child_id]) for row in inserted.values()])
+        mark_data_changed(db)
+
+    results = []
+    for item in items:
+        if item.child_id not in child_names:
+            results.append({"child_id": item.child_id, "status": "not_found", "presence": None})
+            continue
+        presence = inserted.pop(item.child_id, None)
+        if presence is None:
+            results.append({"child_id": item.child_id, "status": "duplicate", "presence": None})
+            continue
+        child_name = child_names[item.child_id]
+        results.append(
+            {
+                "child_id": item.child_id,
+                "status": "created",
+                "presence": {**presence._mapping, "child_name": child_name},
+            }
+        )
+    return results
 
-    # Best-effort WhatsApp send (no hard failure)
-    send_pin_whatsapp(presence.guardian_phone_day, presence.child.name, presence.pin_code)
 
+def checkout_presence(db: Session, presence_id: int, pin_code: str | None, checkout_justification: str | None = None) -> EbiPresence:
+    presence = check_out(db, presence_id, pin_code, checkout_justification)
+    presence = update_presence(db, presence)
+    mark_data_changed(db)
     return presence
 
 
-def checkout_presence(db: Session, presence_id: int, pin_code: str | None, checkout_justification: str | None = None) -> EbiPresence:
-    presence = get_presence_by_id(db, presence_id)
-    if not presence:
+def check_out(
+    db: Session,
+    presence_id: int,
+    pin_code: str | None,
+    checkout_justification: str | None = None,
+    exit_at: datetime | None = None,
+) -> EbiPresence:
+    """Validate and apply one checkout in the caller's transaction. Does not commit.
+
+    The EBI is locked before the presence is read, like the bulk, PIN and close
+    paths, so a concurrent checkout of the same presence sees `exit_at` set
+    and the rollup is counted once.
+    """
+    ebi = get_presence_ebi_for_update(db, presence_id)
+    if not ebi:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Presence not found")
+    presence = get_presence_for_update(db, presence_id)
 
-    ebi = get_ebi_by_id(db, presence.ebi_id)
-    if not ebi or ebi.status == EbiStatus.ENCERRADO:
+    if ebi.status == EbiStatus.ENCERRADO:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="EBI closed")
 
     if presence.exit_at:
@@ -116,7 +399,9 @@ def checkout_presence(db: Session, presence_id: int, pin_code: str | None, check
 
     if pin_code:
         # Normal PIN flow
+        _check_pin_attempts(ebi.id)
         if presence.pin_code != pin_code:
+            pin_attempts.fail(ebi.id)
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid pin")
     else:
         # PIN-free override — justification is required (validated at schema level)
@@ -124,25 +409,100 @@ def checkout_presence(db: Session, presence_id: int, pin_code: str | None, check
             raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Justificativa obrigatória")
         presence.checkout_justification = checkout_justification.strip()
 
-    presence.exit_at = datetime.now(timezone.utc)
-    return update_presence(db, presence)
+    presence.exit_at = exit_at or datetime.now(timezone.utc)
+    record_checkout(db, ebi, presence)
+    publish_ebi_event(db, ebi.id, "checked_out", {"presence_ids": [presence.id]})
+    return presence
+
+
+def checkout_presences_bulk(
+    db: Session,
+    ebi_id: int,
+    pin_codes: list[str] | None = None,
+    presence_ids: list[int] | None = None,
+    checkout_justification: str | None = None,
+) -> dict:
+    """Check out several presences of one EBI with a single UPDATE.
+
+    Selection is by PIN list or by presence ids (the latter under one
+    justification, validated at schema level). Keys that matched no open
+    presence are returned in `not_matched`.
+    """
+    if pin_codes is not None:
+        _check_pin_attempts(ebi_id)
+    ebi = get_ebi_for_update(db, ebi_id)
+    if not ebi:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="EBI not found")
+    if ebi.status == EbiStatus.ENCERRADO:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="EBI closed")
 
+    justification = checkout_justification.strip() if checkout_justification else None
+    rows = checkout_open_presences(
+        db, ebi_id, datetime.now(timezone.utc), justification, presence_ids=presence_ids, pin_codes=pin_codes
+    )
+    if rows:
+        record_checkouts(db, ebi.ebi_date, ebi.group_number, rows)
+        _publish_checked_out(db, ebi_id, rows)
+        mark_data_changed(db)
 
+    if pin_codes is not None:
+        requested, matched = pin_codes, {row.pin_code for row in rows}
+    else:
+        requested, matched = presence_ids, {row.id for row in rows}
+    not_matched = [key for key in dict.fromkeys(requested) if key not in matched]
+    if pin_codes is not None and not_matched:
+        pin_attempts.fail(ebi_id, len(not_matched))
+    return {
+        "checked_out": [{**row._mapping, "pin_code": None} for row in rows],
+        "not_matched": not_matched,
+    }
+
+
+def checkout_by_pin(db: Session, ebi_id: int, pin_code: str):
+    """Kiosk checkout: the PIN alone identifies the open presence within the EBI."""
+    _check_pin_attempts(ebi_id)
+    ebi = get_ebi_for_update(db, ebi_id)
+    if not ebi:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="EBI not found")
+    if ebi.status == EbiStatus.ENCERRADO:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="EBI closed")
 
-def close_ebi(db: Session, ebi_id: int) -> Ebi:
-    ebi = get_ebi_by_id(db, ebi_id)
+    rows = checkout_open_presences(db, ebi_id, datetime.now(timezone.utc), pin_codes=[pin_code])
+    if not rows:
+        pin_attempts.fail(ebi_id)
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Invalid pin")
+    if len(rows) > 1:
+        # ux_presence_open_pin rules this out; never check out several children
+        # on one PIN (the request's rollback undoes the UPDATE)
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Pin matches several presences")
+    record_checkouts(db, ebi.ebi_date, ebi.group_number, rows)
+    _publish_checked_out(db, ebi_id, rows)
+    mark_data_changed(db)
+    return rows[0]
+
+
+def close_ebi(db: Session, ebi_id: int, checkout_remaining: bool = False) -> Ebi:
+    ebi = get_ebi_for_update(db, ebi_id)
     if not ebi:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="EBI not found")
 
     if ebi.status == EbiStatus.ENCERRADO:
         return ebi
 
-    if any(p.exit_at is None for p in ebi.presences):
+    if checkout_remaining:
+        rows = checkout_open_presences(db, ebi.id, datetime.now(timezone.utc), CLOSE_CHECKOUT_JUSTIFICATION)
+        if rows:
+            record_checkouts(db, ebi.ebi_date, ebi.group_number, rows)
+            _publish_checked_out(db, ebi.id, rows)
+    elif has_open_presences(db, ebi.id):
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="All presences must be closed")
 
     ebi.status = EbiStatus.ENCERRADO
     ebi.finished_at = datetime.now(timezone.utc)
-    return update_ebi(db, ebi)
+    publish_ebi_event(db, ebi.id, "closed")
+    ebi = update_ebi(db, ebi)
+    mark_data_changed(db)
+    return ebi
 
 
 def reopen_ebi(db: Session, ebi_id: int, performed_by: int) -> Ebi:
@@ -158,4 +518,8 @@ def reopen_ebi(db: Session, ebi_id: int, performed_by: int) -> Ebi:
 
     audit = EbiAudit(ebi_id=ebi.id, action="REOPEN", performed_by=performed_by)
     db.add(audit)
-    return update_ebi(db, ebi)
+    publish_ebi_event(db, ebi.id, "reopened")
+    ebi = update_ebi(db, ebi)
+    invalidate_ebi_report(db, ebi.id)
+    mark_data_changed(db)
+    return ebi
@@ -1,21 +1,74 @@
+import csv
+import io
 from datetime import date
+from typing import Iterator
 
 from fastapi import HTTPException, status
-from sqlalchemy import func, select
+from sqlalchemy import case, event, func, select
 from sqlalchemy.orm import Session
 
-from app.models.ebi import Ebi
+from app.core.cache import TTLCache, current_data_version
+from app.core.config import settings
+from app.core.db import reads_from_replica
+from app.models.child import Child
+from app.models.ebi import Ebi, EbiStatus
 from app.models.presence import EbiPresence
+from app.models.presence_rollup import PresenceMonthlyRollup
 from app.models.user import User, UserRole
+from app.repositories.ebi_repo import get_ebi_detail
+from app.services.rollup_service import stay_seconds
+
+GROUP_NUMBERS = range(1, 5)
+
+PRESENCE_CSV_HEADER = [
+    "ebi_date",
+    "group_number",
+    "child_name",
+    "guardian_name_day",
+    "guardian_phone_day",
+    "entry_at",
+    "exit_at",
+    "stay_minutes",
+    "checkout_justification",
+]
+CSV_BATCH_ROWS = 500
+
+# Entries are keyed by the data version, so any committed write retires them;
+# the TTL bounds staleness for writes made by other worker processes (closed-EBI
+# reports included: a reopen elsewhere only reaches this process by expiry). Reports
+# read on a lagging replica are kept apart from the primary's, so a client that
+# just wrote (and reads the primary) never gets one.
+report_cache = TTLCache(settings.report_cache_max_entries, settings.report_cache_ttl_seconds)
+
+
+def _month_starts(today: date, count: int) -> list[date]:
+    """First day of the current month and the `count - 1` months before it, oldest first."""
+    months = []
+    year, month = today.year, today.month
+    for _ in range(count):
+        months.append(date(year, month, 1))
+        if month == 1:
+            year, month = year - 1, 12
+        else:
+            month -= 1
+    return list(reversed(months))
+
+
+def _count_where(condition):
+    return func.count(case((condition, 1)))
 
 
 def get_general_report(db: Session) -> dict:
-    total_coordenadoras = db.execute(
-        select(func.count()).select_from(User).where(User.role == UserRole.COORDENADORA)
-    ).scalar_one()
-    total_colaboradoras = db.execute(
-        select(func.count()).select_from(User).where(User.role == UserRole.COLABORADORA)
-    ).scalar_one()
+    # Role and group totals in a single pass over users
+    user_totals = db.execute(
+        select(
+            _count_where(User.role == UserRole.COORDENADORA),
+            _count_where(User.role == UserRole.COLABORADORA),
+            *[_count_where(User.group_number == group_number) for group_number in GROUP_NUMBERS],
+        )
+    ).one()
+    total_coordenadoras, total_colaboradoras, *group_counts = user_totals
+    by_group = {str(group_number): count for group_number, count in zip(GROUP_NUMBERS, group_counts)}
 
     people_rows = db.execute(select(User.full_name, User.role).order_by(User.full_name.asc())).all()
     people = [
@@ -23,89 +76,48 @@ def get_general_report(db: Session) -> dict:
         for full_name, role in people_rows
     ]
 
-    by_group = {}
-    for group_number in range(1, 5):
-        count = db.execute(
-            select(func.count()).select_from(User).where(User.group_number == group_number)
-        ).scalar_one()
-        by_group[str(group_number)] = count
-
     today = date.today()
-    month_start = date(today.year, today.month, 1)
+    months = _month_starts(today, 12)
+    month_start = months[-1]
     year_start = date(today.year, 1, 1)
 
-    month_ebi_ids = db.execute(
-        select(Ebi.id).where(Ebi.ebi_date >= month_start)
-    ).scalars().all()
-    year_ebi_ids = db.execute(select(Ebi.id).where(Ebi.ebi_date >= year_start)).scalars().all()
-
-    month_ebi_count = len(month_ebi_ids)
-    year_ebi_count = len(year_ebi_ids)
-
-    month_presence_count = 0
-    year_presence_count = 0
-    if month_ebi_ids:
-        month_presence_count = db.execute(
-            select(func.count()).select_from(EbiPresence).where(EbiPresence.ebi_id.in_(month_ebi_ids))
-        ).scalar_one()
-    if year_ebi_ids:
-        year_presence_count = db.execute(
-            select(func.count()).select_from(EbiPresence).where(EbiPresence.ebi_id.in_(year_ebi_ids))
-        ).scalar_one()
+    # Per-month totals come from the incrementally maintained rollup, so this
+    # reads at most 12 months x 4 groups rows. The window is left open-ended so
+    # EBIs scheduled later this month/year still count in the averages.
+    month_rows = db.execute(
+        select(
+            PresenceMonthlyRollup.month,
+            func.sum(PresenceMonthlyRollup.ebi_count),
+            func.sum(PresenceMonthlyRollup.presence_count),
+        )
+        .where(PresenceMonthlyRollup.month >= months[0])
+        .group_by(PresenceMonthlyRollup.month)
+    ).all()
+    totals_by_month = {
+        month: (int(ebi_count), int(presence_count)) for month, ebi_count, presence_count in month_rows
+    }
+
+    def _sum_since(start: date) -> tuple[int, int]:
+        ebi_total = presence_total = 0
+        for month, (ebi_count, presence_count) in totals_by_month.items():
+            if month >= start:
+                ebi_total += ebi_count
+                presence_total += presence_count
+        return ebi_total, presence_total
+
+    month_ebi_count, month_presence_count = _sum_since(month_start)
+    year_ebi_count, year_presence_count = _sum_since(year_start)
 
     average_presence_month = (
         month_presence_count / month_ebi_count if month_ebi_count > 0 else 0
     )
     average_presence_year = year_presence_count / year_ebi_count if year_ebi_count > 0 else 0
 
-    last_3_months_counts = []
+    last_3_months_counts = [totals_by_month.get(month, (0, 0))[1] for month in months[-3:]]
     last_12_months_avg = []
-    month_cursor = today
-    for _ in range(3):
-        start = date(month_cursor.year, month_cursor.month, 1)
-        if month_cursor.month == 12:
-            end = date(month_cursor.year + 1, 1, 1)
-        else:
-            end = date(month_cursor.year, month_cursor.month + 1, 1)
-
-        ebi_ids = db.execute(
-            select(Ebi.id).where(Ebi.ebi_date >= start, Ebi.ebi_date < end)
-        ).scalars().all()
-        count = 0
-        if ebi_ids:
-            count = db.execute(
-                select(func.count()).select_from(EbiPresence).where(EbiPresence.ebi_id.in_(ebi_ids))
-            ).scalar_one()
-        last_3_months_counts.append(count)
-        month_cursor = date(start.year, start.month, 1)
-        if month_cursor.month == 1:
-            month_cursor = date(month_cursor.year - 1, 12, 1)
-        else:
-            month_cursor = date(month_cursor.year, month_cursor.month - 1, 1)
-
-    month_cursor = today
-    for _ in range(12):
-        start = date(month_cursor.year, month_cursor.month, 1)
-        if month_cursor.month == 12:
-            end = date(month_cursor.year + 1, 1, 1)
-        else:
-            end = date(month_cursor.year, month_cursor.month + 1, 1)
-
-        ebi_ids = db.execute(
-            select(Ebi.id).where(Ebi.ebi_date >= start, Ebi.ebi_date < end)
-        ).scalars().all()
-        count = 0
-        if ebi_ids:
-            count = db.execute(
-                select(func.count()).select_from(EbiPresence).where(EbiPresence.ebi_id.in_(ebi_ids))
-            ).scalar_one()
-        avg = count / len(ebi_ids) if ebi_ids else 0
-        last_12_months_avg.append(avg)
-        month_cursor = date(start.year, start.month, 1)
-        if month_cursor.month == 1:
-            month_cursor = date(month_cursor.year - 1, 12, 1)
-        else:
-            month_cursor = date(month_cursor.year, month_cursor.month - 1, 1)
+    for month in months:
+        ebi_count, presence_count = totals_by_month.get(month, (0, 0))
+        last_12_months_avg.append(presence_count / ebi_count if ebi_count else 0)
 
     return {
         "people": people,
@@ -114,17 +126,17 @@ def get_general_report(db: Session) -> dict:
         "by_group": by_group,
         "average_presence_month": average_presence_month,
         "average_presence_year": average_presence_year,
-        "last_3_months_counts": list(reversed(last_3_months_counts)),
-        "last_12_months_avg": list(reversed(last_12_months_avg)),
+        "last_3_months_counts": last_3_months_counts,
+        "last_12_months_avg": last_12_months_avg,
     }
 
 
 def get_ebi_report(db: Session, ebi_id: int) -> dict:
-    ebi = db.get(Ebi, ebi_id)
+    ebi = get_ebi_detail(db, ebi_id)
     if not ebi:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="EBI not found")
 
-    coordinator = db.get(User, ebi.coordinator_id)
+    coordinator = ebi.coordinator
     collaborators = [user.full_name for user in ebi.collaborators]
 
     presences = []
@@ -147,3 +159,114 @@ def get_ebi_report(db: Session, ebi_id: int) -> dict:
         "collaborators": collaborators,
         "presences": presences,
     }
+
+
+def get_general_report_cached(db: Session) -> dict:
+    key = ("general", current_data_version(), reads_from_replica(db))
+    report = report_cache.get(key)
+    if report is None:
+        report = get_general_report(db)
+        report_cache.set(key, report)
+    return report
+
+
+def get_ebi_report_cached(db: Session, ebi_id: int) -> dict:
+    # A closed EBI cannot change until it is reopened, so its report survives
+    # data version bumps; reopen_ebi drops it in this process, the TTL elsewhere.
+    closed_key = ("ebi-closed", ebi_id)
+    report = report_cache.get(closed_key)
+    if report is not None:
+        return report
+
+    key = ("ebi", ebi_id, current_data_version(), reads_from_replica(db))
+    report = report_cache.get(key)
+    if report is None:
+        report = get_ebi_report(db, ebi_id)
+        ebi = db.get(Ebi, ebi_id)
+        # A lagging replica may still show an EBI closed after its reopen was
+        # committed (and the entry dropped); only the primary's view is shared
+        if ebi.status == EbiStatus.ENCERRADO and not reads_from_replica(db):
+            report_cache.set(closed_key, report)
+        else:
+            report_cache.set(key, report)
+    return report
+
+
+_REOPENED_EBIS_KEY = "reopened_ebi_reports"
+
+
+def invalidate_ebi_report(db: Session, ebi_id: int) -> None:
+    """Drop the closed-EBI report once `db` commits.
+
+    Not before: a report read in the meantime still sees the EBI closed and
+    would be cached again for good.
+    """
+    db.info.setdefault(_REOPENED_EBIS_KEY, set()).add(ebi_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_reopened_reports(session: Session) -> None:
+    for ebi_id in session.info.pop(_REOPENED_EBIS_KEY, ()):
+        report_cache.delete(("ebi-closed", ebi_id))
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_reopened_reports(session: Session) -> None:
+    session.info.pop(_REOPENED_EBIS_KEY, None)
+
+
+def iter_presences_csv(
+    db: Session, date_from: date | None, date_to: date | None, group_number: int | None
+) -> Iterator[str]:
+    """Yield the presences in the range as CSV chunks, streaming rows from a server-side cursor."""
+    stmt = (
+        select(
+            Ebi.ebi_date,
+            Ebi.group_number,
+            Child.name,
+            EbiPresence.guardian_name_day,
+            EbiPresence.guardian_phone_day,
+            EbiPresence.entry_at,
+            EbiPresence.exit_at,
+            EbiPresence.checkout_justification,
+        )
+        .join(EbiPresence, EbiPresence.ebi_id == Ebi.id)
+        .join(Child, Child.id == EbiPresence.child_id)
+        .order_by(Ebi.ebi_date, Ebi.group_number, EbiPresence.entry_at, EbiPresence.id)
+        .execution_options(yield_per=CSV_BATCH_ROWS)
+    )
+    if date_from:
+        stmt = stmt.where(Ebi.ebi_date >= date_from)
+    if date_to:
+        stmt = stmt.where(Ebi.ebi_date <= date_to)
+    if group_number:
+        stmt = stmt.where(Ebi.group_number == group_number)
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM so spreadsheet apps detect UTF-8 (accented names)
+    buffer.write("\ufeff")
+    writer.writerow(PRESENCE_CSV_HEADER)
+
+    for partition in db.execute(stmt).partitions():
+        for ebi_date, group, child_name, guardian_name, guardian_phone, entry_at, exit_at, justification in partition:
+            writer.writerow(
+                [
+                    ebi_date.isoformat(),
+                    group,
+                    child_name,
+                    guardian_name,
+                    guardian_phone,
+                    entry_at.isoformat(),
+                    exit_at.isoformat() if exit_at else "",
+                    stay_seconds(entry_at, exit_at) // 60 if exit_at else "",
+                    justification or "",
+                ]
+            )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+    remaining = buffer.getvalue()
+    if remaining:
+        yield remaining
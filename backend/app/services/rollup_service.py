@@ -0,0 +1,126 @@
+from collections import defaultdict
+from datetime import date, datetime, timezone
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.core.db import dialect_insert
+from app.models.ebi import Ebi
+from app.models.presence import EbiPresence
+from app.models.presence_rollup import PresenceMonthlyRollup
+
+COUNTERS = ("ebi_count", "presence_count", "checked_out_count", "total_stay_seconds")
+
+
+def month_key(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def stay_seconds(entry_at: datetime, exit_at: datetime) -> int:
+    # SQLite hands timestamps back naive; they are stored in UTC
+    if entry_at.tzinfo is None:
+        entry_at = entry_at.replace(tzinfo=timezone.utc)
+    if exit_at.tzinfo is None:
+        exit_at = exit_at.replace(tzinfo=timezone.utc)
+    return max(int((exit_at - entry_at).total_seconds()), 0)
+
+
+def _apply_delta(db: Session, ebi_date: date, group_number: int, **deltas: int) -> None:
+    """Add `deltas` to the (month, group) row inside the caller's transaction.
+
+    One upsert: concurrent first writes for a new month cannot both insert.
+    """
+    deltas = {name: value for name, value in deltas.items() if value}
+    if not deltas:
+        return
+
+    table = PresenceMonthlyRollup.__table__
+    row = {name: 0 for name in COUNTERS}
+    row.update(deltas)
+    stmt = dialect_insert(db)(table).values(month=month_key(ebi_date), group_number=group_number, **row)
+    # ON CONFLICT ... DO UPDATE skips Column.onupdate, so updated_at is set here
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["month", "group_number"],
+        set_={**{name: table.c[name] + stmt.excluded[name] for name in deltas}, "updated_at": func.now()},
+    )
+    db.execute(stmt)
+
+
+def _ebi_totals(db: Session, ebi_id: int) -> dict[str, int]:
+    rows = db.execute(
+        select(EbiPresence.entry_at, EbiPresence.exit_at).where(EbiPresence.ebi_id == ebi_id)
+    ).all()
+    checked_out = [(entry_at, exit_at) for entry_at, exit_at in rows if exit_at is not None]
+    return {
+        "ebi_count": 1,
+        "presence_count": len(rows),
+        "checked_out_count": len(checked_out),
+        "total_stay_seconds": sum(stay_seconds(entry_at, exit_at) for entry_at, exit_at in checked_out),
+    }
+
+
+def record_ebi_created(db: Session, ebi: Ebi) -> None:
+    _apply_delta(db, ebi.ebi_date, ebi.group_number, ebi_count=1)
+
+
+def record_ebi_moved(db: Session, ebi: Ebi, old_date: date, old_group_number: int) -> None:
+    """Move an EBI's totals when its date or group is edited."""
+    if month_key(old_date) == month_key(ebi.ebi_date) and old_group_number == ebi.group_number:
+        return
+
+    totals = _ebi_totals(db, ebi.id)
+    _apply_delta(db, old_date, old_group_number, **{name: -value for name, value in totals.items()})
+    _apply_delta(db, ebi.ebi_date, ebi.group_number, **totals)
+
+
+def record_presence_added(db: Session, ebi_date: date, group_number: int, count: int = 1) -> None:
+    _apply_delta(db, ebi_date, group_number, presence_count=count)
+
+
+def record_checkout(db: Session, ebi: Ebi, presence: EbiPresence) -> None:
+    record_checkouts(db, ebi.ebi_date, ebi.group_number, [presence])
+
+
+def record_checkouts(db: Session, ebi_date: date, group_number: int, presences) -> None:
+    """`presences` only need `entry_at` and `exit_at` (ORM objects or result rows)."""
+    _apply_delta(
+        db,
+        ebi_date,
+        group_number,
+        checked_out_count=len(presences),
+        total_stay_seconds=sum(stay_seconds(presence.entry_at, presence.exit_at) for presence in presences),
+    )
+
+
+def rebuild_rollup(db: Session) -> int:
+    """Recompute every rollup row from `ebi` and `ebi_presence`. Does not commit."""
+    totals: dict[tuple[date, int], dict[str, int]] = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+
+    ebi_rows = db.execute(
+        select(Ebi.ebi_date, Ebi.group_number).execution_options(yield_per=1000)
+    )
+    for ebi_date, group_number in ebi_rows:
+        totals[(month_key(ebi_date), group_number)]["ebi_count"] += 1
+
+    presence_rows = db.execute(
+        select(Ebi.ebi_date, Ebi.group_number, EbiPresence.entry_at, EbiPresence.exit_at)
+        .join(EbiPresence, EbiPresence.ebi_id == Ebi.id)
+        .execution_options(yield_per=1000)
+    )
+    for ebi_date, group_number, entry_at, exit_at in presence_rows:
+        row = totals[(month_key(ebi_date), group_number)]
+        row["presence_count"] += 1
+        if exit_at is not None:
+            row["checked_out_count"] += 1
+            row["total_stay_seconds"] += stay_seconds(entry_at, exit_at)
+
+    db.execute(delete(PresenceMonthlyRollup))
+    if totals:
+        db.execute(
+            insert(PresenceMonthlyRollup.__table__),
+            [
+                {"month": month, "group_number": group_number, **counters}
+                for (month, group_number), counters in totals.items()
+            ],
+        )
+    return len(totals)
@@ -0,0 +1,219 @@
+import asyncio
+import bisect
+import logging
+import threading
+import time
+from typing import Callable, Iterable
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.db import SessionLocal
+from app.core.search import normalize_name
+from app.models.child import Child
+from app.models.guardian import ChildGuardian
+
+logger = logging.getLogger(__name__)
+
+
+def _digits(value: str) -> str:
+    return "".join(ch for ch in value if ch.isdigit())
+
+
+def _name_keys(name: str) -> set[str]:
+    """Normalized name plus every word suffix, so "silva" finds "João Silva"."""
+    words = normalize_name(name).split()
+    return {" ".join(words[i:]) for i in range(len(words))}
+
+
+class ChildSuggestIndex:
+    """In-process prefix index over child names and guardian phones.
+
+    Keys live in sorted lists of (key, child_id) and a prefix lookup is a
+    bisect plus a short forward scan. Each worker process holds its own copy,
+    patched by commit hooks and reloaded in the background once older than
+    `max_age_seconds`, which bounds how long writes made by other workers
+    stay invisible.
+    """
+
+    def __init__(self, max_age_seconds: float):
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.Lock()
+        self._names: list[tuple[str, int]] = []
+        self._phones: list[tuple[str, int]] = []
+        self._entries: dict[int, tuple[str, set[str], set[str]]] = {}
+        self.loaded_at: float | None = None
+        # Upserts committed while a reload reads the database, replayed onto its result
+        self._reloading = False
+        self._replay: list[tuple[int, str, list[str]]] = []
+
+    @property
+    def is_fresh(self) -> bool:
+        return self.loaded_at is not None and time.monotonic() - self.loaded_at < self.max_age_seconds
+
+    @property
+    def is_reloading(self) -> bool:
+        return self._reloading
+
+    def load(self, children: Iterable[tuple[int, str, Iterable[str]]]) -> None:
+        self.reload(lambda: children)
+
+    def reload(self, fetch: Callable[[], Iterable[tuple[int, str, Iterable[str]]]]) -> bool:
+        """Rebuild from `fetch()` and swap it in; False if another reload is running."""
+        with self._lock:
+            if self._reloading:
+                return False
+            self._reloading, self._replay = True, []
+        try:
+            names, phones, entries = [], [], {}
+            for child_id, name, guardian_phones in fetch():
+                name_keys = _name_keys(name)
+                phone_keys = {_digits(phone) for phone in guardian_phones} - {""}
+                entries[child_id] = (name, name_keys, phone_keys)
+                names.extend((key, child_id) for key in name_keys)
+                phones.extend((key, child_id) for key in phone_keys)
+            names.sort()
+            phones.sort()
+            with self._lock:
+                self._names, self._phones, self._entries = names, phones, entries
+                for entry in self._replay:
+                    self._upsert_locked(*entry)
+                self.loaded_at = time.monotonic()
+        finally:
+            with self._lock:
+                self._reloading, self._replay = False, []
+        return True
+
+    def upsert(self, child_id: int, name: str, guardian_phones: Iterable[str]) -> None:
+        guardian_phones = list(guardian_phones)
+        with self._lock:
+            if self._reloading:
+                self._replay.append((child_id, name, guardian_phones))
+            # Before the first load there is nothing to patch
+            if self.loaded_at is not None:
+                self._upsert_locked(child_id, name, guardian_phones)
+
+    def _upsert_locked(self, child_id: int, name: str, guardian_phones: list[str]) -> None:
+        name_keys = _name_keys(name)
+        phone_keys = {_digits(phone) for phone in guardian_phones} - {""}
+        self._discard(child_id)
+        self._entries[child_id] = (name, name_keys, phone_keys)
+        for key in name_keys:
+            bisect.insort(self._names, (key, child_id))
+        for key in phone_keys:
+            bisect.insort(self._phones, (key, child_id))
+
+    def _discard(self, child_id: int) -> None:
+        entry = self._entries.pop(child_id, None)
+        if entry is None:
+            return
+        _, name_keys, phone_keys = entry
+        for keys, items in ((name_keys, self._names), (phone_keys, self._phones)):
+            for key in keys:
+                position = bisect.bisect_left(items, (key, child_id))
+                if position < len(items) and items[position] == (key, child_id):
+                    del items[position]
+
+    def search(self, query: str, limit: int) -> list[tuple[int, str]]:
+        digits = _digits(query)
+        if digits and not any(ch.isalpha() for ch in query):
+            prefix, items = digits, self._phones
+        else:
+            prefix, items = normalize_name(query), self._names
+        if not prefix:
+            return []
+
+        results: dict[int, str] = {}
+        with self._lock:
+            position = bisect.bisect_left(items, (prefix, 0))
+            while position < len(items) and len(results) < limit:
+                key, child_id = items[position]
+                if not key.startswith(prefix):
+                    break
+                results.setdefault(child_id, self._entries[child_id][0])
+                position += 1
+        return sorted(results.items(), key=lambda item: normalize_name(item[1]))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._names, self._phones, self._entries = [], [], {}
+            self.loaded_at = None
+            self._reloading, self._replay = False, []
+
+
+child_suggest_index = ChildSuggestIndex(settings.child_suggest_max_age_seconds)
+
+
+def load_child_suggest_index(db: Session) -> None:
+    """Build the index from two column-only queries (no ORM objects)."""
+
+    def fetch():
+        phones: dict[int, list[str]] = {}
+        for child_id, phone in db.execute(select(ChildGuardian.child_id, ChildGuardian.phone)):
+            phones.setdefault(child_id, []).append(phone)
+        rows = db.execute(select(Child.id, Child.name)).all()
+        logger.info("Child suggest index loaded with %d children", len(rows))
+        return [(child_id, name, phones.get(child_id, [])) for child_id, name in rows]
+
+    child_suggest_index.reload(fetch)
+
+
+def warm_up_child_suggest_index() -> None:
+    """Startup hook and background refresh; a failed warm-up leaves the load to the first lookup."""
+    db = SessionLocal()
+    try:
+        load_child_suggest_index(db)
+    except Exception:
+        logger.warning("Child suggest index warm-up failed", exc_info=True)
+    finally:
+        db.close()
+
+
+# run_sync executes on the event-loop thread: waiting on a thread lock there would
+# block the loop while the load's own queries need it
+_first_load_lock = asyncio.Lock()
+
+
+async def ensure_child_suggest_index(db: AsyncSession) -> None:
+    """Load the index on the first lookup of a process without warm-up, once."""
+    if child_suggest_index.loaded_at is not None:
+        return
+    async with _first_load_lock:
+        if child_suggest_index.loaded_at is None:
+            await db.run_sync(load_child_suggest_index)
+
+
+def _refresh_in_background() -> None:
+    if not child_suggest_index.is_reloading:
+        threading.Thread(target=warm_up_child_suggest_index, name="child-suggest-refresh", daemon=True).start()
+
+
+def suggest_children(db: Session, query: str, limit: int) -> list[tuple[int, str]]:
+    """Answer from memory, never loading inline (see `ensure_child_suggest_index`)."""
+    if child_suggest_index.loaded_at is not None and not child_suggest_index.is_fresh:
+        # Serve the current copy; a reload that loses the race is a no-op
+        _refresh_in_background()
+    return child_suggest_index.search(query, limit)
+
+
+_PENDING_CHILDREN_KEY = "pending_suggest_children"
+
+
+def index_child(db: Session, child: Child) -> None:
+    """Upsert the child into the index once `db` commits."""
+    # Read now: attributes are expired (and no SQL is allowed) in after_commit
+    entry = (child.id, child.name, [guardian.phone for guardian in child.guardians])
+    db.info.setdefault(_PENDING_CHILDREN_KEY, []).append(entry)
+
+
+@event.listens_for(Session, "after_commit")
+def _index_pending_children(session: Session) -> None:
+    for entry in session.info.pop(_PENDING_CHILDREN_KEY, []):
+        child_suggest_index.upsert(*entry)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending_children(session: Session) -> None:
+    session.info.pop(_PENDING_CHILDREN_KEY, None)
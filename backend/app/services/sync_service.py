@@ -0,0 +1,194 @@
+import hashlib
+import json
+from datetime import datetime, timezone
+
+from fastapi import HTTPException, status
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.cache import mark_data_changed
+from app.models.sync_operation import SyncOperation
+from app.repositories.sync_repo import get_sync_operations
+from app.schemas.child import ChildOut
+from app.schemas.presence import PresenceOut
+from app.services.child_service import build_child
+from app.services.ebi_service import check_in, check_out
+from app.services.suggest_service import index_child
+from app.services.whatsapp_service import enqueue_pin_whatsapp
+
+
+class _SyncEffects:
+    """What the applied operations need once the batch is done (PIN messages, reindexing)."""
+
+    def __init__(self):
+        self.children = []
+        self.check_ins = {}
+        self.checked_out_ids = set()
+
+
+def _request_hash(operation) -> str:
+    payload = operation.model_dump(mode="json", exclude={"idempotency_key"})
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def _batch_keys(operations) -> set[str]:
+    """Keys of the batch and of the operations it references, loaded in one query."""
+    keys = set()
+    for operation in operations:
+        keys.add(operation.idempotency_key)
+        ref = getattr(operation, "child_ref", None) or getattr(operation, "presence_ref", None)
+        if ref:
+            keys.add(ref)
+    return keys
+
+
+def _occurred_at(value: datetime | None) -> datetime:
+    """When the tablet recorded the operation; naive times are UTC and the future is clamped."""
+    now = datetime.now(timezone.utc)
+    if value is None:
+        return now
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return min(value, now)
+
+
+def _resolve_ref(outcomes: dict[str, SyncOperation], ref: str, op: str) -> int:
+    """Server id created by an earlier operation of type `op`."""
+    record = outcomes.get(ref)
+    if record is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Referenced operation not found")
+    if record.op != op:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Referenced operation has the wrong type")
+    if record.status_code != status.HTTP_200_OK:
+        raise HTTPException(status_code=status.HTTP_424_FAILED_DEPENDENCY, detail="Referenced operation failed")
+    return record.result["id"]
+
+
+def _apply_operation(db: Session, operation, outcomes: dict[str, SyncOperation], effects: _SyncEffects) -> dict:
+    if operation.op == "create_child":
+        child = build_child(operation.child)
+        db.add(child)
+        db.flush()
+        effects.children.append(child)
+        return ChildOut.model_validate(child).model_dump(mode="json")
+
+    if operation.op == "check_in":
+        child_id = operation.child_id
+        if child_id is None:
+            child_id = _resolve_ref(outcomes, operation.child_ref, "create_child")
+        presence = check_in(
+            db,
+            operation.ebi_id,
+            child_id,
+            operation.guardian_name_day,
+            operation.guardian_phone_day,
+            entry_at=_occurred_at(operation.occurred_at),
+        )
+        effects.check_ins[presence.id] = presence
+        return PresenceOut(**presence._mapping).model_dump(mode="json")
+
+    presence_id = operation.presence_id
+    if presence_id is None:
+        presence_id = _resolve_ref(outcomes, operation.presence_ref, "check_in")
+    presence = check_out(
+        db,
+        presence_id,
+        operation.pin_code,
+        operation.checkout_justification,
+        exit_at=_occurred_at(operation.occurred_at),
+    )
+    db.flush()
+    effects.checked_out_ids.add(presence.id)
+    return PresenceOut(
+        id=presence.id,
+        child_id=presence.child_id,
+        child_name=presence.child.name,
+        guardian_name_day=presence.guardian_name_day,
+        guardian_phone_day=presence.guardian_phone_day,
+        entry_at=presence.entry_at,
+        exit_at=presence.exit_at,
+        checkout_justification=presence.checkout_justification,
+    ).model_dump(mode="json")
+
+
+def _insert_record(db: Session, record: SyncOperation) -> None:
+    """Store the outcome now, alone in a savepoint, so only its key can be the conflict."""
+    try:
+        with db.begin_nested():
+            db.add(record)
+            db.flush()
+    except IntegrityError:
+        # Another request is applying (or just applied) the same key
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Sync batch already in progress")
+
+
+def _result(record: SyncOperation, result_status: str) -> dict:
+    return {
+        "idempotency_key": record.idempotency_key,
+        "status": result_status,
+        "status_code": record.status_code,
+        "result": record.result,
+        "detail": record.detail,
+    }
+
+
+def apply_sync_batch(db: Session, user_id: int, operations) -> list[dict]:
+    """Apply an offline batch in order, in one transaction, with one result per operation.
+
+    Each operation runs in a savepoint, so a rejected one (EBI closed, wrong
+    PIN, ...) is reported without undoing the others. Every outcome, failures
+    included, is stored under the user's idempotency key: a retried batch
+    replays the stored results instead of applying anything twice.
+    """
+    outcomes = get_sync_operations(db, user_id, _batch_keys(operations))
+    effects = _SyncEffects()
+    results = []
+
+    for operation in operations:
+        request_hash = _request_hash(operation)
+        record = outcomes.get(operation.idempotency_key)
+        if record is not None:
+            if record.request_hash != request_hash:
+                results.append({
+                    "idempotency_key": operation.idempotency_key,
+                    "status": "failed",
+                    "status_code": status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    "result": None,
+                    "detail": "Idempotency key reused with a different operation",
+                })
+            else:
+                results.append(_result(record, "replayed"))
+            continue
+
+        record = SyncOperation(
+            idempotency_key=operation.idempotency_key,
+            user_id=user_id,
+            op=operation.op,
+            request_hash=request_hash,
+        )
+        try:
+            with db.begin_nested():
+                record.result = _apply_operation(db, operation, outcomes, effects)
+            record.status_code = status.HTTP_200_OK
+        except HTTPException as exc:
+            record.status_code = exc.status_code
+            record.detail = str(exc.detail)[:500]
+        _insert_record(db, record)
+        outcomes[record.idempotency_key] = record
+        results.append(_result(record, "applied" if record.status_code == status.HTTP_200_OK else "failed"))
+
+    # Checked in and out while offline: the PIN is no longer useful
+    enqueue_pin_whatsapp(
+        db,
+        [
+            (presence, presence.child_name)
+            for presence_id, presence in effects.check_ins.items()
+            if presence_id not in effects.checked_out_ids
+        ],
+    )
+
+    if effects.children or effects.check_ins or effects.checked_out_ids:
+        mark_data_changed(db)
+    for child in effects.children:
+        index_child(db, child)
+    return results
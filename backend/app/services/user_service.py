@@ -1,6 +1,7 @@
 from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
 
+from app.core.cache import mark_data_changed
 from app.core.security import get_password_hash
 from app.models.user import User
 from app.repositories.user_repo import create_user, get_user_by_email, get_user_by_id, update_user
@@ -19,7 +20,9 @@ def create_new_user(db: Session, user_in) -> User:
         group_number=user_in.group_number,
         password_hash=get_password_hash(user_in.password),
     )
-    return create_user(db, user)
+    user = create_user(db, user)
+    mark_data_changed(db)
+    return user
 
 
 def update_existing_user(db: Session, user_id: int, user_in) -> User:
@@ -40,4 +43,6 @@ def update_existing_user(db: Session, user_id: int, user_in) -> User:
     if user_in.password:
         user.password_hash = get_password_hash(user_in.password)
 
-    return update_user(db, user)
+    user = update_user(db, user)
+    mark_data_changed(db)
+    return user
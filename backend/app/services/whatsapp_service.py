@@ -1,12 +1,25 @@
+import asyncio
 import logging
-from typing import Any
+import random
+from contextlib import AbstractContextManager
+from datetime import timedelta
+from typing import Any, Callable
 
 import httpx
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import event
+from sqlalchemy.orm import Session
 
 from app.core.config import settings
+from app.core.db import SessionLocal
+from app.models.base import utc_now
+from app.models.notification_outbox import OutboxStatus
+from app.repositories.outbox_repo import claim_due_messages, enqueue_messages, record_delivery
 
 logger = logging.getLogger(__name__)
 
+_PENDING_OUTBOX_KEY = "pending_whatsapp_outbox"
+
 
 def _format_phone_e164(phone: str) -> str | None:
     digits = "".join(ch for ch in phone if ch.isdigit())
@@ -44,38 +57,188 @@ def _build_template_payload(to_number: str, pin_code: str, child_name: str) -> d
     }
 
 
-def send_pin_whatsapp(guardian_phone: str, child_name: str, pin_code: str) -> None:
-    if not settings.whatsapp_enabled:
-        return
+def enqueue_pin_whatsapp(db: Session, presences) -> None:
+    """Queue PIN messages for `(presence, child_name)` pairs in the caller's transaction.
 
-    if not settings.whatsapp_phone_number_id or not settings.whatsapp_access_token:
-        logger.warning("WhatsApp config missing, skipping send")
+    Does not commit; the dispatcher picks them up once the check-in commits,
+    so check-in latency never depends on the WhatsApp API.
+    """
+    if not settings.whatsapp_enabled or not presences:
         return
+    now = utc_now()
+    enqueue_messages(
+        db,
+        [
+            {
+                "presence_id": presence.id,
+                "to_phone": presence.guardian_phone_day,
+                "child_name": child_name,
+                "pin_code": presence.pin_code,
+                "status": OutboxStatus.PENDING,
+                "attempts": 0,
+                "next_attempt_at": now,
+            }
+            for presence, child_name in presences
+        ],
+    )
+    db.info[_PENDING_OUTBOX_KEY] = True
 
-    if not settings.whatsapp_template_name:
-        logger.warning("WhatsApp template name missing, skipping send")
-        return
 
-    to_number = _format_phone_e164(guardian_phone)
-    if not to_number:
-        logger.warning("Invalid phone for WhatsApp: %s", guardian_phone)
-        return
+@event.listens_for(Session, "after_commit")
+def _wake_dispatcher(session: Session) -> None:
+    if session.info.pop(_PENDING_OUTBOX_KEY, False):
+        whatsapp_dispatcher.wake()
 
-    url = (
-        f"https://graph.facebook.com/{settings.whatsapp_api_version}/"
-        f"{settings.whatsapp_phone_number_id}/messages"
-    )
-    headers = {
-        "Authorization": f"Bearer {settings.whatsapp_access_token}",
-        "Content-Type": "application/json",
-    }
 
-    payload = _build_template_payload(to_number, pin_code, child_name)
+@event.listens_for(Session, "after_rollback")
+def _drop_pending_wake(session: Session) -> None:
+    session.info.pop(_PENDING_OUTBOX_KEY, None)
 
-    try:
-        with httpx.Client(timeout=10.0) as client:
-            response = client.post(url, headers=headers, json=payload)
-        if response.status_code >= 400:
-            logger.warning("WhatsApp send failed: %s", response.text)
-    except Exception:
-        logger.exception("WhatsApp send error")
+
+def whatsapp_configured() -> bool:
+    if not settings.whatsapp_phone_number_id or not settings.whatsapp_access_token:
+        logger.warning("WhatsApp config missing, PIN messages stay queued")
+        return False
+    if not settings.whatsapp_template_name:
+        logger.warning("WhatsApp template name missing, PIN messages stay queued")
+        return False
+    return True
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Exponential backoff with jitter, capped at `whatsapp_retry_max_seconds`."""
+    delay = min(settings.whatsapp_retry_base_seconds * 2 ** (attempts - 1), settings.whatsapp_retry_max_seconds)
+    return timedelta(seconds=delay * random.uniform(0.5, 1.0))
+
+
+class WhatsAppDispatcher:
+    """Drains the outbox with one pooled keep-alive client and bounded concurrency.
+
+    Runs as a task on the app's event loop; database work goes to the
+    threadpool. Safe to run in every worker: claims never overlap.
+    """
+
+    def __init__(self, session_factory: Callable[[], AbstractContextManager[Session]] = SessionLocal):
+        self.session_factory = session_factory
+        self._client: httpx.AsyncClient | None = None
+        self._task: asyncio.Task | None = None
+        self._wake: asyncio.Event | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    async def __aenter__(self) -> "WhatsAppDispatcher":
+        concurrency = settings.whatsapp_dispatch_concurrency
+        self._client = httpx.AsyncClient(
+            base_url=settings.whatsapp_api_base_url,
+            headers={"Authorization": f"Bearer {settings.whatsapp_access_token}"},
+            timeout=settings.whatsapp_timeout_seconds,
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+        )
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self._client.aclose()
+        self._client = None
+
+    async def start(self) -> None:
+        await self.__aenter__()
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="whatsapp-dispatcher")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._loop = None
+        await self.__aexit__(None, None, None)
+
+    def wake(self) -> None:
+        """Thread-safe nudge after a commit that queued messages; no-op when not running."""
+        loop = self._loop
+        if loop is None:
+            return
+        try:
+            loop.call_soon_threadsafe(self._wake.set)
+        except RuntimeError:
+            pass
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                claimed = await self.dispatch_once()
+            except Exception:
+                logger.warning("WhatsApp dispatch failed; retrying", exc_info=True)
+                claimed = 0
+            if claimed == settings.whatsapp_dispatch_batch_size:
+                # Backlog: keep draining without waiting
+                continue
+            try:
+                await asyncio.wait_for(self._wake.wait(), settings.whatsapp_dispatch_poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def dispatch_once(self) -> int:
+        """Claim one batch of due messages, send them and record each outcome."""
+        messages = await run_in_threadpool(self._claim)
+        if not messages:
+            return 0
+        semaphore = asyncio.Semaphore(settings.whatsapp_dispatch_concurrency)
+
+        async def deliver(message):
+            async with semaphore:
+                return message.id, await self._deliver(message)
+
+        outcomes = await asyncio.gather(*(deliver(message) for message in messages))
+        await run_in_threadpool(self._record, outcomes)
+        return len(messages)
+
+    def _claim(self):
+        now = utc_now()
+        lease_until = now + timedelta(seconds=settings.whatsapp_dispatch_lease_seconds)
+        with self.session_factory() as db:
+            messages = claim_due_messages(db, now, lease_until, settings.whatsapp_dispatch_batch_size)
+            db.commit()
+        return messages
+
+    def _record(self, outcomes: list[tuple[int, dict]]) -> None:
+        with self.session_factory() as db:
+            for message_id, values in outcomes:
+                record_delivery(db, message_id, values)
+            db.commit()
+
+    async def _deliver(self, message) -> dict:
+        """Send one message; returns the outbox columns describing the outcome."""
+        to_number = _format_phone_e164(message.to_phone)
+        if not to_number:
+            return {"status": OutboxStatus.FAILED, "last_error": "Invalid phone"}
+
+        url = f"/{settings.whatsapp_api_version}/{settings.whatsapp_phone_number_id}/messages"
+        payload = _build_template_payload(to_number, message.pin_code, message.child_name)
+        try:
+            response = await self._client.post(url, json=payload)
+        except httpx.HTTPError as exc:
+            return self._retry_or_fail(message, f"{type(exc).__name__}: {exc}")
+
+        if response.status_code < 400:
+            return {"status": OutboxStatus.SENT, "sent_at": utc_now(), "last_error": None}
+        error = f"HTTP {response.status_code}: {response.text}"
+        if response.status_code == 429 or response.status_code >= 500:
+            return self._retry_or_fail(message, error)
+        # Other 4xx (bad number, template, token) will not succeed on retry
+        logger.warning("WhatsApp send failed: %s", response.text)
+        return {"status": OutboxStatus.FAILED, "last_error": error[:500]}
+
+    def _retry_or_fail(self, message, error: str) -> dict:
+        if message.attempts >= settings.whatsapp_max_attempts:
+            logger.warning("WhatsApp send gave up after %s attempts: %s", message.attempts, error)
+            return {"status": OutboxStatus.FAILED, "last_error": error[:500]}
+        return {"next_attempt_at": utc_now() + retry_delay(message.attempts), "last_error": error[:500]}
+
+
+whatsapp_dispatcher = WhatsAppDispatcher()
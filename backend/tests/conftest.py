@@ -1,22 +1,61 @@
+import asyncio
+import sqlite3
+from contextlib import contextmanager
+
+import aiosqlite
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
-from app.core.db import get_db
+from app.core.config import settings
+from app.core.query_stats import track_queries
+from app.core.db import get_db_async, get_db, get_db_read, get_db_read_async
+from app.core.metrics import http_metrics
+from app.core.replica import recent_writers
+from app.core.search import register_sqlite_functions
+from app.core.security import create_access_token
+from app.core.throttle import pin_attempts
 from app.main import app
 from app.models.base import Base
+from app.models.notification_outbox import NotificationOutbox
+from app.models.user import User, UserRole
+from app.services.report_service import report_cache
+from app.services.suggest_service import child_suggest_index
 
 # Banco em memória para testes (SQLite)
 # CheckSameThread=False é necessário para SQLite em memória com threads
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+sqlite_connection = sqlite3.connect(":memory:", check_same_thread=False)
+
+engine = create_engine("sqlite://", creator=lambda: sqlite_connection, poolclass=StaticPool)
+# Fallback em Python para as funções do pg_trgm usadas na busca
+event.listen(engine, "connect", register_sqlite_functions)
+
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False},
+async def _aiosqlite_connection():
+    return await aiosqlite.Connection(lambda: sqlite_connection, 64)
+
+
+# Rotas async (aiosqlite) sobre a MESMA conexão SQLite, logo na mesma
+# transação externa do db_session. Sem reset ao devolver ao pool: o rollback
+# apagaria os dados do teste em andamento.
+async_engine = create_async_engine(
+    "sqlite+aiosqlite://",
+    async_creator=_aiosqlite_connection,
     poolclass=StaticPool,
+    pool_reset_on_return=None,
 )
+# Contador de consultas por requisição (X-DB-Queries) nos engines de teste
+track_queries(engine)
+track_queries(async_engine.sync_engine)
+# O índice de autocomplete é carregado sob demanda pela sessão de teste
+settings.child_suggest_warmup = False
+# Eventos ao vivo são entregues em processo; sem LISTEN no Postgres
+settings.ebi_events_listen = False
+# Sem validação em segundo plano dos pools reais (não há Postgres)
+settings.db_pool_validate_seconds = 0
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
@@ -24,8 +63,27 @@ TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engin
 def setup_database():
     """Cria as tabelas no banco de memória uma vez por sessão"""
     Base.metadata.create_all(bind=engine)
+    # A primeira conexão do engine async faz rollback; que seja antes dos dados
+    asyncio.run(_warm_up_async_engine())
     yield
     Base.metadata.drop_all(bind=engine)
+    asyncio.run(async_engine.dispose())
+
+
+async def _warm_up_async_engine():
+    async with async_engine.connect():
+        pass
+
+
+@pytest.fixture(autouse=True)
+def clear_process_caches():
+    """Caches em memória são globais ao processo; cada teste começa vazio."""
+    report_cache.clear()
+    child_suggest_index.clear()
+    recent_writers.clear()
+    pin_attempts.clear()
+    http_metrics.clear()
+    yield
 
 
 @pytest.fixture(scope="function")
@@ -51,12 +109,130 @@ def client(db_session):
     Fixture do TestClient do FastAPI com override de dependência do DB.
     """
     def override_get_db():
+        # Mesmo unit of work do get_db: commit no fim, rollback se a rota falhar
         try:
             yield db_session
-        finally:
-            pass
+            db_session.commit()
+        except Exception:
+            db_session.rollback()
+            raise
+
+    async_state = {}
+
+    async def override_get_db_async():
+        # Uma sessão async por teste, aberta no loop do TestClient
+        if "session" not in async_state:
+            connection = await async_engine.connect()
+            await connection.begin()
+            async_state["connection"] = connection
+            async_state["session"] = AsyncSession(bind=connection, autoflush=False, expire_on_commit=False)
+        session = async_state["session"]
+        try:
+            yield session
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
 
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_db_async] = override_get_db_async
+    # Sem réplica nos testes comuns: leituras usam a mesma sessão
+    app.dependency_overrides[get_db_read] = override_get_db
+    app.dependency_overrides[get_db_read_async] = override_get_db_async
     with TestClient(app) as c:
         yield c
+    if "connection" in async_state:
+        asyncio.run(_close_async(async_state))
     app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def create_user(db_session):
+    """
+    Cria e commita um usuário na sessão do teste:
+
+        coordinator = create_user()
+        collaborator = create_user(UserRole.COLABORADORA, "colab@test.local", group_number=2)
+    """
+    def factory(role=UserRole.COORDENADORA, email="coord@test.local", group_number=1, password_hash="hash"):
+        user = User(
+            full_name=email.split("@")[0],
+            email=email,
+            phone="11999999999",
+            role=role,
+            group_number=group_number,
+            password_hash=password_hash,
+        )
+        db_session.add(user)
+        db_session.commit()
+        return user
+
+    return factory
+
+
+@pytest.fixture
+def auth_headers():
+    """Cabeçalho Authorization com um token de acesso do usuário: auth_headers(user)."""
+    def headers(user):
+        return {"Authorization": f"Bearer {create_access_token(str(user.id), user.role.value)}"}
+
+    return headers
+
+
+@pytest.fixture
+def whatsapp_outbox(db_session, monkeypatch):
+    """Ativa o WhatsApp e devolve as mensagens enfileiradas (nenhuma chamada à API)."""
+    monkeypatch.setattr(settings, "whatsapp_enabled", True)
+    return lambda: db_session.query(NotificationOutbox).order_by(NotificationOutbox.id).all()
+
+
+async def _close_async(async_state):
+    await async_state["session"].close()
+    await async_state["connection"].close()
+
+
+@pytest.fixture(scope="function")
+def assert_max_queries(db_session):
+    """
+    Limite rígido de consultas SQL num bloco:
+
+        with assert_max_queries(3):
+            client.get("/api/v1/ebi")
+    """
+    # Conta nos dois engines: rotas async usam o aiosqlite
+    engines = [engine, async_engine.sync_engine]
+
+    @contextmanager
+    def checker(limit: int):
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        for target in engines:
+            event.listen(target, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            for target in engines:
+                event.remove(target, "before_cursor_execute", before_cursor_execute)
+        assert len(statements) <= limit, (
+            f"{len(statements)} consultas (limite {limit}):\n" + "\n".join(statements)
+        )
+
+    return checker
+
+
+@pytest.fixture(scope="function")
+def query_budget(client, assert_max_queries):
+    """
+    Orçamento de consultas de uma requisição inteira (autenticação e ETag
+    incluídas), via assert_max_queries:
+
+        response = query_budget(4, "GET", "/api/v1/ebi", headers=headers)
+    """
+    def checker(limit: int, method: str, url: str, **kwargs):
+        with assert_max_queries(limit):
+            return client.request(method, url, **kwargs)
+
+    return checker
@@ -0,0 +1,26 @@
+import asyncio
+
+from app.api.routes import children, ebi, reports, sync
+from app.core.security import get_password_hash
+
+# --- Testes: Sessão async ---
+
+def test_login_on_async_session(client, db_session, create_user):
+    user = create_user(email="coord@async.local", password_hash=get_password_hash("s3cret-pass"))
+
+    response = client.post("/api/v1/auth/login", data={"username": user.email, "password": "s3cret-pass"})
+    assert response.status_code == 200
+    assert response.json()["user_id"] == user.id
+
+    response = client.post("/api/v1/auth/login", data={"username": user.email, "password": "wrong"})
+    assert response.status_code == 401
+
+
+def test_hot_routes_do_not_use_threadpool():
+    # CSV export fica síncrono de propósito (cursor no servidor)
+    sync_on_purpose = {reports.presences_csv_api}
+    for router in [ebi.router, children.router, reports.router, sync.router]:
+        for route in router.routes:
+            if route.endpoint in sync_on_purpose:
+                continue
+            assert asyncio.iscoroutinefunction(route.endpoint), route.path
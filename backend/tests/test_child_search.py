@@ -0,0 +1,56 @@
+from app.core.search import normalize_name, similarity
+from app.models.child import Child
+from app.repositories.child_repo import list_children
+
+# --- Helpers ---
+
+def create_children(db, names):
+    for name in names:
+        db.add(Child(name=name, guardian_name="Guardian", guardian_phone="11988888888"))
+    db.commit()
+
+# --- Testes: Busca de crianças ---
+
+def test_normalize_name_strips_accents_and_spaces():
+    assert normalize_name("  João   Conceição ") == "joao conceicao"
+
+
+def test_similarity_matches_pg_trgm():
+    # SELECT similarity('joao', 'joao silva') = 0.454545
+    assert round(similarity("joao", "joao silva"), 6) == 0.454545
+    assert similarity("", "joao") == 0.0
+
+
+def test_name_normalized_follows_name(db_session):
+    child = Child(name="Ânia", guardian_name="Guardian", guardian_phone="11988888888")
+    assert child.name_normalized == "ania"
+
+    child.name = "Érica"
+    assert child.name_normalized == "erica"
+
+
+def test_search_is_accent_insensitive(db_session):
+    create_children(db_session, ["João Pedro", "Maria", "Joana"])
+
+    items, total = list_children(db_session, "joao", 1, 10)
+
+    # "Joana" entra pela similaridade de trigramas, abaixo do acerto exato
+    assert [child.name for child in items] == ["João Pedro", "Joana"]
+    assert total == 2
+
+
+def test_search_tolerates_typos_and_ranks_by_similarity(db_session):
+    create_children(db_session, ["Gabriela Souza", "Gabriel Souza", "Rafael Lima"])
+
+    items, _ = list_children(db_session, "Gabriel Sousa", 1, 10)
+
+    assert [child.name for child in items] == ["Gabriel Souza", "Gabriela Souza"]
+
+
+def test_search_escapes_like_wildcards(db_session):
+    create_children(db_session, ["Ana", "Bia"])
+
+    items, total = list_children(db_session, "%", 1, 10)
+
+    assert items == []
+    assert total == 0
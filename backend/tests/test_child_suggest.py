@@ -0,0 +1,135 @@
+import asyncio
+import threading
+import time
+from unittest.mock import patch
+
+from app.schemas.child import ChildCreate, ChildUpdate
+from app.services.child_service import create_new_child, update_existing_child
+from app.services.suggest_service import ChildSuggestIndex, child_suggest_index, ensure_child_suggest_index
+
+# --- Helpers ---
+
+def create_child(db, name, phone):
+    return create_new_child(db, ChildCreate(name=name, guardians=[{"name": "Guardian", "phone": phone}]))
+
+# --- Testes: Índice de prefixos ---
+
+def test_index_matches_name_words_and_phones():
+    index = ChildSuggestIndex(max_age_seconds=60)
+    index.load([
+        (1, "João Silva", ["(11) 98888-0000"]),
+        (2, "Maria Joaquina", ["(11) 97777-0000"]),
+        (3, "Pedro", []),
+    ])
+
+    assert index.search("jo", 10) == [(1, "João Silva"), (2, "Maria Joaquina")]
+    assert index.search("SILV", 10) == [(1, "João Silva")]
+    assert index.search("11 9777", 10) == [(2, "Maria Joaquina")]
+    assert index.search("x", 10) == []
+
+
+def test_index_upsert_replaces_old_keys():
+    index = ChildSuggestIndex(max_age_seconds=60)
+    index.load([(1, "Ana", ["11988880000"])])
+
+    index.upsert(1, "Bia", ["11977770000"])
+
+    assert index.search("an", 10) == []
+    assert index.search("1198888", 10) == []
+    assert index.search("bi", 10) == [(1, "Bia")]
+    assert index.search("1197777", 10) == [(1, "Bia")]
+
+
+def test_reload_replays_upserts_committed_during_the_read():
+    index = ChildSuggestIndex(max_age_seconds=60)
+    index.load([(1, "Ana", [])])
+
+    def fetch():
+        # Commit de outro request enquanto o reload ainda lê o banco
+        index.upsert(2, "Bia", [])
+        return [(1, "Ana", [])]
+
+    assert index.reload(fetch) is True
+    assert index.search("bi", 10) == [(2, "Bia")]
+    assert not index.is_reloading
+
+
+def test_concurrent_reload_is_skipped():
+    index = ChildSuggestIndex(max_age_seconds=60)
+    nested = []
+
+    def fetch():
+        nested.append(index.reload(lambda: []))
+        return [(1, "Ana", [])]
+
+    assert index.reload(fetch) is True
+    assert nested == [False]
+    assert index.search("an", 10) == [(1, "Ana")]
+
+# --- Testes: Endpoint de sugestões ---
+
+def test_suggest_follows_child_writes_without_queries(client, db_session, assert_max_queries, create_user, auth_headers):
+    user = create_user()
+    headers = auth_headers(user)
+    child = create_child(db_session, "Lívia Rocha", "11966660000")
+
+    assert client.get("/api/v1/children/suggest", params={"q": "liv"}, headers=headers).json() == [
+        {"id": child.id, "name": "Lívia Rocha"}
+    ]
+
+    update_existing_child(db_session, child.id, ChildUpdate(name="Olívia Rocha"))
+    other = create_child(db_session, "Otávio", "11955550000")
+    # O índice acompanha o commit da unidade de trabalho
+    db_session.commit()
+
+    # Só a consulta do usuário autenticado
+    with assert_max_queries(1):
+        response = client.get("/api/v1/children/suggest", params={"q": "o"}, headers=headers)
+
+    assert response.json() == [
+        {"id": child.id, "name": "Olívia Rocha"},
+        {"id": other.id, "name": "Otávio"},
+    ]
+
+
+def test_first_load_runs_once_without_blocking_the_loop():
+    loads = []
+
+    class SlowSession:
+        async def run_sync(self, fn):
+            loads.append(fn)
+            # A carga cede o loop, como as consultas do aiosqlite/asyncpg
+            await asyncio.sleep(0.01)
+            child_suggest_index.load([(1, "Ana", [])])
+
+    async def two_first_lookups():
+        with patch("app.services.suggest_service._first_load_lock", asyncio.Lock()):
+            await asyncio.wait_for(
+                asyncio.gather(ensure_child_suggest_index(SlowSession()), ensure_child_suggest_index(SlowSession())),
+                timeout=1,
+            )
+
+    asyncio.run(two_first_lookups())
+
+    assert len(loads) == 1
+    assert child_suggest_index.search("an", 10) == [(1, "Ana")]
+
+
+def test_stale_index_answers_from_memory_and_refreshes_in_background(client, db_session, assert_max_queries, create_user, auth_headers):
+    user = create_user()
+    headers = auth_headers(user)
+    child = create_child(db_session, "Lívia Rocha", "11966660000")
+    db_session.commit()
+    client.get("/api/v1/children/suggest", params={"q": "liv"}, headers=headers)
+    child_suggest_index.loaded_at = time.monotonic() - child_suggest_index.max_age_seconds - 1
+
+    with patch("app.services.suggest_service.warm_up_child_suggest_index") as warm_up:
+        # O request não recarrega o índice: só a consulta do usuário autenticado
+        with assert_max_queries(1):
+            response = client.get("/api/v1/children/suggest", params={"q": "liv"}, headers=headers)
+        for thread in threading.enumerate():
+            if thread.name == "child-suggest-refresh":
+                thread.join()
+
+    assert response.json() == [{"id": child.id, "name": "Lívia Rocha"}]
+    warm_up.assert_called_once_with()
@@ -0,0 +1,68 @@
+from datetime import date, datetime, timezone
+
+from app.models.child import Child
+from app.models.ebi import Ebi, EbiStatus
+from app.models.presence import EbiPresence
+from app.models.user import UserRole
+from app.services.report_service import get_ebi_report
+
+# --- Helpers ---
+
+def create_ebi_with_children(db, coordinator, collaborators, child_count):
+    ebi = Ebi(
+        ebi_date=date.today(),
+        group_number=1,
+        coordinator_id=coordinator.id,
+        status=EbiStatus.ABERTO,
+    )
+    ebi.collaborators = collaborators
+    db.add(ebi)
+    db.flush()
+    for i in range(child_count):
+        child = Child(name=f"Child {i}", guardian_name="Guardian", guardian_phone="11988888888")
+        db.add(child)
+        db.flush()
+        db.add(
+            EbiPresence(
+                ebi_id=ebi.id,
+                child_id=child.id,
+                guardian_name_day="Guardian",
+                guardian_phone_day="11988888888",
+                entry_at=datetime.now(timezone.utc),
+                pin_code=f"{i:04d}",
+            )
+        )
+    db.commit()
+    ebi_id = ebi.id
+    # Começa com o identity map vazio, como numa requisição nova
+    db.expunge_all()
+    return ebi_id
+
+# --- Testes: Detalhe do EBI ---
+
+def test_ebi_detail_query_count_independent_of_roster(client, db_session, assert_max_queries, create_user, auth_headers):
+    coordinator = create_user(UserRole.COORDENADORA, "coord@detail.local")
+    collaborators = [
+        create_user(UserRole.COLABORADORA, f"colab{i}@detail.local") for i in range(3)
+    ]
+    headers = auth_headers(coordinator)
+    ebi_id = create_ebi_with_children(db_session, coordinator, collaborators, child_count=20)
+
+    # usuário autenticado + versão (ETag) + EBI/coordenadora + colaboradoras + presenças/crianças
+    with assert_max_queries(5):
+        response = client.get(f"/api/v1/ebi/{ebi_id}", headers=headers)
+
+    assert response.status_code == 200
+    assert len(response.json()["presences"]) == 20
+    assert len(response.json()["collaborator_ids"]) == 3
+
+
+def test_ebi_report_query_count_independent_of_roster(db_session, assert_max_queries, create_user):
+    coordinator = create_user(UserRole.COORDENADORA, "coord@detail.local")
+    ebi_id = create_ebi_with_children(db_session, coordinator, [], child_count=20)
+
+    with assert_max_queries(3):
+        report = get_ebi_report(db_session, ebi_id)
+
+    assert report["coordinator_name"] == "coord"
+    assert len(report["presences"]) == 20
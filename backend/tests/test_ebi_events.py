@@ -0,0 +1,198 @@
+import asyncio
+import json
+import threading
+from datetime import date
+from unittest.mock import patch
+
+from app.core.events import EventBroker, ebi_events, format_sse, publish_ebi_event, stream_events
+from app.core.security import create_access_token, create_stream_token
+from app.models.child import Child
+from app.models.ebi import Ebi, EbiStatus
+from app.schemas.presence import PresenceCreate
+from app.services.ebi_service import add_presence, checkout_presence, close_ebi
+
+# --- Helpers ---
+
+def create_ebi_and_child(db, coordinator):
+    ebi = Ebi(ebi_date=date.today(), group_number=1, coordinator_id=coordinator.id, status=EbiStatus.ABERTO)
+    child = Child(name="Ana", guardian_name="Mom", guardian_phone="11988888888")
+    db.add_all([ebi, child])
+    db.commit()
+    return ebi, child
+
+
+async def next_event(subscription):
+    return await asyncio.wait_for(subscription.queue.get(), timeout=1)
+
+
+# --- Testes: Broker ---
+
+def test_broker_delivers_from_other_threads():
+    broker = EventBroker(max_queue=10)
+
+    async def scenario():
+        subscription = broker.subscribe(1)
+        other = broker.subscribe(2)
+        thread = threading.Thread(target=broker.publish_local, args=(1, {"type": "closed", "ebi_id": 1}))
+        thread.start()
+        thread.join()
+        event = await next_event(subscription)
+        broker.unsubscribe(subscription)
+        broker.unsubscribe(other)
+        return event, other.queue.empty()
+
+    event, other_empty = asyncio.run(scenario())
+
+    assert event["type"] == "closed"
+    assert other_empty
+    assert broker.subscriber_count() == 0
+
+
+def test_slow_subscriber_gets_resync():
+    broker = EventBroker(max_queue=2)
+
+    async def scenario():
+        subscription = broker.subscribe(1)
+        for _ in range(3):
+            broker.publish_local(1, {"type": "checked_out", "ebi_id": 1})
+        await asyncio.sleep(0)
+        return [subscription.queue.get_nowait() for _ in range(subscription.queue.qsize())]
+
+    events = asyncio.run(scenario())
+
+    assert [event["type"] for event in events] == ["resync"]
+
+# --- Testes: Publicação transacional ---
+
+def test_service_events_are_delivered_after_commit(db_session, create_user):
+    coordinator = create_user()
+    ebi, child = create_ebi_and_child(db_session, coordinator)
+    ebi_id, child_id = ebi.id, child.id
+
+    async def scenario():
+        subscription = ebi_events.subscribe(ebi_id)
+        try:
+            presence = add_presence(db_session, ebi_id, PresenceCreate(
+                child_id=child_id, guardian_name_day="Mom", guardian_phone_day="11999999999"
+            ))
+            db_session.commit()
+            added = await next_event(subscription)
+            checkout_presence(db_session, presence.id, presence.pin_code)
+            db_session.commit()
+            checked_out = await next_event(subscription)
+            close_ebi(db_session, ebi_id)
+            db_session.commit()
+            closed = await next_event(subscription)
+            return presence, added, checked_out, closed
+        finally:
+            ebi_events.unsubscribe(subscription)
+
+    presence, added, checked_out, closed = asyncio.run(scenario())
+
+    # Só ids: nomes e PINs nunca passam pelo canal
+    assert added["data"] == {"presence_ids": [presence.id]}
+    assert checked_out["data"] == {"presence_ids": [presence.id]}
+    assert closed["type"] == "closed"
+
+
+def test_close_with_checkout_remaining_publishes_checkouts(db_session, create_user):
+    coordinator = create_user()
+    ebi, child = create_ebi_and_child(db_session, coordinator)
+    ebi_id = ebi.id
+    presence = add_presence(db_session, ebi_id, PresenceCreate(
+        child_id=child.id, guardian_name_day="Mom", guardian_phone_day="11999999999"
+    ))
+    db_session.commit()
+
+    async def scenario():
+        subscription = ebi_events.subscribe(ebi_id)
+        try:
+            close_ebi(db_session, ebi_id, checkout_remaining=True)
+            db_session.commit()
+            return [await next_event(subscription), await next_event(subscription)]
+        finally:
+            ebi_events.unsubscribe(subscription)
+
+    checked_out, closed = asyncio.run(scenario())
+
+    # Tablets tiram as crianças da lista antes de ver o EBI encerrado
+    assert checked_out["type"] == "checked_out"
+    assert checked_out["data"]["presence_ids"] == [presence.id]
+    assert closed["type"] == "closed"
+
+
+def test_oversized_event_becomes_resync(db_session):
+    async def scenario():
+        subscription = ebi_events.subscribe(42)
+        try:
+            # Acima do limite do NOTIFY do Postgres (8000 bytes)
+            publish_ebi_event(db_session, 42, "checked_out", {"presence_ids": list(range(100000, 102000))})
+            db_session.commit()
+            return await next_event(subscription)
+        finally:
+            ebi_events.unsubscribe(subscription)
+
+    assert asyncio.run(scenario()) == {"type": "resync", "ebi_id": 42, "data": None}
+
+
+def test_rolled_back_events_are_dropped(db_session):
+    async def scenario():
+        subscription = ebi_events.subscribe(42)
+        try:
+            publish_ebi_event(db_session, 42, "reopened")
+            db_session.rollback()
+            await asyncio.sleep(0)
+            return subscription.queue.empty()
+        finally:
+            ebi_events.unsubscribe(subscription)
+
+    assert asyncio.run(scenario())
+
+# --- Testes: Stream SSE ---
+
+def test_stream_formats_events_and_keepalives():
+    broker = EventBroker(max_queue=10)
+
+    async def scenario():
+        subscription = broker.subscribe(1)
+        stream = stream_events(subscription, lambda: asyncio.sleep(0, result=False), keepalive_seconds=0.01)
+        chunks = [await anext(stream), await anext(stream)]
+        broker.publish_local(1, {"type": "reopened", "ebi_id": 1, "data": None})
+        chunks.append(await anext(stream))
+        await stream.aclose()
+        return chunks
+
+    with patch("app.core.events.ebi_events", broker):
+        chunks = asyncio.run(scenario())
+
+    assert chunks[0].startswith("retry:")
+    assert chunks[1] == ": keepalive\n\n"
+    assert chunks[2] == format_sse({"type": "reopened", "ebi_id": 1, "data": None})
+    assert json.loads(chunks[2].split("data: ", 1)[1])["type"] == "reopened"
+    assert broker.subscriber_count() == 0
+
+
+def test_events_endpoint_auth_and_not_found(client, db_session, create_user):
+    coordinator = create_user()
+    token = create_access_token(str(coordinator.id), coordinator.role.value)
+
+    assert client.get("/api/v1/ebi/999/events").status_code == 401
+    response = client.get("/api/v1/ebi/999/events", params={"stream_token": create_stream_token(str(coordinator.id), 999)})
+    assert response.status_code == 404
+    # O token de acesso nunca vai na URL
+    assert client.get("/api/v1/ebi/999/events", params={"access_token": token}).status_code == 401
+    assert client.get("/api/v1/ebi/999/events", params={"stream_token": token}).status_code == 401
+
+
+def test_stream_token_is_scoped_to_one_ebi_stream(client, db_session, create_user, auth_headers):
+    coordinator = create_user()
+    ebi, _ = create_ebi_and_child(db_session, coordinator)
+    headers = auth_headers(coordinator)
+
+    response = client.post(f"/api/v1/ebi/{ebi.id}/events/token", headers=headers)
+
+    assert response.status_code == 200
+    stream_token = response.json()["stream_token"]
+    # Outro EBI ou outra rota: recusado
+    assert client.get("/api/v1/ebi/999/events", params={"stream_token": stream_token}).status_code == 401
+    assert client.get("/api/v1/ebi", headers={"Authorization": f"Bearer {stream_token}"}).status_code == 401
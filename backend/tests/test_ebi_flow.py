@@ -1,6 +1,5 @@
 import pytest
 from datetime import date, datetime, timezone
-from unittest.mock import patch
 from fastapi import HTTPException
 
 from app.models.user import User, UserRole
@@ -52,14 +51,9 @@ def create_child_with_guardian(db):
     db.refresh(child)
     return child
 
-@pytest.fixture
-def mock_whatsapp():
-    with patch("app.services.ebi_service.send_pin_whatsapp") as mock:
-        yield mock
-
 # --- Testes: Registro de Presença ---
 
-def test_add_presence_success(db_session, mock_whatsapp):
+def test_add_presence_success(db_session, whatsapp_outbox):
     # Arrange
     user = create_user(db_session)
     child = create_child_with_guardian(db_session)
@@ -87,7 +81,8 @@ def test_add_presence_success(db_session, mock_whatsapp):
     assert len(presence.pin_code) == 4
     assert presence.entry_at is not None
     assert presence.exit_at is None
-    mock_whatsapp.assert_called_once()
+    [message] = whatsapp_outbox()
+    assert (message.presence_id, message.pin_code) == (presence.id, presence.pin_code)
 
 def test_add_presence_fail_ebi_closed(db_session):
     # Arrange
@@ -115,7 +110,7 @@ def test_add_presence_fail_ebi_closed(db_session):
     assert exc.value.status_code == 409
     assert "EBI closed" in exc.value.detail
 
-def test_add_presence_fail_duplicate(db_session, mock_whatsapp):
+def test_add_presence_fail_duplicate(db_session):
     # Arrange
     user = create_user(db_session)
     child = create_child_with_guardian(db_session)
@@ -141,9 +136,46 @@ def test_add_presence_fail_duplicate(db_session, mock_whatsapp):
     assert exc.value.status_code == 409
     assert "Presence already exists" in exc.value.detail
 
+def test_add_presence_unknown_child(db_session):
+    user = create_user(db_session)
+    ebi = create_new_ebi(db_session, EbiCreate(
+        ebi_date=date.today(), group_number=1, coordinator_id=user.id, collaborator_ids=[]
+    ))
+
+    with pytest.raises(HTTPException) as exc:
+        add_presence(db_session, ebi.id, PresenceCreate(
+            child_id=9999, guardian_name_day="Mom", guardian_phone_day="11999999999"
+        ))
+    assert exc.value.status_code == 404
+    assert "Child not found" in exc.value.detail
+
+def test_add_presence_query_budget(db_session, whatsapp_outbox, assert_max_queries):
+    user = create_user(db_session)
+    child = create_child_with_guardian(db_session)
+    ebi = create_new_ebi(db_session, EbiCreate(
+        ebi_date=date.today(), group_number=1, coordinator_id=user.id, collaborator_ids=[]
+    ))
+    presence_in = PresenceCreate(
+        child_id=child.id, guardian_name_day="Mom", guardian_phone_day="11999999999"
+    )
+
+    # PINs em uso (com lock do EBI) + INSERT ... RETURNING + rollup + outbox
+    with assert_max_queries(4):
+        presence = add_presence(db_session, ebi.id, presence_in)
+
+    assert presence.child_name == "Test Child"
+    [message] = whatsapp_outbox()
+    assert (message.to_phone, message.child_name, message.pin_code) == ("11999999999", "Test Child", presence.pin_code)
+
+def test_presence_unique_constraint_in_metadata():
+    from app.models.presence import EbiPresence
+
+    names = {constraint.name for constraint in EbiPresence.__table__.constraints}
+    assert "uq_presence_ebi_child" in names
+
 # --- Testes: Saída (Checkout) ---
 
-def test_checkout_success(db_session, mock_whatsapp):
+def test_checkout_success(db_session):
     # Arrange
     user = create_user(db_session)
     child = create_child_with_guardian(db_session)
@@ -160,7 +192,7 @@ def test_checkout_success(db_session, mock_whatsapp):
     # Assert
     assert updated_presence.exit_at is not None
 
-def test_checkout_fail_invalid_pin(db_session, mock_whatsapp):
+def test_checkout_fail_invalid_pin(db_session):
     # Arrange
     user = create_user(db_session)
     child = create_child_with_guardian(db_session)
@@ -178,7 +210,7 @@ def test_checkout_fail_invalid_pin(db_session, mock_whatsapp):
 
 # --- Testes: Encerramento ---
 
-def test_close_ebi_success(db_session, mock_whatsapp):
+def test_close_ebi_success(db_session):
     # Arrange
     user = create_user(db_session)
     child = create_child_with_guardian(db_session)
@@ -197,7 +229,7 @@ def test_close_ebi_success(db_session, mock_whatsapp):
     assert closed_ebi.status == EbiStatus.ENCERRADO
     assert closed_ebi.finished_at is not None
 
-def test_close_ebi_fail_pending_checkout(db_session, mock_whatsapp):
+def test_close_ebi_fail_pending_checkout(db_session):
     # Arrange
     user = create_user(db_session)
     child = create_child_with_guardian(db_session)
@@ -0,0 +1,71 @@
+from datetime import date
+
+from app.models.ebi import Ebi, EbiStatus
+from app.repositories.ebi_repo import list_ebis
+from app.schemas.ebi import EbiFilter
+from app.services.ebi_service import build_ebi_filter, parse_ebi_search
+
+TODAY = date(2026, 10, 18)
+
+# --- Helpers ---
+
+def create_ebis(db, coordinator, specs):
+    for ebi_date, group_number, status in specs:
+        db.add(Ebi(ebi_date=ebi_date, group_number=group_number, coordinator_id=coordinator.id, status=status))
+    db.commit()
+
+# --- Testes: Interpretação do texto livre ---
+
+def test_parse_dates_and_months():
+    assert parse_ebi_search("08/03/2026", TODAY) == EbiFilter(date_from=date(2026, 3, 8), date_to=date(2026, 3, 8))
+    assert parse_ebi_search("2026-03-08", TODAY) == EbiFilter(date_from=date(2026, 3, 8), date_to=date(2026, 3, 8))
+    assert parse_ebi_search("08/03", TODAY) == EbiFilter(date_from=date(2026, 3, 8), date_to=date(2026, 3, 8))
+    assert parse_ebi_search("02/2024", TODAY) == EbiFilter(date_from=date(2024, 2, 1), date_to=date(2024, 2, 29))
+    assert parse_ebi_search("Março", TODAY) == EbiFilter(date_from=date(2026, 3, 1), date_to=date(2026, 3, 31))
+    assert parse_ebi_search("dez 2025", TODAY) == EbiFilter(date_from=date(2025, 12, 1), date_to=date(2025, 12, 31))
+    assert parse_ebi_search("2025", TODAY) == EbiFilter(date_from=date(2025, 1, 1), date_to=date(2025, 12, 31))
+
+
+def test_parse_group_and_status():
+    assert parse_ebi_search("grupo 2 encerrado", TODAY) == EbiFilter(group_number=2, status=EbiStatus.ENCERRADO)
+    assert parse_ebi_search("3", TODAY) == EbiFilter(group_number=3)
+
+
+def test_parse_rejects_unknown_text():
+    assert parse_ebi_search("domingo", TODAY) is None
+    assert parse_ebi_search("31/02/2026", TODAY) is None
+
+
+def test_build_filter_intersects_date_bounds():
+    filters = build_ebi_filter("2026", date_from=date(2026, 6, 1), month="2026-07")
+    assert (filters.date_from, filters.date_to) == (date(2026, 7, 1), date(2026, 7, 31))
+
+    assert build_ebi_filter("março 2026", month="2026-07") is None
+
+# --- Testes: Listagem ---
+
+def test_list_ebis_applies_structured_filters(db_session, create_user):
+    coordinator = create_user()
+    create_ebis(db_session, coordinator, [
+        (date(2026, 3, 1), 1, EbiStatus.ENCERRADO),
+        (date(2026, 3, 8), 2, EbiStatus.ENCERRADO),
+        (date(2026, 3, 15), 2, EbiStatus.ABERTO),
+        (date(2026, 4, 5), 2, EbiStatus.ABERTO),
+    ])
+
+    items, total = list_ebis(db_session, parse_ebi_search("março grupo 2", TODAY), 1, 10)
+
+    assert [item.ebi_date for item in items] == [date(2026, 3, 15), date(2026, 3, 8)]
+    assert total == 2
+
+
+def test_list_ebi_api_unknown_search_is_empty(client, db_session, create_user, auth_headers):
+    coordinator = create_user()
+    create_ebis(db_session, coordinator, [(date(2026, 3, 1), 1, EbiStatus.ABERTO)])
+    headers = auth_headers(coordinator)
+
+    empty = client.get("/api/v1/ebi", params={"search": "xyz", "include_total": "true"}, headers=headers)
+    by_month = client.get("/api/v1/ebi", params={"month": "2026-03", "status": "ABERTO"}, headers=headers)
+
+    assert empty.json()["items"] == [] and empty.json()["total"] == 0
+    assert [item["ebi_date"] for item in by_month.json()["items"]] == ["2026-03-01"]
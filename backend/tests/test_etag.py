@@ -0,0 +1,143 @@
+from datetime import date, datetime, timezone
+
+from app.models.child import Child
+from app.models.ebi import Ebi, EbiStatus
+from app.models.guardian import ChildGuardian
+from app.models.user import UserRole
+from app.schemas.ebi import EbiUpdate
+from app.schemas.presence import PresenceCreate
+from app.services.ebi_service import add_presence, update_existing_ebi
+
+# --- Helpers ---
+
+def create_ebi(db, coordinator):
+    ebi = Ebi(ebi_date=date.today(), group_number=1, coordinator_id=coordinator.id, status=EbiStatus.ABERTO)
+    db.add(ebi)
+    db.commit()
+    return ebi
+
+
+def create_child(db, name="Ana"):
+    child = Child(name=name, guardian_name="Mom", guardian_phone="11988888888")
+    child.guardians = [ChildGuardian(name="Mom", phone="11988888888")]
+    db.add(child)
+    db.commit()
+    return child
+
+
+def revalidate(client, url, headers, etag):
+    return client.get(url, headers={**headers, "If-None-Match": etag})
+
+
+# --- Testes: Detalhe do EBI ---
+
+def test_ebi_detail_not_modified_skips_hydration(client, db_session, assert_max_queries, create_user, auth_headers):
+    coordinator = create_user(UserRole.COORDENADORA, "coord@etag.local")
+    ebi = create_ebi(db_session, coordinator)
+    url, headers = f"/api/v1/ebi/{ebi.id}", auth_headers(coordinator)
+
+    first = client.get(url, headers=headers)
+    etag = first.headers["etag"]
+    assert first.status_code == 200
+    assert first.headers["cache-control"] == "private, no-cache"
+
+    # usuário autenticado + versão; nada de EBI, colaboradoras ou presenças
+    with assert_max_queries(2):
+        response = revalidate(client, url, headers, etag)
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert response.content == b""
+
+
+def test_ebi_detail_etag_changes_with_roster_and_collaborators(client, db_session, create_user, auth_headers):
+    coordinator = create_user(UserRole.COORDENADORA, "coord@etag.local")
+    collaborator = create_user(UserRole.COLABORADORA, "colab@etag.local")
+    ebi = create_ebi(db_session, coordinator)
+    child = create_child(db_session)
+    url, headers = f"/api/v1/ebi/{ebi.id}", auth_headers(coordinator)
+    etag = client.get(url, headers=headers).headers["etag"]
+
+    add_presence(db_session, ebi.id, PresenceCreate(
+        child_id=child.id, guardian_name_day="Mom", guardian_phone_day="11988888888"
+    ))
+    response = revalidate(client, url, headers, etag)
+    assert response.status_code == 200
+    assert len(response.json()["presences"]) == 1
+    etag = response.headers["etag"]
+
+    update_existing_ebi(db_session, ebi.id, EbiUpdate(collaborator_ids=[collaborator.id]))
+    response = revalidate(client, url, headers, etag)
+    assert response.status_code == 200
+    assert response.json()["collaborator_ids"] == [collaborator.id]
+
+# --- Testes: Criança, perfil e listas ---
+
+def test_child_etag(client, db_session, create_user, auth_headers):
+    coordinator = create_user(UserRole.COORDENADORA, "coord@etag.local")
+    child = create_child(db_session)
+    url, headers = f"/api/v1/children/{child.id}", auth_headers(coordinator)
+    etag = client.get(url, headers=headers).headers["etag"]
+
+    assert revalidate(client, url, headers, etag).status_code == 304
+
+    client.put(url, json={"guardians": [{"name": "Dad", "phone": "11977777777"}]}, headers=headers)
+    response = revalidate(client, url, headers, etag)
+    assert response.status_code == 200
+    assert response.json()["guardians"][0]["name"] == "Dad"
+
+
+def test_profile_etag(client, db_session, create_user, auth_headers):
+    user = create_user(UserRole.COLABORADORA, "colab@etag.local")
+    url, headers = "/api/v1/profile/me", auth_headers(user)
+    etag = client.get(url, headers=headers).headers["etag"]
+
+    assert revalidate(client, url, headers, etag).status_code == 304
+
+    client.put(url, json={"city": "Campinas"}, headers=headers)
+    response = revalidate(client, url, headers, etag)
+    assert response.status_code == 200
+    assert response.json()["city"] == "Campinas"
+
+
+def test_list_etags(client, db_session, create_user, auth_headers):
+    admin = create_user(UserRole.ADMINISTRADOR, "admin@etag.local")
+    headers = auth_headers(admin)
+    etags = {url: client.get(url, headers=headers).headers["etag"] for url in ["/api/v1/ebi", "/api/v1/children", "/api/v1/users"]}
+
+    for url, etag in etags.items():
+        assert revalidate(client, url, headers, etag).status_code == 304
+
+    create_ebi(db_session, admin)
+    create_child(db_session, "Bia")
+    create_user(UserRole.COLABORADORA, "new@etag.local")
+    for url, etag in etags.items():
+        assert revalidate(client, url, headers, etag).status_code == 200
+
+
+def test_list_etag_follows_writes_not_timestamps(client, db_session, create_user, auth_headers):
+    admin = create_user(UserRole.ADMINISTRADOR, "admin@etag.local")
+    child = create_child(db_session)
+    create_child(db_session, "Bia")
+    url, headers = "/api/v1/children", auth_headers(admin)
+    etag = client.get(url, headers=headers).headers["etag"]
+
+    # Mesma contagem e updated_at anterior ao máximo (transação iniciada antes da
+    # leitura, confirmada depois): count + max(updated_at) não mudariam
+    child.name = "Ana Clara"
+    child.updated_at = datetime(2000, 1, 1, tzinfo=timezone.utc)
+    db_session.commit()
+
+    response = revalidate(client, url, headers, etag)
+    assert response.status_code == 200
+    assert response.json()["items"][0]["name"] == "Ana Clara"
+
+
+def test_list_etag_depends_on_query(client, db_session, create_user, auth_headers):
+    admin = create_user(UserRole.ADMINISTRADOR, "admin@etag.local")
+    headers = auth_headers(admin)
+    etag = client.get("/api/v1/ebi?page_size=5&include_total=true", headers=headers).headers["etag"]
+
+    # Os mesmos parâmetros em outra ordem revalidam; outro filtro não
+    assert revalidate(client, "/api/v1/ebi?include_total=true&page_size=5", headers, etag).status_code == 304
+    assert revalidate(client, "/api/v1/ebi?page_size=5", headers, etag).status_code == 200
+    assert revalidate(client, "/api/v1/ebi?page_size=5&include_total=true&group=2", headers, etag).status_code == 200
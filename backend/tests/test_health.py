@@ -1,11 +1,88 @@
+import asyncio
+
+import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, exc
+from sqlalchemy.ext.asyncio import create_async_engine
 
+from app.core.pool import MeteredAsyncQueuePool, MeteredQueuePool, PoolValidator, pool_status
 from app.main import app
 
 client = TestClient(app)
 
+# --- Helpers ---
+
+def file_engine(tmp_path, **kwargs):
+    return create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=MeteredQueuePool, **kwargs)
+
+
+def kill_idle_connections(engine):
+    # Simula o Postgres reiniciado: as conexões ociosas morrem sem aviso
+    connections = [engine.raw_connection() for _ in range(engine.pool.checkedin())]
+    for connection in connections:
+        connection.dbapi_connection.close()
+        connection.close()
+
+# --- Testes: Health ---
 
 def test_health():
     response = client.get("/api/v1/health")
     assert response.status_code == 200
     assert response.json()["status"] == "ok"
+
+
+def test_health_reports_pools():
+    pools = client.get("/api/v1/health").json()["db_pools"]
+    for name in ["sync", "async"]:
+        assert {"size", "in_use", "idle", "overflow", "checkouts", "timeouts", "wait_avg_ms", "wait_max_ms"} <= pools[name].keys()
+        assert pools[name]["size"] == 10
+
+# --- Testes: Métricas do pool ---
+
+def test_pool_status_counts_checkouts_overflow_and_timeouts(tmp_path):
+    engine = file_engine(tmp_path, pool_size=1, max_overflow=1, pool_timeout=0.05)
+    first, second = engine.connect(), engine.connect()
+
+    status = pool_status(engine)
+    assert (status["in_use"], status["overflow"], status["checkouts"]) == (2, 1, 2)
+
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+    status = pool_status(engine)
+    assert status["timeouts"] == 1
+    assert status["wait_max_ms"] >= 50
+
+    first.close()
+    second.close()
+    engine.dispose()
+    # Os contadores sobrevivem à troca do pool
+    assert pool_status(engine)["checkouts"] == 2
+
+# --- Testes: Validação em segundo plano ---
+
+def test_validator_replaces_dead_idle_connections(tmp_path):
+    # Sem rollback na devolução: a conexão morta volta ao pool sem ser notada
+    engine = file_engine(tmp_path, pool_size=2, pool_reset_on_return=None)
+    first, second = engine.connect(), engine.connect()
+    first.close()
+    second.close()
+    kill_idle_connections(engine)
+
+    validator = PoolValidator([engine], interval=60)
+    asyncio.run(validator.validate_once())
+
+    # A falha de ping invalidou o pool; a próxima requisição recebe conexão nova
+    with engine.connect() as connection:
+        assert connection.exec_driver_sql("SELECT 1").scalar() == 1
+
+
+def test_validator_pings_async_idle_connections(tmp_path):
+    async def scenario():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}", poolclass=MeteredAsyncQueuePool)
+        async with engine.connect():
+            pass
+        pinged = await PoolValidator([engine], interval=60).validate_once()
+        await engine.dispose()
+        return pinged
+
+    assert asyncio.run(scenario()) == 1
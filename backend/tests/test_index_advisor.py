@@ -0,0 +1,161 @@
+import re
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import event, select
+from sqlalchemy.engine import Engine
+
+from app.models.child import Child
+from app.models.ebi import Ebi, EbiStatus
+from app.models.presence import EbiPresence
+from app.models.user import User, UserRole
+from app.models.user_document import DocumentType, UserDocument
+
+# Tabelas que crescem com o uso; nelas toda consulta quente precisa de índice
+LARGE_TABLES = {
+    "ebi",
+    "ebi_presence",
+    "ebi_colaboradoras",
+    "children",
+    "child_guardians",
+    "user_documents",
+    "users",
+}
+# "SCAN t" sem "USING ... INDEX" é uma varredura completa da tabela
+FULL_SCAN = re.compile(r"^SCAN (\w+)$")
+
+# --- Helpers ---
+
+def seed(db):
+    users = [
+        User(
+            full_name=f"User {i}",
+            email=f"user{i}@advisor.local",
+            phone="11999999999",
+            role=UserRole.COORDENADORA if i % 5 == 0 else UserRole.COLABORADORA,
+            group_number=i % 4 + 1,
+            password_hash="hash",
+        )
+        for i in range(40)
+    ]
+    db.add_all(users)
+    db.flush()
+    coordinators = [user for user in users if user.role == UserRole.COORDENADORA]
+    collaborators = [user for user in users if user.role == UserRole.COLABORADORA]
+    children = [Child(name=f"Child {i}", guardian_name="Mom", guardian_phone="11988888888") for i in range(60)]
+    db.add_all(children)
+
+    start = date.today() - timedelta(days=200)
+    ebis = []
+    for i in range(100):
+        ebi = Ebi(
+            ebi_date=start + timedelta(days=2 * i),
+            group_number=i % 4 + 1,
+            coordinator_id=coordinators[i % len(coordinators)].id,
+            status=EbiStatus.ENCERRADO if i < 99 else EbiStatus.ABERTO,
+        )
+        ebi.collaborators = collaborators[i % 10:i % 10 + 3]
+        ebis.append(ebi)
+    db.add_all(ebis)
+    db.flush()
+    entry_at = datetime.now(timezone.utc)
+    for ebi in ebis:
+        for j, child in enumerate(children[:10]):
+            db.add(EbiPresence(
+                ebi_id=ebi.id,
+                child_id=child.id,
+                guardian_name_day="Mom",
+                guardian_phone_day="11988888888",
+                entry_at=entry_at,
+                exit_at=entry_at if ebi.status == EbiStatus.ENCERRADO else None,
+                pin_code=f"{j:04d}",
+            ))
+    for user in users:
+        db.add(UserDocument(
+            user_id=user.id,
+            document_type=DocumentType.RG,
+            filename="rg.pdf",
+            file_data=b"%PDF",
+            mime_type="application/pdf",
+            file_size=4,
+        ))
+    db.commit()
+    return coordinators[0], collaborators[0], ebis[-1]
+
+
+@pytest.fixture
+def capture_selects(db_session):
+    """Coleta os SELECTs (com parâmetros) emitidos no bloco, em qualquer engine."""
+    @contextmanager
+    def capture():
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("SELECT") and not executemany:
+                statements.append((statement, parameters))
+
+        # Na classe Engine: vale para o engine sync e para o do aiosqlite
+        event.listen(Engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(Engine, "before_cursor_execute", before_cursor_execute)
+
+    return capture
+
+
+def full_scans(db, statements):
+    """EXPLAIN QUERY PLAN de cada consulta; devolve as varreduras completas de tabelas grandes."""
+    problems = []
+    for statement, parameters in statements:
+        plan = db.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+        for row in plan:
+            match = FULL_SCAN.match(row.detail)
+            if match and match.group(1) in LARGE_TABLES:
+                problems.append(f"{row.detail}\n  {statement}")
+    return problems
+
+# --- Testes: Consultas quentes usam índices ---
+
+def test_hot_queries_use_indexes(client, db_session, capture_selects, auth_headers):
+    coordinator, collaborator, open_ebi = seed(db_session)
+    coordinator_id, collaborator_id, ebi_id = coordinator.id, collaborator.id, open_ebi.id
+    headers = auth_headers(coordinator)
+    db_session.expunge_all()
+
+    with capture_selects() as statements:
+        for url in ["/api/v1/ebi", "/api/v1/children", "/api/v1/users"]:
+            assert client.get(url, headers=headers).status_code == 200
+        assert client.get("/api/v1/ebi", params={"coordinator_id": coordinator_id}, headers=headers).status_code == 200
+        assert client.get(f"/api/v1/ebi/{ebi_id}", headers=headers).status_code == 200
+        assert client.get(f"/api/v1/reports/ebi/{ebi_id}", headers=headers).status_code == 200
+        assert client.get("/api/v1/reports/general", headers=headers).status_code == 200
+        assert client.get("/api/v1/profile/me", headers=headers).status_code == 200
+        response = client.post(
+            "/api/v1/profile/me/documents",
+            data={"document_type": DocumentType.RG.value},
+            files={"file": ("rg.pdf", b"%PDF-1.4", "application/pdf")},
+            headers=headers,
+        )
+        assert response.status_code == 201
+        assert client.post(f"/api/v1/ebi/{ebi_id}/checkout-by-pin", json={"pin_code": "0003"}, headers=headers).status_code == 200
+
+        # Relacionamentos do usuário (User.coordinated_ebis / User.presences)
+        assert db_session.get(User, collaborator_id).presences
+        assert db_session.get(User, coordinator_id).coordinated_ebis
+
+    assert statements
+    assert full_scans(db_session, statements) == []
+
+
+def test_users_by_group_use_index(db_session, capture_selects):
+    seed(db_session)
+
+    # Filtro só por grupo: ix_users_role_group começa por role (no máximo um skip-scan)
+    with capture_selects() as statements:
+        assert db_session.execute(select(User.id).where(User.group_number == 2)).all()
+
+    (statement, parameters), = statements
+    plan = db_session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    assert any("ix_users_group_number" in row.detail for row in plan), [row.detail for row in plan]
@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.core.metrics import HttpMetrics, MetricsMiddleware
+from app.services.report_service import report_cache
+
+# --- Helpers ---
+
+def scrape(client):
+    response = client.get("/api/v1/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    return response.text.splitlines()
+
+
+def sample(lines, name):
+    values = [float(line.rsplit(" ", 1)[1]) for line in lines if line.startswith(name + "{") or line.startswith(name + " ")]
+    assert len(values) == 1, name
+    return values[0]
+
+
+def run_asgi(app, path="/"):
+    scope = {"type": "http", "method": "GET", "path": path, "headers": []}
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    asyncio.run(app(scope, receive, send))
+
+# --- Testes: Endpoint /metrics ---
+
+def test_requests_are_labelled_by_route_template(client, db_session, create_user, auth_headers):
+    user = create_user()
+    headers = auth_headers(user)
+    client.get("/api/v1/ebi/41", headers=headers)
+    client.get("/api/v1/ebi/42")
+    client.get("/api/v1/nao-existe")
+
+    lines = scrape(client)
+
+    route = 'method="GET",route="/api/v1/ebi/{ebi_id}"'
+    assert sample(lines, f'ebi_http_requests_total{{{route},status="404"}}') == 1
+    assert sample(lines, f'ebi_http_requests_total{{{route},status="401"}}') == 1
+    assert sample(lines, f'ebi_http_request_duration_seconds_count{{{route}}}') == 2
+    assert sample(lines, f'ebi_http_request_duration_seconds_bucket{{{route},le="+Inf"}}') == 2
+    assert sample(lines, 'ebi_http_requests_total{method="GET",route="<unmatched>",status="404"}') == 1
+    # Nenhum id na cardinalidade
+    assert not any("/api/v1/ebi/41" in line for line in lines)
+
+
+def test_histogram_buckets_are_cumulative():
+    metrics = HttpMetrics(buckets=(0.1, 1.0))
+    metrics.observe("GET", "/r", 200, 0.05)
+    metrics.observe("GET", "/r", 200, 0.5)
+    metrics.observe("GET", "/r", 500, 3.0)
+
+    lines = metrics.render()
+
+    assert sample(lines, 'ebi_http_request_duration_seconds_bucket{method="GET",route="/r",le="0.1"}') == 1
+    assert sample(lines, 'ebi_http_request_duration_seconds_bucket{method="GET",route="/r",le="1"}') == 2
+    assert sample(lines, 'ebi_http_request_duration_seconds_bucket{method="GET",route="/r",le="+Inf"}') == 3
+    assert sample(lines, 'ebi_http_request_duration_seconds_sum{method="GET",route="/r"}') == pytest.approx(3.55)
+    assert sample(lines, 'ebi_http_requests_total{method="GET",route="/r",status="500"}') == 1
+
+
+def test_in_flight_and_unhandled_errors():
+    metrics = HttpMetrics()
+    seen_in_flight = []
+
+    async def failing_app(scope, receive, send):
+        seen_in_flight.append(sample(metrics.render(), 'ebi_http_requests_in_flight{method="GET",route="<unmatched>"}'))
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        run_asgi(MetricsMiddleware(failing_app, metrics))
+
+    lines = metrics.render()
+    assert seen_in_flight == [1]
+    assert sample(lines, 'ebi_http_requests_in_flight{method="GET",route="<unmatched>"}') == 0
+    assert sample(lines, 'ebi_http_requests_total{method="GET",route="<unmatched>",status="500"}') == 1
+
+
+def test_metrics_include_threadpool_and_db_pools(client):
+    lines = scrape(client)
+
+    assert sample(lines, "ebi_threadpool_capacity") == 40
+    assert sample(lines, "ebi_threadpool_queued") == 0
+    for pool in ["sync", "async"]:
+        assert sample(lines, f'ebi_db_pool_size{{pool="{pool}"}}') == 10
+        assert sample(lines, f'ebi_db_pool_checkout_timeouts_total{{pool="{pool}"}}') >= 0
+
+
+def test_metrics_include_report_cache_stats(client):
+    report_cache.set(("general", 1), {"total": 0})
+    report_cache.get(("general", 1))
+    report_cache.get(("general", 2))
+
+    lines = scrape(client)
+
+    assert sample(lines, 'ebi_cache_entries{cache="report"}') == 1
+    assert sample(lines, 'ebi_cache_hits_total{cache="report"}') == 1
+    assert sample(lines, 'ebi_cache_misses_total{cache="report"}') == 1
+    assert sample(lines, 'ebi_cache_evictions_total{cache="report"}') == 0
+
+
+def test_metrics_can_be_disabled(client, monkeypatch):
+    monkeypatch.setattr(settings, "metrics_enabled", False)
+
+    assert client.get("/api/v1/metrics").status_code == 404
@@ -0,0 +1,84 @@
+from datetime import date
+
+from app.models.child import Child
+from app.models.ebi import Ebi, EbiStatus
+from app.models.user import UserRole
+
+# --- Helpers ---
+
+def walk_pages(client, url, headers, limit):
+    pages = []
+    params = {"limit": limit}
+    while True:
+        response = client.get(url, params=params, headers=headers)
+        assert response.status_code == 200
+        body = response.json()
+        pages.append(body["items"])
+        if not body["next_cursor"]:
+            return pages
+        params = {"limit": limit, "cursor": body["next_cursor"]}
+
+# --- Testes: Paginação por cursor ---
+
+def test_children_cursor_walks_every_row_once(client, db_session, create_user, auth_headers):
+    headers = auth_headers(create_user(UserRole.ADMINISTRADOR, "admin@pagination.local"))
+    # Nomes repetidos exercitam o desempate por id
+    for name in ["Bia", "Ana", "Caio", "Ana", "Davi"]:
+        db_session.add(Child(name=name, guardian_name="Guardian", guardian_phone="11988888888"))
+    db_session.commit()
+
+    pages = walk_pages(client, "/api/v1/children", headers, limit=2)
+
+    names = [item["name"] for page in pages for item in page]
+    ids = [item["id"] for page in pages for item in page]
+    assert names == ["Ana", "Ana", "Bia", "Caio", "Davi"]
+    assert len(set(ids)) == 5
+
+
+def test_ebi_cursor_orders_newest_first(client, db_session, create_user, auth_headers):
+    admin = create_user(UserRole.ADMINISTRADOR, "admin@pagination.local")
+    for day in [1, 15, 8, 15]:
+        db_session.add(Ebi(ebi_date=date(2026, 3, day), group_number=1, coordinator_id=admin.id, status=EbiStatus.ABERTO))
+    db_session.commit()
+
+    pages = walk_pages(client, "/api/v1/ebi", auth_headers(admin), limit=3)
+
+    dates = [item["ebi_date"] for page in pages for item in page]
+    assert dates == ["2026-03-15", "2026-03-15", "2026-03-08", "2026-03-01"]
+    assert [len(page) for page in pages] == [3, 1]
+
+
+def test_total_only_when_requested(client, db_session, create_user, auth_headers):
+    headers = auth_headers(create_user(UserRole.ADMINISTRADOR, "admin@pagination.local"))
+
+    assert client.get("/api/v1/users", headers=headers).json()["total"] is None
+    assert client.get("/api/v1/users", params={"include_total": "true"}, headers=headers).json()["total"] == 1
+
+
+def test_invalid_cursor_rejected(client, db_session, create_user, auth_headers):
+    headers = auth_headers(create_user(UserRole.ADMINISTRADOR, "admin@pagination.local"))
+
+    response = client.get("/api/v1/users", params={"cursor": "not-a-cursor"}, headers=headers)
+
+    assert response.status_code == 400
+
+
+def test_ebi_list_query_budget(client, db_session, assert_max_queries, create_user, auth_headers):
+    admin = create_user(UserRole.ADMINISTRADOR, "admin@pagination.local")
+    collaborator = create_user(UserRole.COLABORADORA, "colab@pagination.local")
+    for day in range(1, 29):
+        ebi = Ebi(ebi_date=date(2026, 2, day), group_number=1, coordinator_id=admin.id, status=EbiStatus.ABERTO)
+        ebi.collaborators = [collaborator]
+        db_session.add(ebi)
+    db_session.commit()
+    headers = auth_headers(admin)
+    collaborator_id = collaborator.id
+    db_session.expunge_all()
+
+    # usuário autenticado + versão (ETag) + página de EBIs + colaboradoras da página inteira
+    with assert_max_queries(4):
+        response = client.get("/api/v1/ebi", params={"page_size": 100}, headers=headers)
+
+    items = response.json()["items"]
+    assert len(items) == 28
+    assert all(item["collaborator_ids"] == [collaborator_id] for item in items)
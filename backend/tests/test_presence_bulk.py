@@ -0,0 +1,285 @@
+from datetime import date
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy.exc import IntegrityError
+
+from app.core.throttle import AttemptLimiter
+from app.models.child import Child
+from app.models.ebi import Ebi, EbiStatus
+from app.models.presence_rollup import PresenceMonthlyRollup
+from app.schemas.presence import PresenceBulkCheckout, PresenceCreate
+from app.services.ebi_service import add_presences_bulk, checkout_by_pin, checkout_presence, checkout_presences_bulk, close_ebi
+
+# --- Helpers ---
+
+def create_ebi(db, coordinator, status=EbiStatus.ABERTO):
+    ebi = Ebi(ebi_date=date.today(), group_number=1, coordinator_id=coordinator.id, status=status)
+    db.add(ebi)
+    db.commit()
+    return ebi
+
+
+def create_children(db, *names):
+    children = [Child(name=name, guardian_name="Mom", guardian_phone="11988888888") for name in names]
+    db.add_all(children)
+    db.commit()
+    return children
+
+
+def item(child_id):
+    return PresenceCreate(child_id=child_id, guardian_name_day="Mom", guardian_phone_day="11988888888")
+
+
+# --- Testes: Check-in em lote ---
+
+def test_bulk_checkin_reports_each_item(db_session, whatsapp_outbox, create_user):
+    coordinator = create_user()
+    ebi = create_ebi(db_session, coordinator)
+    ana, bia = create_children(db_session, "Ana", "Bia")
+    add_presences_bulk(db_session, ebi.id, [item(bia.id)])
+
+    results = add_presences_bulk(db_session, ebi.id, [item(ana.id), item(bia.id), item(9999), item(ana.id)])
+
+    assert [result["status"] for result in results] == ["created", "duplicate", "not_found", "duplicate"]
+    assert results[0]["presence"]["child_name"] == "Ana"
+    assert len(results[0]["presence"]["pin_code"]) == 4
+    assert [message.child_name for message in whatsapp_outbox()] == ["Bia", "Ana"]
+    rollup = db_session.get(PresenceMonthlyRollup, (date.today().replace(day=1), 1))
+    assert rollup.presence_count == 2
+
+
+def test_bulk_checkin_query_count_is_constant(db_session, assert_max_queries, create_user):
+    coordinator = create_user()
+    ebi = create_ebi(db_session, coordinator)
+    children = create_children(db_session, *[f"Child {i}" for i in range(6)])
+    ebi_id, items = ebi.id, [item(child.id) for child in children]
+
+    # EBI + crianças + PINs em uso + INSERT + rollup (UPDATE e INSERT na primeira vez)
+    with assert_max_queries(6):
+        results = add_presences_bulk(db_session, ebi_id, items)
+
+    assert all(result["status"] == "created" for result in results)
+
+
+def test_bulk_checkin_api(client, db_session, create_user, auth_headers):
+    coordinator = create_user()
+    ebi = create_ebi(db_session, coordinator)
+    ana, bia = create_children(db_session, "Ana", "Bia")
+    payload = {"items": [item(ana.id).model_dump(), item(bia.id).model_dump()]}
+
+    response = client.post(f"/api/v1/ebi/{ebi.id}/presence/bulk", json=payload, headers=auth_headers(coordinator))
+
+    assert response.status_code == 200
+    body = response.json()["items"]
+    assert [entry["presence"]["child_name"] for entry in body] == ["Ana", "Bia"]
+
+
+def test_bulk_checkin_rejects_closed_ebi(client, db_session, create_user, auth_headers):
+    coordinator = create_user()
+    ebi = create_ebi(db_session, coordinator, status=EbiStatus.ENCERRADO)
+    (ana,) = create_children(db_session, "Ana")
+
+    response = client.post(
+        f"/api/v1/ebi/{ebi.id}/presence/bulk",
+        json={"items": [item(ana.id).model_dump()]},
+        headers=auth_headers(coordinator),
+    )
+
+    assert response.status_code == 409
+
+# --- Testes: Saída em lote ---
+
+def test_bulk_checkout_by_pins(db_session, create_user):
+    coordinator = create_user()
+    ebi = create_ebi(db_session, coordinator)
+    ana, bia, caio = create_children(db_session, "Ana", "Bia", "Caio")
+    with patch("app.services.ebi_service._allocate_pins", return_value=["1111", "2222", "3333"]):
+        add_presences_bulk(db_session, ebi.id, [item(ana.id), item(bia.id), item(caio.id)])
+
+    result = checkout_presences_bulk(db_session, ebi.id, pin_codes=["1111", "2222", "0000"])
+
+    assert sorted(row["child_name"] for row in result["checked_out"]) == ["Ana", "Bia"]
+    assert result["not_matched"] == ["0000"]
+    rollup = db_session.get(PresenceMonthlyRollup, (date.today().replace(day=1), 1))
+    assert rollup.checked_out_count == 2
+
+
+def test_bulk_checkout_by_ids_requires_justification():
+    with pytest.raises(ValidationError):
+        PresenceBulkCheckout(presence_ids=[1, 2])
+    with pytest.raises(ValidationError):
+        PresenceBulkCheckout(pin_codes=["1234"], presence_ids=[1])
+
+
+def test_bulk_checkout_by_ids_api(client, db_session, create_user, auth_headers):
+    coordinator = create_user()
+    ebi = create_ebi(db_session, coordinator)
+    ana, bia = create_children(db_session, "Ana", "Bia")
+    created = add_presences_bulk(db_session, ebi.id, [item(ana.id), item(bia.id)])
+    presence_ids = [result["presence"]["id"] for result in created]
+
+    response = client.post(
+        f"/api/v1/ebi/{ebi.id}/checkout/bulk",
+        json={"presence_ids": presence_ids + [9999], "checkout_justification": "Fim do culto, saída coletiva"},
+        headers=auth_headers(coordinator),
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert len(body["checked_out"]) == 2
+    assert all(row["checkout_justification"] == "Fim do culto, saída coletiva" for row in body["checked_out"])
+    assert all(row["pin_code"] is None for row in body["checked_out"])
+    assert body["not_matched"] == [9999]
+
+# --- Testes: Encerramento com saída ---
+
+def test_close_with_checkout_remaining(db_session, assert_max_queries, create_user):
+    coordinator = create_user()
+    ebi = create_ebi(db_session, coordinator)
+    children = create_children(db_session, *[f"Child {i}" for i in range(5)])
+    ebi_id = ebi.id
+    add_presences_bulk(db_session, ebi_id, [item(child.id) for child in children])
+
+    # EBI + UPDATE de presenças + rollup + UPDATE do EBI + refresh
+    with assert_max_queries(5):
+        closed = close_ebi(db_session, ebi_id, checkout_remaining=True)
+
+    assert closed.status == EbiStatus.ENCERRADO
+    rollup = db_session.get(PresenceMonthlyRollup, (date.today().replace(day=1), 1))
+    assert rollup.checked_out_count == 5
+
+
+def test_close_without_checkout_keeps_guard(db_session, create_user):
+    coordinator = create_user()
+    ebi = create_ebi(db_session, coordinator)
+    (ana,) = create_children(db_session, "Ana")
+    add_presences_bulk(db_session, ebi.id, [item(ana.id)])
+
+    with pytest.raises(HTTPException) as exc:
+        close_ebi(db_session, ebi.id)
+    assert exc.value.status_code == 409
+
+# --- Testes: PIN ---
+
+def test_allocated_pins_skip_open_presences(db_session, create_user):
+    coordinator = create_user()
+    ebi = create_ebi(db_session, coordinator)
+    children = create_children(db_session, *[f"Child {i}" for i in range(3)])
+    # Só sobram três PINs livres: todos precisam ser usados sem repetição
+    taken = {f"{pin:04d}" for pin in range(3, 10_000)}
+
+    with patch("app.services.ebi_service.get_open_pins", return_value=taken):
+        results = add_presences_bulk(db_session, ebi.id, [item(child.id) for child in children])
+
+    assert sorted(result["presence"]["pin_code"] for result in results) == ["0000", "0001", "0002"]
+
+
+def test_checkout_by_pin_api(client, db_session, create_user, auth_headers):
+    coordinator = create_user()
+    ebi = create_ebi(db_session, coordinator)
+    ana, bia = create_children(db_session, "Ana", "Bia")
+    with patch("app.services.ebi_service._allocate_pins", return_value=["1111", "2222"]):
+        add_presences_bulk(db_session, ebi.id, [item(ana.id), item(bia.id)])
+    headers = auth_headers(coordinator)
+
+    response = client.post(f"/api/v1/ebi/{ebi.id}/checkout-by-pin", json={"pin_code": "2222"}, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["child_name"] == "Bia"
+    assert response.json()["exit_at"] is not None
+
+    # O mesmo PIN não serve duas vezes
+    response = client.post(f"/api/v1/ebi/{ebi.id}/checkout-by-pin", json={"pin_code": "2222"}, headers=headers)
+    assert response.status_code == 404
+
+
+def test_open_presences_cannot_share_a_pin(db_session, create_user):
+    coordinator = create_user()
+    ebi = create_ebi(db_session, coordinator)
+    ana, bia = create_children(db_session, "Ana", "Bia")
+
+    # Duas presenças abertas com o mesmo PIN: o kiosk daria saída às duas
+    with patch("app.services.ebi_service._allocate_pins", return_value=["1111", "1111"]):
+        with pytest.raises(IntegrityError):
+            add_presences_bulk(db_session, ebi.id, [item(ana.id), item(bia.id)])
+
+
+def test_closed_presence_frees_its_pin(client, db_session, create_user, auth_headers):
+    coordinator = create_user()
+    ebi = create_ebi(db_session, coordinator)
+    ana, bia = create_children(db_session, "Ana", "Bia")
+    headers = auth_headers(coordinator)
+    with patch("app.services.ebi_service._allocate_pins", return_value=["1111"]):
+        add_presences_bulk(db_session, ebi.id, [item(ana.id)])
+    checkout_presences_bulk(db_session, ebi.id, pin_codes=["1111"])
+    with patch("app.services.ebi_service._allocate_pins", return_value=["1111"]):
+        add_presences_bulk(db_session, ebi.id, [item(bia.id)])
+    db_session.commit()
+
+    # Só a presença aberta sai; a já encerrada não é tocada
+    response = client.post(f"/api/v1/ebi/{ebi.id}/checkout-by-pin", json={"pin_code": "1111"}, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["child_name"] == "Bia"
+
+
+def test_checkout_by_pin_refuses_several_matches(db_session, create_user):
+    coordinator = create_user()
+    ebi = create_ebi(db_session, coordinator)
+    shared = [SimpleNamespace(id=1, pin_code="0000"), SimpleNamespace(id=2, pin_code="0000")]
+
+    # Bancos antigos sem ux_presence_open_pin: recusa em vez de dar saída em silêncio
+    with patch("app.services.ebi_service.checkout_open_presences", return_value=shared):
+        with pytest.raises(HTTPException) as exc_info:
+            checkout_by_pin(db_session, ebi.id, "0000")
+    assert exc_info.value.status_code == 409
+
+
+def test_wrong_pins_are_throttled_per_ebi(client, db_session, create_user, auth_headers):
+    coordinator = create_user()
+    ebi, other = create_ebi(db_session, coordinator), create_ebi(db_session, coordinator)
+    ana, bia = create_children(db_session, "Ana", "Bia")
+    with patch("app.services.ebi_service._allocate_pins", return_value=["1111"]):
+        presence = add_presences_bulk(db_session, ebi.id, [item(ana.id)])[0]["presence"]
+        add_presences_bulk(db_session, other.id, [item(bia.id)])
+    db_session.commit()
+    headers = auth_headers(coordinator)
+
+    with patch("app.services.ebi_service.pin_attempts", AttemptLimiter(3, 300)):
+        # PINs errados do lote também contam
+        result = checkout_presences_bulk(db_session, ebi.id, pin_codes=["0001", "0002"])
+        assert result["not_matched"] == ["0001", "0002"]
+        with pytest.raises(HTTPException) as exc_info:
+            checkout_by_pin(db_session, ebi.id, "0003")
+        assert exc_info.value.status_code == 404
+
+        # Os outros EBIs seguem normalmente
+        response = client.post(f"/api/v1/ebi/{other.id}/checkout-by-pin", json={"pin_code": "1111"}, headers=headers)
+        assert response.status_code == 200
+
+        # Bloqueado, nem o PIN certo passa
+        with pytest.raises(HTTPException) as exc_info:
+            checkout_presence(db_session, presence["id"], "1111")
+        assert exc_info.value.status_code == 429
+        response = client.post(f"/api/v1/ebi/{ebi.id}/checkout-by-pin", json={"pin_code": "1111"}, headers=headers)
+        assert response.status_code == 429
+        assert response.headers["retry-after"] == "300"
+
+
+def test_attempt_limiter_window_slides():
+    now = [0.0]
+    limiter = AttemptLimiter(max_failures=2, window_seconds=60, clock=lambda: now[0])
+
+    limiter.fail("ebi")
+    now[0] = 30
+    limiter.fail("ebi")
+    assert limiter.retry_after("ebi") == 30
+    assert limiter.retry_after("other") == 0
+
+    # A primeira falha sai da janela; a segunda ainda conta
+    now[0] = 61
+    assert limiter.retry_after("ebi") == 0
+    limiter.fail("ebi")
+    assert limiter.retry_after("ebi") == 29
@@ -0,0 +1,141 @@
+import logging
+from datetime import date, datetime, timezone
+
+import pytest
+
+from app.core.config import settings
+from app.core.query_stats import QueryStats
+from app.models.child import Child
+from app.models.ebi import Ebi, EbiStatus
+from app.models.presence import EbiPresence
+from app.models.user import UserRole
+
+# --- Helpers ---
+
+def seed_ebis(db, coordinator, collaborators, ebi_count, child_count):
+    """EBIs com colaboradoras e presenças: um N+1 estouraria qualquer orçamento."""
+    children = [
+        Child(name=f"Child {i}", guardian_name="Guardian", guardian_phone="11988888888") for i in range(child_count)
+    ]
+    db.add_all(children)
+    ebis = []
+    for day in range(1, ebi_count + 1):
+        ebi = Ebi(
+            ebi_date=date(2026, 3, day),
+            group_number=1,
+            coordinator_id=coordinator.id,
+            status=EbiStatus.ABERTO,
+        )
+        ebi.collaborators = collaborators
+        ebi.presences = [
+            EbiPresence(
+                child=child,
+                guardian_name_day="Guardian",
+                guardian_phone_day="11988888888",
+                entry_at=datetime.now(timezone.utc),
+                pin_code=f"{i:04d}",
+            )
+            for i, child in enumerate(children)
+        ]
+        ebis.append(ebi)
+    db.add_all(ebis)
+    db.commit()
+    ebi_id = ebis[0].id
+    db.expunge_all()
+    return ebi_id
+
+# --- Testes: Contador por requisição ---
+
+def test_query_stats_reports_repeated_shapes():
+    stats = QueryStats()
+    for _ in range(3):
+        stats.record("SELECT * FROM children WHERE id = ?", 0.001)
+    stats.record("SELECT * FROM users WHERE id = ?", 0.002)
+
+    assert stats.count == 4
+    assert stats.duration == pytest.approx(0.005)
+    assert stats.repeated(2) == [("SELECT * FROM children WHERE id = ?", 3)]
+    assert stats.repeated(3) == []
+
+
+def test_headers_count_queries_of_async_route(client, db_session, assert_max_queries, monkeypatch, create_user, auth_headers):
+    monkeypatch.setattr(settings, "db_query_headers", True)
+    coordinator = create_user(UserRole.COORDENADORA, "coord@stats.local")
+    headers = auth_headers(coordinator)
+    ebi_id = seed_ebis(db_session, coordinator, [], ebi_count=1, child_count=3)
+
+    # O contador acompanha a requisição até o greenlet do run_sync
+    with assert_max_queries(10) as statements:
+        response = client.get(f"/api/v1/ebi/{ebi_id}", headers=headers)
+
+    assert response.status_code == 200
+    assert int(response.headers["X-DB-Queries"]) == len(statements)
+    assert response.headers["Server-Timing"].startswith("db;dur=")
+
+
+def test_headers_count_queries_of_sync_route(client, db_session, monkeypatch, create_user, auth_headers):
+    monkeypatch.setattr(settings, "db_query_headers", True)
+    user = create_user(UserRole.COLABORADORA, "colab@stats.local")
+
+    # Rota síncrona: roda no threadpool, com o contexto copiado
+    response = client.get("/api/v1/profile/me", headers=auth_headers(user))
+
+    assert response.status_code == 200
+    assert int(response.headers["X-DB-Queries"]) > 0
+
+
+def test_no_headers_by_default(client, db_session, monkeypatch, create_user, auth_headers):
+    # Desligado por padrão, mesmo com APP_ENV=dev
+    monkeypatch.setattr(settings, "app_env", "dev")
+    user = create_user(UserRole.COLABORADORA, "colab@stats.local")
+
+    response = client.get("/api/v1/profile/me", headers=auth_headers(user))
+
+    assert response.status_code == 200
+    assert "X-DB-Queries" not in response.headers
+    assert "Server-Timing" not in response.headers
+
+
+def test_warns_when_a_statement_repeats(client, db_session, monkeypatch, caplog, create_user, auth_headers):
+    monkeypatch.setattr(settings, "db_query_repeat_warn", 1)
+    user = create_user(UserRole.COORDENADORA, "coord@stats.local")
+
+    # No SQLite os dois responsáveis são inseridos um a um: a mesma instrução duas vezes
+    with caplog.at_level(logging.WARNING, logger="app.core.query_stats"):
+        response = client.post(
+            "/api/v1/children",
+            json={"name": "Ana", "guardians": [{"name": "Mom", "phone": "11988888888"}, {"name": "Dad", "phone": "11977777777"}]},
+            headers=auth_headers(user),
+        )
+
+    assert response.status_code == 200
+    warnings = [record.getMessage() for record in caplog.records]
+    assert len(warnings) == 1
+    assert "POST /api/v1/children ran one statement 2 times" in warnings[0]
+    assert "INSERT INTO child_guardians" in warnings[0]
+
+# --- Testes: Orçamento de consultas por endpoint ---
+
+# Independe do tamanho dos dados (10 EBIs x 15 crianças x 3 colaboradoras)
+BUDGETS = [
+    ("/api/v1/ebi?page_size=20", 4),
+    ("/api/v1/ebi/{ebi_id}", 5),
+    ("/api/v1/children?page_size=20", 4),
+    ("/api/v1/reports/general", 4),
+    ("/api/v1/reports/ebi/{ebi_id}", 5),
+    ("/api/v1/users", 3),
+]
+
+
+@pytest.mark.parametrize("url,limit", BUDGETS)
+def test_endpoint_query_budget(client, db_session, query_budget, url, limit, create_user, auth_headers):
+    coordinator = create_user(UserRole.ADMINISTRADOR, "admin@stats.local")
+    collaborators = [
+        create_user(UserRole.COLABORADORA, f"colab{i}@stats.local") for i in range(3)
+    ]
+    headers = auth_headers(coordinator)
+    ebi_id = seed_ebis(db_session, coordinator, collaborators, ebi_count=10, child_count=15)
+
+    response = query_budget(limit, "GET", url.format(ebi_id=ebi_id), headers=headers)
+
+    assert response.status_code == 200
@@ -0,0 +1,107 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import NullPool
+
+import app.core.db as db_module
+from app.core.db import RoutingSession
+from app.core.replica import RecentWriters
+from app.main import app
+from app.models.base import Base
+from app.models.child import Child
+from app.models.user import User, UserRole
+
+# Dois arquivos SQLite fazem o papel de primário e réplica
+# Usuários semeados nos dois bancos, com os mesmos ids
+ADMIN = User(id=1, role=UserRole.ADMINISTRADOR)
+OTHER_ADMIN = User(id=2, role=UserRole.ADMINISTRADOR)
+
+# --- Helpers ---
+
+def seed(engine, child_name, extra_users=()):
+    with Session(engine) as db:
+        for email in ["admin@replica.local", "other@replica.local", *extra_users]:
+            db.add(User(
+                full_name=email.split("@")[0],
+                email=email,
+                phone="11999999999",
+                role=UserRole.ADMINISTRADOR,
+                group_number=1,
+                password_hash="hash",
+            ))
+        db.add(Child(name=child_name, guardian_name="Mom", guardian_phone="11988888888"))
+        db.commit()
+
+
+def child_names(response):
+    assert response.status_code == 200
+    return sorted(item["name"] for item in response.json()["items"])
+
+
+@pytest.fixture
+def databases(tmp_path, monkeypatch):
+    engines = {}
+    for name in ["primary", "replica"]:
+        path = tmp_path / f"{name}.db"
+        engines[name] = create_engine(f"sqlite:///{path}", poolclass=NullPool)
+        engines[f"{name}_async"] = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool)
+        Base.metadata.create_all(engines[name])
+    seed(engines["primary"], "Primaria")
+    seed(engines["replica"], "Replica", extra_users=["only-on-replica@replica.local"])
+
+    monkeypatch.setattr(db_module, "SessionLocal", sessionmaker(class_=RoutingSession, autoflush=False, bind=engines["primary"]))
+    monkeypatch.setattr(db_module, "AsyncSessionLocal", async_sessionmaker(
+        engines["primary_async"], sync_session_class=RoutingSession, autoflush=False, expire_on_commit=False
+    ))
+    monkeypatch.setattr(db_module, "replica_engine", engines["replica"])
+    monkeypatch.setattr(db_module, "async_replica_engine", engines["replica_async"])
+    return engines
+
+# --- Testes: Roteamento ---
+
+def test_lists_read_replica_and_writes_go_to_primary(databases, auth_headers):
+    client = TestClient(app)
+    writer, other = auth_headers(ADMIN), auth_headers(OTHER_ADMIN)
+
+    assert child_names(client.get("/api/v1/children", headers=writer)) == ["Replica"]
+
+    response = client.post("/api/v1/children", json={"name": "Nova", "guardians": [{"name": "Dad", "phone": "11977777777"}]}, headers=writer)
+    assert response.status_code == 200
+    with Session(databases["primary"]) as db:
+        assert "Nova" in db.scalars(select(Child.name)).all()
+    with Session(databases["replica"]) as db:
+        assert "Nova" not in db.scalars(select(Child.name)).all()
+
+    # Quem escreveu lê o primário; os demais continuam na réplica
+    assert child_names(client.get("/api/v1/children", headers=writer)) == ["Nova", "Primaria"]
+    assert child_names(client.get("/api/v1/children", headers=other)) == ["Replica"]
+
+
+def test_sync_read_dependency_uses_replica(databases, auth_headers):
+    response = TestClient(app).get("/api/v1/users", headers=auth_headers(ADMIN))
+    assert response.status_code == 200
+    assert "only-on-replica@replica.local" in [item["email"] for item in response.json()["items"]]
+
+
+def test_routing_session_flushes_to_primary(databases):
+    with RoutingSession(bind=databases["primary"]) as db:
+        db.info["replica"] = databases["replica"]
+        db.add(Child(name="Escrita", guardian_name="Mom", guardian_phone="11988888888"))
+        db.commit()
+        assert "Escrita" not in db.scalars(select(Child.name)).all()
+    with Session(databases["primary"]) as db:
+        assert "Escrita" in db.scalars(select(Child.name)).all()
+
+# --- Testes: Janela de leitura das próprias escritas ---
+
+def test_recent_writers_window():
+    now = [100.0]
+    writers = RecentWriters(10, clock=lambda: now[0])
+    writers.mark("Bearer a")
+
+    assert writers.wrote_recently("Bearer a")
+    assert not writers.wrote_recently("Bearer b")
+    now[0] += 10
+    assert not writers.wrote_recently("Bearer a")
@@ -0,0 +1,111 @@
+from datetime import date, datetime, timezone
+
+from app.core.cache import TTLCache, bump_data_version
+from app.models.ebi import Ebi, EbiStatus
+from app.services.ebi_service import reopen_ebi
+from app.services.report_service import get_ebi_report_cached, get_general_report_cached, report_cache
+
+# --- Helpers ---
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def create_ebi(db, user, status=EbiStatus.ABERTO):
+    ebi = Ebi(
+        ebi_date=date.today(),
+        group_number=1,
+        coordinator_id=user.id,
+        status=status,
+        finished_at=datetime.now(timezone.utc) if status == EbiStatus.ENCERRADO else None,
+    )
+    db.add(ebi)
+    db.commit()
+    return ebi
+
+# --- Testes: TTLCache ---
+
+def test_ttl_cache_expires_entries():
+    clock = FakeClock()
+    cache = TTLCache(max_entries=10, ttl_seconds=5, clock=clock)
+    cache.set("a", 1)
+    clock.now = 3
+    cache.set("b", 2)
+
+    clock.now = 6
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    assert cache.stats() == {"entries": 1, "hits": 1, "misses": 1, "evictions": 0}
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(max_entries=2, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats()["evictions"] == 1
+
+# --- Testes: Cache de relatórios ---
+
+def test_general_report_cached_until_data_changes(db_session):
+    first = get_general_report_cached(db_session)
+    assert get_general_report_cached(db_session) is first
+
+    bump_data_version()
+    assert get_general_report_cached(db_session) is not first
+    assert report_cache.stats()["hits"] == 1
+
+
+def test_closed_ebi_report_cached_until_reopen(db_session, create_user):
+    ebi = create_ebi(db_session, create_user(), status=EbiStatus.ENCERRADO)
+    report = get_ebi_report_cached(db_session, ebi.id)
+
+    bump_data_version()
+    assert get_ebi_report_cached(db_session, ebi.id) is report
+
+    reopen_ebi(db_session, ebi.id, performed_by=ebi.coordinator_id)
+    # Ainda não: a reabertura não foi confirmada
+    assert get_ebi_report_cached(db_session, ebi.id) is report
+    db_session.commit()
+    assert get_ebi_report_cached(db_session, ebi.id) is not report
+
+
+def test_closed_ebi_report_from_replica_is_not_kept(db_session, create_user):
+    ebi = create_ebi(db_session, create_user(), status=EbiStatus.ENCERRADO)
+    # Leitura na réplica atrasada, que ainda vê o EBI encerrado depois da reabertura
+    db_session.info["replica"] = db_session.get_bind()
+    report = get_ebi_report_cached(db_session, ebi.id)
+    assert get_ebi_report_cached(db_session, ebi.id) is report
+
+    # Segue a versão dos dados, como qualquer relatório lido na réplica
+    bump_data_version()
+    assert get_ebi_report_cached(db_session, ebi.id) is not report
+    assert report_cache.get(("ebi-closed", ebi.id)) is None
+
+
+def test_closed_ebi_report_expires(db_session, monkeypatch, create_user):
+    clock = FakeClock()
+    monkeypatch.setattr(report_cache, "_clock", clock)
+    ebi = create_ebi(db_session, create_user(), status=EbiStatus.ENCERRADO)
+    report = get_ebi_report_cached(db_session, ebi.id)
+
+    # Uma reabertura feita por outro worker não invalida este processo: vale o TTL
+    clock.now = report_cache.ttl_seconds + 1
+    assert get_ebi_report_cached(db_session, ebi.id) is not report
+
+
+def test_open_ebi_report_follows_data_version(db_session, create_user):
+    ebi = create_ebi(db_session, create_user())
+    report = get_ebi_report_cached(db_session, ebi.id)
+    assert get_ebi_report_cached(db_session, ebi.id) is report
+
+    bump_data_version()
+    assert get_ebi_report_cached(db_session, ebi.id) is not report
@@ -0,0 +1,121 @@
+from datetime import date, datetime, timezone
+
+from app.models.child import Child
+from app.models.ebi import Ebi, EbiStatus
+from app.models.presence import EbiPresence
+from app.models.user import UserRole
+from app.services.report_service import _month_starts, get_general_report
+from app.services.rollup_service import rebuild_rollup
+
+# --- Helpers ---
+
+def create_ebi_with_presences(db, coordinator, ebi_date, children):
+    ebi = Ebi(
+        ebi_date=ebi_date,
+        group_number=coordinator.group_number,
+        coordinator_id=coordinator.id,
+        status=EbiStatus.ABERTO,
+    )
+    db.add(ebi)
+    db.flush()
+    for i, child in enumerate(children):
+        db.add(
+            EbiPresence(
+                ebi_id=ebi.id,
+                child_id=child.id,
+                guardian_name_day="Guardian",
+                guardian_phone_day="11988888888",
+                entry_at=datetime.now(timezone.utc),
+                pin_code=f"{i:04d}",
+            )
+        )
+    db.commit()
+    return ebi
+
+
+def create_children(db, count):
+    children = [
+        Child(name=f"Child {i}", guardian_name="Guardian", guardian_phone="11988888888")
+        for i in range(count)
+    ]
+    db.add_all(children)
+    db.commit()
+    return children
+
+
+# --- Testes: Relatório geral ---
+
+def test_month_starts_crosses_year():
+    assert _month_starts(date(2026, 2, 17), 3) == [
+        date(2025, 12, 1),
+        date(2026, 1, 1),
+        date(2026, 2, 1),
+    ]
+
+
+def test_general_report_totals(db_session, create_user):
+    coordinator = create_user(UserRole.COORDENADORA, "coord@report.local", group_number=2)
+    create_user(UserRole.COLABORADORA, "colab@report.local", group_number=2)
+    create_user(UserRole.COLABORADORA, "colab2@report.local", group_number=3)
+    children = create_children(db_session, 3)
+
+    months = _month_starts(date.today(), 12)
+    create_ebi_with_presences(db_session, coordinator, months[-1], children)
+    create_ebi_with_presences(db_session, coordinator, months[-1], children[:1])
+    create_ebi_with_presences(db_session, coordinator, months[-2], children[:2])
+    create_ebi_with_presences(db_session, coordinator, months[-2], [])
+    rebuild_rollup(db_session)
+
+    report = get_general_report(db_session)
+
+    assert report["total_coordenadoras"] == 1
+    assert report["total_colaboradoras"] == 2
+    assert report["by_group"] == {"1": 0, "2": 2, "3": 1, "4": 0}
+    assert report["average_presence_month"] == 2
+    assert report["last_3_months_counts"] == [0, 2, 4]
+    assert report["last_12_months_avg"][-2:] == [1, 2]
+    assert len(report["last_12_months_avg"]) == 12
+
+
+def test_general_report_query_count_is_constant(db_session, assert_max_queries, create_user):
+    coordinator = create_user(UserRole.COORDENADORA, "coord@report.local")
+    children = create_children(db_session, 2)
+    for month in _month_starts(date.today(), 12):
+        create_ebi_with_presences(db_session, coordinator, month, children)
+    rebuild_rollup(db_session)
+
+    with assert_max_queries(3):
+        get_general_report(db_session)
+
+# --- Testes: Exportação CSV ---
+
+def test_presences_csv_export(client, db_session, create_user, auth_headers):
+    coordinator = create_user(UserRole.COORDENADORA, "coord@report.local")
+    children = create_children(db_session, 2)
+    create_ebi_with_presences(db_session, coordinator, date(2026, 3, 8), children)
+    create_ebi_with_presences(db_session, coordinator, date(2026, 5, 3), children[:1])
+
+    response = client.get(
+        "/api/v1/reports/presences.csv",
+        params={"from": "2026-03-01", "to": "2026-03-31"},
+        headers=auth_headers(coordinator),
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    lines = response.text.lstrip("\ufeff").splitlines()
+    assert lines[0].startswith("ebi_date,group_number,child_name")
+    assert len(lines) == 3
+    assert all(line.startswith("2026-03-08,1,Child") for line in lines[1:])
+
+
+def test_presences_csv_rejects_inverted_range(client, db_session, create_user, auth_headers):
+    coordinator = create_user(UserRole.COORDENADORA, "coord@report.local")
+
+    response = client.get(
+        "/api/v1/reports/presences.csv",
+        params={"from": "2026-03-31", "to": "2026-03-01"},
+        headers=auth_headers(coordinator),
+    )
+
+    assert response.status_code == 400
@@ -0,0 +1,116 @@
+from datetime import date, datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select, update
+
+from app.models.child import Child
+from app.models.presence import EbiPresence
+from app.models.presence_rollup import PresenceMonthlyRollup
+from app.schemas.ebi import EbiCreate, EbiUpdate
+from app.schemas.presence import PresenceCreate
+from app.services.ebi_service import add_presence, checkout_presence, create_new_ebi, update_existing_ebi
+from app.services.rollup_service import rebuild_rollup, record_presence_added, stay_seconds
+
+# --- Helpers ---
+
+def create_child(db, name):
+    child = Child(name=name, guardian_name="Guardian", guardian_phone="11988888888")
+    db.add(child)
+    db.commit()
+    return child
+
+
+def rollup_rows(db):
+    rows = db.execute(
+        select(PresenceMonthlyRollup).order_by(PresenceMonthlyRollup.month, PresenceMonthlyRollup.group_number)
+    ).scalars().all()
+    return [
+        (row.month, row.group_number, row.ebi_count, row.presence_count, row.checked_out_count, row.total_stay_seconds)
+        for row in rows
+    ]
+
+# --- Testes: Consolidado mensal ---
+
+def test_rollup_follows_write_paths(db_session, create_user):
+    coordinator = create_user()
+    first = create_child(db_session, "Child A")
+    second = create_child(db_session, "Child B")
+
+    ebi = create_new_ebi(db_session, EbiCreate(
+        ebi_date=date(2026, 3, 8), group_number=1, coordinator_id=coordinator.id, collaborator_ids=[]
+    ))
+    presence = add_presence(db_session, ebi.id, PresenceCreate(
+        child_id=first.id, guardian_name_day="Mom", guardian_phone_day="11999999999"
+    ))
+    add_presence(db_session, ebi.id, PresenceCreate(
+        child_id=second.id, guardian_name_day="Dad", guardian_phone_day="11999999998"
+    ))
+    checkout_presence(db_session, presence.id, presence.pin_code)
+
+    assert rollup_rows(db_session) == [(date(2026, 3, 1), 1, 1, 2, 1, 0)]
+
+    update_existing_ebi(db_session, ebi.id, EbiUpdate(ebi_date=date(2026, 4, 5), group_number=2))
+
+    assert rollup_rows(db_session) == [
+        (date(2026, 3, 1), 1, 0, 0, 0, 0),
+        (date(2026, 4, 1), 2, 1, 2, 1, 0),
+    ]
+
+
+def test_concurrent_checkout_is_counted_once(db_session, create_user):
+    coordinator = create_user()
+    child = create_child(db_session, "Child A")
+    ebi = create_new_ebi(db_session, EbiCreate(
+        ebi_date=date(2026, 3, 8), group_number=1, coordinator_id=coordinator.id, collaborator_ids=[]
+    ))
+    presence = add_presence(db_session, ebi.id, PresenceCreate(
+        child_id=child.id, guardian_name_day="Mom", guardian_phone_day="11999999999"
+    ))
+    # O segundo voluntário leu a presença aberta antes do checkout do primeiro
+    stale = db_session.get(EbiPresence, presence.id)
+    db_session.execute(
+        update(EbiPresence.__table__).where(EbiPresence.id == presence.id).values(exit_at=datetime.now(timezone.utc))
+    )
+    assert stale.exit_at is None
+
+    with pytest.raises(HTTPException) as exc:
+        checkout_presence(db_session, presence.id, presence.pin_code)
+
+    assert exc.value.status_code == 409
+    assert rollup_rows(db_session) == [(date(2026, 3, 1), 1, 1, 1, 0, 0)]
+
+
+def test_rebuild_matches_incremental_rollup(db_session, create_user):
+    coordinator = create_user()
+    child = create_child(db_session, "Child A")
+    for ebi_date in [date(2026, 1, 4), date(2026, 1, 11), date(2026, 2, 1)]:
+        ebi = create_new_ebi(db_session, EbiCreate(
+            ebi_date=ebi_date, group_number=1, coordinator_id=coordinator.id, collaborator_ids=[]
+        ))
+        presence = add_presence(db_session, ebi.id, PresenceCreate(
+            child_id=child.id, guardian_name_day="Mom", guardian_phone_day="11999999999"
+        ))
+        checkout_presence(db_session, presence.id, presence.pin_code)
+
+    incremental = rollup_rows(db_session)
+    rebuild_rollup(db_session)
+
+    assert [row for row in incremental if row[2]] == rollup_rows(db_session)
+
+
+def test_stay_seconds_accepts_naive_timestamps():
+    entry_at = datetime(2026, 3, 8, 9, 0)
+    exit_at = datetime(2026, 3, 8, 10, 30, tzinfo=timezone.utc)
+    assert stay_seconds(entry_at, exit_at) == 5400
+
+
+def test_delta_is_a_single_upsert(db_session, assert_max_queries):
+    # Primeira escrita do mês e as seguintes: um único INSERT ... ON CONFLICT,
+    # sem janela entre UPDATE e INSERT para dois check-ins simultâneos
+    with assert_max_queries(1):
+        record_presence_added(db_session, date(2026, 4, 5), 2)
+    with assert_max_queries(1):
+        record_presence_added(db_session, date(2026, 4, 19), 2, count=2)
+
+    assert rollup_rows(db_session) == [(date(2026, 4, 1), 2, 0, 3, 0, 0)]
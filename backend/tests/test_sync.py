@@ -0,0 +1,187 @@
+from datetime import date, datetime, timedelta, timezone
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from app.models.child import Child
+from app.models.ebi import Ebi, EbiStatus
+from app.models.presence import EbiPresence
+from app.models.sync_operation import SyncOperation
+
+# --- Helpers ---
+
+def create_ebi(db, coordinator, status=EbiStatus.ABERTO):
+    ebi = Ebi(ebi_date=date.today(), group_number=1, coordinator_id=coordinator.id, status=status)
+    db.add(ebi)
+    db.commit()
+    return ebi
+
+
+def create_child_op(key, name="Ana"):
+    return {
+        "op": "create_child",
+        "idempotency_key": key,
+        "child": {"name": name, "guardians": [{"name": "Mom", "phone": "11988888888"}]},
+    }
+
+
+def check_in_op(key, ebi_id, **child):
+    return {
+        "op": "check_in",
+        "idempotency_key": key,
+        "ebi_id": ebi_id,
+        "guardian_name_day": "Mom",
+        "guardian_phone_day": "11988888888",
+        **child,
+    }
+
+
+def checkout_op(key, **presence):
+    return {"op": "checkout", "idempotency_key": key, **presence}
+
+
+# --- Testes: Sincronização offline ---
+
+def test_sync_applies_batch_in_order_with_refs(client, db_session, whatsapp_outbox, create_user, auth_headers):
+    coordinator = create_user()
+    ebi = create_ebi(db_session, coordinator)
+    entry_at = datetime.now(timezone.utc) - timedelta(hours=1)
+    operations = [
+        create_child_op("child-0001"),
+        check_in_op("checkin-0001", ebi.id, child_ref="child-0001", occurred_at=entry_at.isoformat()),
+    ]
+
+    response = client.post("/api/v1/sync", json={"operations": operations}, headers=auth_headers(coordinator))
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [result["status"] for result in results] == ["applied", "applied"]
+    child_id = results[0]["result"]["id"]
+    assert results[1]["result"]["child_id"] == child_id
+    assert len(results[1]["result"]["pin_code"]) == 4
+    presence = db_session.query(EbiPresence).filter_by(child_id=child_id).one()
+    assert presence.entry_at.replace(tzinfo=timezone.utc) == entry_at
+    assert [message.presence_id for message in whatsapp_outbox()] == [presence.id]
+
+
+def test_sync_retry_replays_stored_results(client, db_session, create_user, auth_headers):
+    coordinator = create_user()
+    ebi = create_ebi(db_session, coordinator)
+    operations = [create_child_op("child-0001"), check_in_op("checkin-0001", ebi.id, child_ref="child-0001")]
+    first = client.post("/api/v1/sync", json={"operations": operations}, headers=auth_headers(coordinator)).json()
+
+    # O tablet não recebeu a resposta e reenvia o lote com mais uma operação
+    operations.append(checkout_op("checkout-0001", presence_ref="checkin-0001", pin_code=first["results"][1]["result"]["pin_code"]))
+    second = client.post("/api/v1/sync", json={"operations": operations}, headers=auth_headers(coordinator)).json()
+
+    assert [result["status"] for result in second["results"]] == ["replayed", "replayed", "applied"]
+    assert second["results"][1]["result"] == first["results"][1]["result"]
+    assert db_session.query(Child).count() == 1
+    assert db_session.query(EbiPresence).one().exit_at is not None
+    assert db_session.query(SyncOperation).count() == 3
+
+
+def test_sync_failed_operation_does_not_undo_others(client, db_session, whatsapp_outbox, create_user, auth_headers):
+    coordinator = create_user()
+    closed = create_ebi(db_session, coordinator, status=EbiStatus.ENCERRADO)
+    operations = [
+        create_child_op("child-0001"),
+        check_in_op("checkin-0001", closed.id, child_ref="child-0001"),
+        checkout_op("checkout-0001", presence_ref="checkin-0001", pin_code="1234"),
+    ]
+
+    response = client.post("/api/v1/sync", json={"operations": operations}, headers=auth_headers(coordinator))
+
+    results = response.json()["results"]
+    assert [result["status"] for result in results] == ["applied", "failed", "failed"]
+    assert results[1]["status_code"] == 409
+    assert results[2]["status_code"] == 424
+    assert db_session.query(Child).count() == 1
+    assert whatsapp_outbox() == []
+
+    # Falhas também ficam registradas: o reenvio não tenta de novo
+    retry = client.post("/api/v1/sync", json={"operations": operations}, headers=auth_headers(coordinator)).json()
+    assert [(result["status"], result["status_code"]) for result in retry["results"]] == [
+        ("replayed", 200),
+        ("replayed", 409),
+        ("replayed", 424),
+    ]
+
+
+def test_sync_rejects_reused_key_with_different_payload(client, db_session, create_user, auth_headers):
+    coordinator = create_user()
+    client.post("/api/v1/sync", json={"operations": [create_child_op("child-0001", "Ana")]}, headers=auth_headers(coordinator))
+
+    response = client.post("/api/v1/sync", json={"operations": [create_child_op("child-0001", "Bia")]}, headers=auth_headers(coordinator))
+
+    result = response.json()["results"][0]
+    assert (result["status"], result["status_code"]) == ("failed", 422)
+    assert db_session.query(Child).one().name == "Ana"
+
+
+def test_sync_keys_are_scoped_by_user(client, db_session, create_user, auth_headers):
+    first = create_user()
+    second = create_user(email="other@sync.local")
+    client.post("/api/v1/sync", json={"operations": [create_child_op("child-0001", "Ana")]}, headers=auth_headers(first))
+
+    # Mesma chave gerada por outro tablet: é outra operação, não um reenvio
+    response = client.post("/api/v1/sync", json={"operations": [create_child_op("child-0001", "Bia")]}, headers=auth_headers(second))
+
+    result = response.json()["results"][0]
+    assert (result["status"], result["result"]["name"]) == ("applied", "Bia")
+    assert db_session.query(SyncOperation).count() == 2
+
+
+def test_sync_key_taken_by_concurrent_batch_is_409(client, db_session, create_user, auth_headers):
+    coordinator = create_user()
+    client.post("/api/v1/sync", json={"operations": [create_child_op("child-0001")]}, headers=auth_headers(coordinator))
+
+    # Outro request gravou a chave depois que este lote buscou as existentes
+    with patch("app.services.sync_service.get_sync_operations", return_value={}):
+        response = client.post("/api/v1/sync", json={"operations": [create_child_op("child-0001")]}, headers=auth_headers(coordinator))
+
+    assert response.status_code == 409
+    assert response.json()["detail"] == "Sync batch already in progress"
+
+
+def test_sync_operation_integrity_error_is_not_a_batch_conflict(client, db_session, create_user, auth_headers):
+    coordinator = create_user()
+    error = IntegrityError("INSERT INTO children ...", {}, Exception("constraint failed"))
+
+    with patch("app.services.sync_service.build_child", side_effect=error):
+        with pytest.raises(IntegrityError):
+            client.post("/api/v1/sync", json={"operations": [create_child_op("child-0001")]}, headers=auth_headers(coordinator))
+
+
+def test_sync_checkin_then_checkout_skips_pin_message(client, db_session, whatsapp_outbox, create_user, auth_headers):
+    coordinator = create_user()
+    ebi = create_ebi(db_session, coordinator)
+    child = Child(name="Ana", guardian_name="Mom", guardian_phone="11988888888")
+    db_session.add(child)
+    db_session.commit()
+    operations = [
+        check_in_op("checkin-0001", ebi.id, child_id=child.id),
+        checkout_op("checkout-0001", presence_ref="checkin-0001", checkout_justification="Saiu antes da conexão voltar"),
+    ]
+
+    response = client.post("/api/v1/sync", json={"operations": operations}, headers=auth_headers(coordinator))
+
+    results = response.json()["results"]
+    assert [result["status"] for result in results] == ["applied", "applied"]
+    assert results[1]["result"]["exit_at"] is not None
+    assert results[1]["result"]["pin_code"] is None
+    assert whatsapp_outbox() == []
+
+
+def test_sync_requires_child_id_or_ref(client, db_session, create_user, auth_headers):
+    coordinator = create_user()
+    ebi = create_ebi(db_session, coordinator)
+
+    response = client.post(
+        "/api/v1/sync",
+        json={"operations": [check_in_op("checkin-0001", ebi.id)]},
+        headers=auth_headers(coordinator),
+    )
+
+    assert response.status_code == 422
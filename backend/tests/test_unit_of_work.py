@@ -0,0 +1,66 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import NullPool
+
+import app.core.db as db_module
+from app.core.db import RoutingSession, get_db
+from app.models.base import Base
+from app.models.child import Child
+
+# --- Helpers ---
+
+@pytest.fixture
+def file_engine(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'uow.db'}", poolclass=NullPool)
+    Base.metadata.create_all(engine)
+    monkeypatch.setattr(db_module, "SessionLocal", sessionmaker(class_=RoutingSession, autoflush=False, bind=engine))
+    return engine
+
+
+def child_names(engine):
+    with Session(engine) as db:
+        return db.scalars(select(Child.name)).all()
+
+# --- Testes: Unidade de trabalho por requisição ---
+
+def test_get_db_commits_once_after_the_route(file_engine):
+    dependency = get_db()
+    db = next(dependency)
+    db.add(Child(name="Ana", guardian_name="Mom", guardian_phone="11988888888"))
+    db.flush()
+    assert child_names(file_engine) == []
+
+    with pytest.raises(StopIteration):
+        next(dependency)
+    assert child_names(file_engine) == ["Ana"]
+
+
+def test_get_db_rolls_back_when_the_route_fails(file_engine):
+    dependency = get_db()
+    db = next(dependency)
+    db.add(Child(name="Ana", guardian_name="Mom", guardian_phone="11988888888"))
+    db.flush()
+
+    with pytest.raises(HTTPException):
+        dependency.throw(HTTPException(status_code=409, detail="EBI closed"))
+    assert child_names(file_engine) == []
+
+
+def test_create_child_without_refresh(client, db_session, assert_max_queries, create_user, auth_headers):
+    user = create_user()
+    headers = auth_headers(user)
+
+    # usuário autenticado + INSERT da criança + INSERT dos 2 responsáveis (em lote
+    # no Postgres), todos com RETURNING, + versão da lista; sem refresh nem lazy load depois
+    with assert_max_queries(5) as statements:
+        response = client.post(
+            "/api/v1/children",
+            json={"name": "Ana", "guardians": [{"name": "Mom", "phone": "11988888888"}, {"name": "Dad", "phone": "11977777777"}]},
+            headers=headers,
+        )
+
+    assert response.status_code == 200
+    assert [guardian["name"] for guardian in response.json()["guardians"]] == ["Mom", "Dad"]
+    assert all("RETURNING" in statement for statement in statements if statement.startswith("INSERT"))
@@ -0,0 +1,193 @@
+import asyncio
+import json
+import threading
+from contextlib import nullcontext
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import pytest
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.models.base import utc_now
+from app.models.child import Child
+from app.models.ebi import Ebi, EbiStatus
+from app.models.notification_outbox import OutboxStatus
+from app.schemas.presence import PresenceCreate
+from app.services.ebi_service import add_presence
+from app.services.whatsapp_service import WhatsAppDispatcher, whatsapp_dispatcher
+
+# --- Helpers ---
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests.append(
+            {"path": self.path, "authorization": self.headers["Authorization"], "body": body}
+        )
+        status = self.server.statuses.pop(0) if self.server.statuses else 200
+        payload = {"messages": [{"id": "wamid.stub"}]} if status < 400 else {"error": {"message": "stub error"}}
+        content = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubWhatsAppServer(ThreadingHTTPServer):
+    """Faz o papel da Cloud API da Meta; responde com `statuses` em ordem (200 quando vazio)."""
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.requests = []
+        self.statuses = []
+
+
+@pytest.fixture
+def whatsapp_stub(whatsapp_outbox, monkeypatch):
+    server = StubWhatsAppServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(settings, "whatsapp_api_base_url", f"http://127.0.0.1:{server.server_port}")
+    monkeypatch.setattr(settings, "whatsapp_phone_number_id", "123456")
+    monkeypatch.setattr(settings, "whatsapp_access_token", "stub-token")
+    monkeypatch.setattr(settings, "whatsapp_template_name", "ebi_pin")
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def check_in(db, coordinator, phone="11988888888"):
+    ebi = Ebi(ebi_date=date.today(), group_number=1, coordinator_id=coordinator.id, status=EbiStatus.ABERTO)
+    child = Child(name="Ana", guardian_name="Mom", guardian_phone=phone)
+    db.add_all([ebi, child])
+    db.commit()
+    return add_presence(db, ebi.id, PresenceCreate(child_id=child.id, guardian_name_day="Mom", guardian_phone_day=phone))
+
+
+def dispatch_once(db):
+    async def run():
+        async with WhatsAppDispatcher(lambda: nullcontext(db)) as dispatcher:
+            return await dispatcher.dispatch_once()
+
+    return asyncio.run(run())
+
+# --- Testes: Outbox de WhatsApp ---
+
+def test_checkin_queues_message_without_calling_api(db_session, whatsapp_stub, whatsapp_outbox, create_user):
+    presence = check_in(db_session, create_user())
+
+    assert whatsapp_stub.requests == []
+    [message] = whatsapp_outbox()
+    assert (message.status, message.attempts, message.pin_code) == (OutboxStatus.PENDING, 0, presence.pin_code)
+
+
+def test_dispatcher_sends_and_marks_sent(db_session, whatsapp_stub, whatsapp_outbox, create_user):
+    presence = check_in(db_session, create_user())
+
+    assert dispatch_once(db_session) == 1
+
+    [request] = whatsapp_stub.requests
+    assert request["path"] == "/v19.0/123456/messages"
+    assert request["authorization"] == "Bearer stub-token"
+    assert request["body"]["to"] == "+5511988888888"
+    parameters = request["body"]["template"]["components"][0]["parameters"]
+    assert [parameter["text"] for parameter in parameters] == ["Ana", presence.pin_code]
+    db_session.expire_all()
+    [message] = whatsapp_outbox()
+    assert (message.status, message.attempts) == (OutboxStatus.SENT, 1)
+    assert message.sent_at is not None
+    assert dispatch_once(db_session) == 0
+
+
+def test_dispatcher_retries_server_errors_with_backoff(db_session, whatsapp_stub, whatsapp_outbox, create_user):
+    check_in(db_session, create_user())
+    whatsapp_stub.statuses = [503]
+
+    dispatch_once(db_session)
+    db_session.expire_all()
+    [message] = whatsapp_outbox()
+    assert (message.status, message.attempts) == (OutboxStatus.PENDING, 1)
+    assert message.last_error.startswith("HTTP 503")
+    # Ainda em backoff: nada a enviar
+    assert dispatch_once(db_session) == 0
+
+    message.next_attempt_at = utc_now() - timedelta(seconds=1)
+    db_session.commit()
+    assert dispatch_once(db_session) == 1
+    db_session.expire_all()
+    [message] = whatsapp_outbox()
+    assert (message.status, message.attempts, message.last_error) == (OutboxStatus.SENT, 2, None)
+    assert len(whatsapp_stub.requests) == 2
+
+
+def test_dispatcher_gives_up_on_client_errors_and_max_attempts(db_session, whatsapp_stub, whatsapp_outbox, monkeypatch, create_user):
+    check_in(db_session, create_user())
+    whatsapp_stub.statuses = [400]
+    dispatch_once(db_session)
+    db_session.expire_all()
+    [message] = whatsapp_outbox()
+    assert (message.status, message.attempts) == (OutboxStatus.FAILED, 1)
+
+    monkeypatch.setattr(settings, "whatsapp_max_attempts", 1)
+    message.status = OutboxStatus.PENDING
+    message.next_attempt_at = utc_now()
+    message.attempts = 0
+    db_session.commit()
+    whatsapp_stub.statuses = [500]
+    dispatch_once(db_session)
+    db_session.expire_all()
+    [message] = whatsapp_outbox()
+    assert (message.status, message.last_error[:8]) == (OutboxStatus.FAILED, "HTTP 500")
+
+
+def test_dispatcher_fails_invalid_phone_without_request(db_session, whatsapp_stub, whatsapp_outbox, create_user):
+    check_in(db_session, create_user(), phone="sem-telefone")
+
+    dispatch_once(db_session)
+
+    assert whatsapp_stub.requests == []
+    db_session.expire_all()
+    [message] = whatsapp_outbox()
+    assert (message.status, message.last_error) == (OutboxStatus.FAILED, "Invalid phone")
+
+
+def test_commit_wakes_dispatcher(db_session, whatsapp_outbox, create_user):
+    with patch.object(whatsapp_dispatcher, "wake") as wake:
+        check_in(db_session, create_user())
+        wake.assert_not_called()
+        db_session.commit()
+
+    wake.assert_called_once()
+
+
+def test_wake_interrupts_dispatcher_poll(db_session, whatsapp_stub, monkeypatch, create_user):
+    # Sem o aviso a mensagem só sairia no próximo ciclo (30 s)
+    monkeypatch.setattr(settings, "whatsapp_dispatch_poll_seconds", 30)
+    coordinator = create_user()
+    dispatcher = WhatsAppDispatcher(lambda: nullcontext(db_session))
+
+    async def scenario():
+        await dispatcher.start()
+        try:
+            # O primeiro ciclo encontra a outbox vazia e passa a esperar
+            await asyncio.sleep(0.1)
+            await run_in_threadpool(check_in, db_session, coordinator)
+            await asyncio.sleep(0.1)
+            assert whatsapp_stub.requests == []
+            dispatcher.wake()
+            for _ in range(50):
+                if whatsapp_stub.requests:
+                    break
+                await asyncio.sleep(0.05)
+        finally:
+            await dispatcher.stop()
+
+    asyncio.run(scenario())
+
+    assert len(whatsapp_stub.requests) == 1
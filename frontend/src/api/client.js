@@ -60,3 +60,48 @@ export function put(path, body) {
     body: JSON.stringify(body)
   });
 }
+
+export function subscribe(path, onEvent) {
+  // EventSource cannot send headers: it gets a short-lived stream token (POST {path}/token),
+  // never the access token, since URLs end up in proxy logs
+  let source = null;
+  let retry = null;
+  let closed = false;
+  let reconnecting = false;
+
+  function reconnectLater() {
+    if (closed) return;
+    reconnecting = true;
+    retry = setTimeout(open, 3000);
+  }
+
+  async function open() {
+    let streamToken;
+    try {
+      ({ stream_token: streamToken } = await post(`${path}/token`));
+    } catch {
+      return reconnectLater();
+    }
+    if (closed) return;
+    source = new EventSource(`${API_URL}${path}?stream_token=${encodeURIComponent(streamToken)}`);
+    const handler = (message) => onEvent(JSON.parse(message.data));
+    ["presence_added", "checked_out", "closed", "reopened", "resync"].forEach((type) => source.addEventListener(type, handler));
+    source.onopen = () => {
+      // Events sent while disconnected were missed
+      if (reconnecting) onEvent({ type: "resync" });
+      reconnecting = false;
+    };
+    // The token has expired by the time EventSource would retry on its own
+    source.onerror = () => {
+      source.close();
+      reconnectLater();
+    };
+  }
+
+  open();
+  return () => {
+    closed = true;
+    clearTimeout(retry);
+    if (source) source.close();
+  };
+}
@@ -24,7 +24,7 @@ export default function Children() {
 
   async function load() {
     try {
-      const data = await get(`/children?search=${encodeURIComponent(search)}&page=${page}`);
+      const data = await get(`/children?search=${encodeURIComponent(search)}&page=${page}&include_total=true`);
       setItems(data.items);
       setTotal(data.total);
     } catch (err) {
@@ -1,6 +1,6 @@
 import { useEffect, useState } from "react";
 import { Link, useParams } from "react-router-dom";
-import { get, post } from "../api/client.js";
+import { get, post, subscribe } from "../api/client.js";
 import FormField from "../components/FormField.jsx";
 import Table from "../components/Table.jsx";
 import ConfirmModal from "../components/ConfirmModal.jsx";
@@ -43,6 +43,9 @@ export default function EbiDetail() {
 
   useEffect(() => { load(); loadChildren(); }, [id]);
 
+  // Live roster: events only name what changed (ids), so every one triggers a refetch
+  useEffect(() => subscribe(`/ebi/${id}/events`, () => load()), [id]);
+
   function handleSelectChild(childId) {
     const child = children.find((item) => item.id === Number(childId));
     if (!child) return;
@@ -28,7 +28,7 @@ export default function Ebis() {
 
   async function load() {
     try {
-      const data = await get(`/ebi?search=${encodeURIComponent(search)}&page=${page}`);
+      const data = await get(`/ebi?search=${encodeURIComponent(search)}&page=${page}&include_total=true`);
       setItems(data.items);
       setTotal(data.total);
     } catch (err) {
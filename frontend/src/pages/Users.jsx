@@ -28,7 +28,7 @@ export default function Users() {
 
   async function load() {
     try {
-      const data = await get(`/users?search=${encodeURIComponent(search)}&page=${page}`);
+      const data = await get(`/users?search=${encodeURIComponent(search)}&page=${page}&include_total=true`);
       setItems(data.items);
       setTotal(data.total);
     } catch (err) {
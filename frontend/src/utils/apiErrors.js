@@ -32,6 +32,7 @@ const MESSAGENS_TECNICAS = {
   "Presence not found": "Presença não encontrada.",
   "Presence already exists": "Esta presença já foi registrada.",
   "Invalid pin": "PIN incorreto.",
+  "Too many invalid pins": "Muitos PINs incorretos. Aguarde alguns minutos e tente novamente.",
   "Already checked out": "Saída já registrada.",
   "All presences must be closed":
     "Todas as presenças precisam ter saída registrada antes de encerrar.",